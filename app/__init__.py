@@ -1,12 +1,19 @@
 import os
+import weakref
 from flask import Flask
 from dotenv import load_dotenv
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import event
 
 from .extensions import db, migrate
 
 load_dotenv()
 
-def create_app():
+# Every App Built In This Process; Held Weakly So Discarded Apps (E.g. One Per Test) Can Be Freed
+_apps = weakref.WeakSet()
+
+def create_app(config: dict | None = None):
+    """`config` overrides the settings below (used by `flask query-plans` to run against a scratch database)."""
     app = Flask(__name__)
 
     # Ensure Instance Folder Exists
@@ -14,18 +21,81 @@ def create_app():
 
     # Basic Config
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret')
+    app.config["TEMPLATE_WARMUP"] = os.getenv("TEMPLATE_WARMUP", "0") == "1"
+    app.config["EXPENSE_ARCHIVE_AFTER_DAYS"] = int(os.getenv("EXPENSE_ARCHIVE_AFTER_DAYS", "730"))
+    app.config["DUPLICATE_RECONCILE_ON_COMMIT"] = os.getenv("DUPLICATE_RECONCILE_ON_COMMIT", "0") == "1"
+    app.config["BACKUP_DIR"] = os.getenv("BACKUP_DIR", os.path.join(app.instance_path, "backups"))
+    app.config["BACKUP_KEEP"] = int(os.getenv("BACKUP_KEEP", "7"))
 
     # SQLite DB Inside /instance/app.db
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(app.instance_path, "app.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    if config:
+        app.config.update(config)
+
+    # Compiled Templates Persist Under /instance/jinja_cache So Workers Skip Recompiling
+    jinja_cache_dir = os.path.join(app.instance_path, "jinja_cache")
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(jinja_cache_dir)}
+
     db.init_app(app)
     migrate.init_app(app, db)
 
+    # WAL Lets Readers (Including Online Backups) Run Alongside A Writer
+    with app.app_context():
+        event.listen(db.engine, "connect", enable_wal)
+
     from .routes import main
     app.register_blueprint(main)
 
+    from .cli import expenses_cli, backup_cli, plans_cli
+    app.cli.add_command(expenses_cli)
+    app.cli.add_command(backup_cli)
+    app.cli.add_command(plans_cli)
+
     # Import Models So Flask-Migrate Can "See" Them
     from . import models # noqa: F401
 
+    # Safe For `gunicorn --preload`: Forked Workers Must Not Reuse The Parent's Connections (See reset_after_fork)
+    _apps.add(app)
+
+    if app.config["TEMPLATE_WARMUP"]:
+        compile_templates(app)
+
     return app
+
+
+def enable_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+def dispose_engines(app):
+    """Drop pooled connections inherited from a parent process without closing them."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def reset_after_fork():
+    """Fork hook: for every app still alive, drop inherited connections and reset its live-update bus."""
+    for app in list(_apps):
+        dispose_engines(app)
+        bus = app.extensions.get("live_bus")
+        if bus is not None:
+            bus.after_fork()
+
+
+# Registered Once Per Process: Fork Hooks Can't Be Removed, So One Per create_app() Or Bus Would Pile Up
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def compile_templates(app):
+    """
+    Compile (not render) every template up front, filling the in-memory and /instance/jinja_cache
+    caches so forked workers skip the compile on first use.
+    """
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(name)
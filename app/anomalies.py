@@ -0,0 +1,189 @@
+"""
+Unusual-charge flags.
+
+`expense_stat` keeps a running count, mean and M2 (the sum of squared
+deviations, as in Welford's algorithm) of non-duplicate expense amounts. There
+is one row per category and one per merchant, the merchant being the
+normalized description. An import scores each new row against the stats as
+they stand, then folds it in. Category edits move the edited rows' amounts
+from one category's stats to another's, combining or splitting whole groups
+at once (Chan et al.'s pairwise update). Nothing is recomputed from history.
+
+A row's score is how many standard deviations it sits above its merchant's
+mean, or its category's mean, whichever is larger. A merchant seen for the
+first time is scored against its category plus `NEW_MERCHANT_BONUS`, so a
+new fee stands out sooner than one more charge at a known store. Only scores
+of at least `ANOMALY_THRESHOLD` are stored in `expense.anomaly_score`.
+Everything else stays NULL, so the partial index on flagged rows holds
+exactly the rows the "Flagged" filter lists.
+"""
+import math
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.sqlite import insert
+
+from .extensions import db
+from .models import Expense, ExpenseStat
+from .utils import normalize_description
+
+# Flag Charges At Least This Many Standard Deviations Above Normal
+ANOMALY_THRESHOLD = 3.0
+
+# Fewer Charges Than This Don't Say What Normal Is Yet
+MIN_SAMPLES = 5
+
+# A Merchant's First Charge Needs Less Of A Jump Over Its Category To Be Flagged
+NEW_MERCHANT_BONUS = 1.0
+
+# The Spread Never Counts As Less Than 10% Of The Mean (Or $1), So A Fixed-Price
+# Subscription Isn't Flagged Over A Few Cents
+SPREAD_FLOOR_RATIO = 0.10
+SPREAD_FLOOR = 1.0
+
+# Keys Per IN (...) List When Loading Stats
+KEY_CHUNK_SIZE = 500
+
+# (count, mean, M2)
+EMPTY = (0, 0.0, 0.0)
+
+
+def _add(stat: tuple, amount: float) -> tuple:
+    """Welford's update: `stat` with one more amount."""
+    count, mean, m2 = stat
+    count += 1
+    delta = amount - mean
+    mean += delta / count
+    return count, mean, m2 + delta * (amount - mean)
+
+
+def _combine(a: tuple, b: tuple) -> tuple:
+    """Stats of two disjoint groups taken together."""
+    count = a[0] + b[0]
+    if not count:
+        return EMPTY
+    delta = b[1] - a[1]
+    return count, a[1] + delta * b[0] / count, a[2] + b[2] + delta * delta * a[0] * b[0] / count
+
+
+def _remove(a: tuple, b: tuple) -> tuple:
+    """Stats of `a` without the group `b` it contains (the inverse of `_combine`)."""
+    count = a[0] - b[0]
+    if count <= 0:
+        return EMPTY
+    mean = (a[0] * a[1] - b[0] * b[1]) / count
+    delta = b[1] - mean
+    return count, mean, max(a[2] - b[2] - delta * delta * count * b[0] / a[0], 0.0)
+
+
+def _group(count: int, total: float, total_sq: float) -> tuple:
+    """Stats of a group from its count, sum and sum of squares."""
+    mean = total / count
+    return count, mean, max(total_sq - total * mean, 0.0)
+
+
+def _score(stat: tuple, amount: float) -> float | None:
+    count, mean, m2 = stat
+    if count < MIN_SAMPLES:
+        return None
+    spread = max(math.sqrt(m2 / (count - 1)), abs(mean) * SPREAD_FLOOR_RATIO, SPREAD_FLOOR)
+    return (amount - mean) / spread
+
+
+def _load_stats(household_id: int, kind: str, keys) -> dict[str, tuple]:
+    keys = list(keys)
+    stats = {}
+    for i in range(0, len(keys), KEY_CHUNK_SIZE):
+        rows = db.session.execute(
+            select(ExpenseStat.key, ExpenseStat.count, ExpenseStat.mean, ExpenseStat.m2).where(
+                ExpenseStat.household_id == household_id,
+                ExpenseStat.kind == kind,
+                ExpenseStat.key.in_(keys[i:i + KEY_CHUNK_SIZE]),
+            )
+        )
+        stats.update((key, (count, mean, m2)) for key, count, mean, m2 in rows)
+    return stats
+
+
+def _save_stats(household_id: int, kind: str, stats: dict[str, tuple]):
+    if not stats:
+        return
+    stmt = insert(ExpenseStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ExpenseStat.household_id, ExpenseStat.kind, ExpenseStat.key],
+        set_={"count": stmt.excluded.count, "mean": stmt.excluded.mean, "m2": stmt.excluded.m2},
+    )
+    db.session.execute(stmt, [
+        {"household_id": household_id, "kind": kind, "key": key, "count": count, "mean": mean, "m2": m2}
+        for key, (count, mean, m2) in stats.items()
+    ])
+
+
+def score_expenses(household_id: int, records: list[dict]):
+    """
+    Set "anomaly_score" on import records (dicts with description, amount, category_id,
+    is_duplicate) in order, folding each non-duplicate into the stats as it goes.
+    """
+    merchants = [normalize_description(r["description"]) for r in records]
+    categories = [str(r["category_id"]) for r in records]
+    merchant_stats = _load_stats(household_id, "merchant", set(merchants))
+    category_stats = _load_stats(household_id, "category", set(categories))
+    changed_merchants, changed_categories = set(), set()
+
+    for r, merchant, category in zip(records, merchants, categories):
+        r["anomaly_score"] = None
+        if r["is_duplicate"]:
+            continue
+
+        amount = r["amount"]
+        merchant_stat = merchant_stats.get(merchant, EMPTY)
+        category_stat = category_stats.get(category, EMPTY)
+
+        by_category = _score(category_stat, amount)
+        if not merchant_stat[0] and by_category is not None:
+            by_category += NEW_MERCHANT_BONUS
+        scores = [s for s in (_score(merchant_stat, amount), by_category) if s is not None]
+        if scores and max(scores) >= ANOMALY_THRESHOLD:
+            r["anomaly_score"] = round(max(scores), 1)
+
+        merchant_stats[merchant] = _add(merchant_stat, amount)
+        category_stats[category] = _add(category_stat, amount)
+        changed_merchants.add(merchant)
+        changed_categories.add(category)
+
+    _save_stats(household_id, "merchant", {k: merchant_stats[k] for k in changed_merchants})
+    _save_stats(household_id, "category", {k: category_stats[k] for k in changed_categories})
+
+
+def move_category_stats(household_id: int, new_category, *where, table=None):
+    """
+    Before expenses of `table` (default `expense`; archive tables count too) matching `where` get
+    `new_category` (an id, or a column such as the undo log's old category), move their amounts
+    between the category stats, a group per (old, new) pair.
+    """
+    t = (table if table is not None else Expense.__table__).c
+    if isinstance(new_category, int):
+        new_category = literal(new_category)
+
+    moves = db.session.execute(
+        select(
+            t.category_id, new_category, func.count(),
+            func.sum(t.amount), func.sum(t.amount * t.amount),
+        )
+        .where(
+            t.household_id == household_id,
+            t.is_duplicate == False,
+            t.category_id != new_category,
+            *where,
+        )
+        .group_by(t.category_id, new_category)
+    ).all()
+    if not moves:
+        return
+
+    keys = {str(old) for old, new, *_ in moves} | {str(new) for old, new, *_ in moves}
+    stats = _load_stats(household_id, "category", keys)
+    for old, new, count, total, total_sq in moves:
+        group = _group(count, total, total_sq)
+        stats[str(old)] = _remove(stats.get(str(old), EMPTY), group)
+        stats[str(new)] = _combine(stats.get(str(new), EMPTY), group)
+    _save_stats(household_id, "category", stats)
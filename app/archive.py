@@ -0,0 +1,151 @@
+"""
+Cold storage for old expenses.
+
+Expenses older than a cutoff are moved out of the live `expense` table into one
+table per calendar year (`expense_archive_<year>`). Rows keep their ids, so
+duplicate pointers stay valid. Reads go through `expense_entity()`, which only
+unions in the yearly tables that overlap the requested date range. Archived
+rows are read-only: the per-row edit and delete routes only see `expense`.
+"""
+from datetime import date
+
+from sqlalchemy import MetaData, Table, Column, Index, select, union_all, and_, inspect, true, false
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import aliased
+
+from .extensions import db
+from .models import Expense, ExpensePartition
+
+# Kept Out Of db.metadata So Flask-Migrate Doesn't Try To Manage The Yearly Tables
+archive_metadata = MetaData()
+
+_archive_tables: dict[int, Table] = {}
+
+
+def archive_table(year: int) -> Table:
+    """Table object for one year's archive (same columns as `expense`, no FKs)."""
+    table = _archive_tables.get(year)
+    if table is not None:
+        return table
+
+    name = f"expense_archive_{year}"
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+        for c in Expense.__table__.columns
+    ]
+    table = Table(name, archive_metadata, *columns)
+    Index(f"ix_{name}_household_spent_date", table.c.household_id, table.c.spent_date, table.c.id)
+    Index(f"ix_{name}_household_fingerprint", table.c.household_id, table.c.fingerprint)
+    Index(f"ix_{name}_household_fitid", table.c.household_id, table.c.fitid)
+    Index(f"ix_{name}_household_category_date", table.c.household_id, table.c.category_id, table.c.spent_date)
+    Index(f"ix_{name}_household_merchant", table.c.household_id, table.c.merchant)
+    Index(f"ix_{name}_household_flagged", table.c.household_id, table.c.spent_date, table.c.id,
+          sqlite_where=table.c.anomaly_score.is_not(None))
+
+    _archive_tables[year] = table
+    return table
+
+
+def _create_archive_table(table: Table):
+    """
+    Create a yearly table unless it exists, then its indexes in name order. SQLite breaks ties
+    between equally good indexes by schema order, so every year should list them the same way.
+    """
+    conn = db.session.connection()
+    if inspect(conn).has_table(table.name):
+        return
+
+    conn.execute(CreateTable(table))
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        index.create(conn)
+
+
+def archived_years(start: date | None = None, end: date | None = None) -> list[int]:
+    """Years that have an archive partition, optionally only those overlapping [start, end]."""
+    q = db.session.query(ExpensePartition.year)
+    if start:
+        q = q.filter(ExpensePartition.year >= start.year)
+    if end:
+        q = q.filter(ExpensePartition.year <= end.year)
+    return [year for (year,) in q.order_by(ExpensePartition.year.asc())]
+
+
+def expense_entity(household_id: int, start: date, end: date):
+    """
+    Entity to query expenses in [start, end] for one household.
+
+    Without overlapping archives this is just `Expense`. Otherwise it is an alias of
+    `Expense` over a UNION ALL of the live table and the overlapping yearly tables,
+    each branch already narrowed to the household and date range. `is_archived(E)`
+    tells the branches apart.
+    """
+    years = archived_years(start, end)
+    if not years:
+        return Expense
+
+    live = Expense.__table__
+    branches = [
+        select(*live.columns, false().label("archived")).where(
+            live.c.household_id == household_id, live.c.spent_date >= start, live.c.spent_date <= end,
+        )
+    ]
+    for year in years:
+        table = archive_table(year)
+        branches.append(
+            select(*table.columns, true().label("archived")).where(
+                table.c.household_id == household_id, table.c.spent_date >= start, table.c.spent_date <= end,
+            )
+        )
+
+    return aliased(Expense, union_all(*branches).subquery("expense_all"))
+
+
+def is_archived(E):
+    """Column of `expense_entity()` rows: true for rows read from a yearly archive table."""
+    if E is Expense:
+        return false()
+    return inspect(E).selectable.c.archived
+
+
+def archive_expenses(cutoff: date) -> dict[int, int]:
+    """
+    Move every expense dated before `cutoff` into its yearly archive table.
+    Returns {year: rows moved}. Each year is moved in its own transaction.
+    """
+    live = Expense.__table__
+    oldest = db.session.query(db.func.min(Expense.spent_date)).filter(Expense.spent_date < cutoff).scalar()
+    if oldest is None:
+        return {}
+
+    moved = {}
+    for year in range(oldest.year, cutoff.year + 1):
+        year_start = date(year, 1, 1)
+        year_end = min(date(year + 1, 1, 1), cutoff)
+        in_year = and_(live.c.spent_date >= year_start, live.c.spent_date < year_end)
+
+        # Don't Leave An Empty, Unregistered Table For A Year Without Expenses
+        if db.session.execute(select(live.c.id).where(in_year).limit(1)).first() is None:
+            continue
+
+        table = archive_table(year)
+        _create_archive_table(table)
+
+        result = db.session.execute(
+            table.insert().from_select([c.name for c in live.columns], select(*live.columns).where(in_year))
+        )
+        if not result.rowcount:
+            db.session.rollback()
+            continue
+
+        db.session.execute(live.delete().where(in_year))
+
+        partition = db.session.get(ExpensePartition, year)
+        if partition is None:
+            partition = ExpensePartition(year=year, row_count=0)
+            db.session.add(partition)
+        partition.row_count += result.rowcount
+
+        db.session.commit()
+        moved[year] = result.rowcount
+
+    return moved
@@ -0,0 +1,147 @@
+"""
+Online backups of the SQLite database.
+
+Snapshots are taken with SQLite's backup API a few pages at a time, pausing
+between steps. In WAL mode (the app's default) the backup pins one read
+snapshot for the whole copy: writers keep committing meanwhile, and the copy
+never restarts. Without WAL, each step holds the shared lock only while it
+copies its pages, and a write between steps makes SQLite restart the copy.
+
+Snapshots live in instance/backups/ as app-YYYYMMDD-HHMMSS-ffffff.db, each with
+a .json file recording how long it held the lock. The microseconds keep two
+backups in the same second from replacing each other, and names still sort by age.
+"""
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+# Pages Copied Per Step (4 MB With The Default 4 KB Page Size)
+BACKUP_PAGES_PER_STEP = 1024
+
+# Seconds Between Steps, When Writers Can Take The Lock
+BACKUP_STEP_PAUSE = 0.005
+
+SNAPSHOT_PREFIX = "app-"
+SNAPSHOT_SUFFIX = ".db"
+
+
+class BackupError(RuntimeError):
+    """A snapshot is missing or fails SQLite's integrity check."""
+
+
+def create_backup(source_path: str, backup_dir: str, keep: int) -> dict:
+    """
+    Snapshot `source_path` into `backup_dir` and drop all but the newest `keep` snapshots.
+    Returns the snapshot's stats (also written next to it as JSON).
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    name = _snapshot_name(backup_dir)
+    path = os.path.join(backup_dir, name)
+    partial = path + ".partial"
+
+    steps = []
+    restarts = 0
+    last = {"remaining": None, "returned": time.perf_counter()}
+
+    def progress(status, remaining, total):
+        nonlocal restarts
+        # Time Since The Previous Callback Returned Is The Step Itself, Which Held The Lock
+        steps.append(time.perf_counter() - last["returned"])
+        if last["remaining"] is not None and remaining > last["remaining"]:
+            restarts += 1
+        last["remaining"] = remaining
+        if remaining:
+            time.sleep(BACKUP_STEP_PAUSE)
+        last["returned"] = time.perf_counter()
+
+    started = time.perf_counter()
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(partial)
+    try:
+        if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # Pin A Read Snapshot So Commits During The Copy Don't Restart It
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+        source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress)
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    os.replace(partial, path)
+
+    stats = {
+        "name": name,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "bytes": os.path.getsize(path),
+        "pages": pages,
+        "steps": len(steps),
+        "restarts": restarts,
+        "seconds": round(time.perf_counter() - started, 3),
+        "lock_seconds": round(sum(steps), 3),
+        "max_lock_seconds": round(max(steps, default=0.0), 4),
+    }
+    with open(path[:-len(SNAPSHOT_SUFFIX)] + ".json", "w") as f:
+        json.dump(stats, f, indent=2)
+
+    _rotate(backup_dir, keep)
+    return stats
+
+
+def list_backups(backup_dir: str) -> list[dict]:
+    """Stats of every snapshot, newest first (snapshots without stats just have a name)."""
+    if not os.path.isdir(backup_dir):
+        return []
+
+    backups = []
+    for name in sorted(os.listdir(backup_dir), reverse=True):
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        stats_path = os.path.join(backup_dir, name[:-len(SNAPSHOT_SUFFIX)] + ".json")
+        try:
+            with open(stats_path) as f:
+                backups.append(json.load(f))
+        except (OSError, ValueError):
+            backups.append({"name": name})
+    return backups
+
+
+def restore_backup(snapshot_path: str, target_path: str):
+    """
+    Overwrite `target_path` with a snapshot. The copy runs as a single step, so
+    connections never see a half-restored database; it waits for open writes.
+    """
+    if not os.path.isfile(snapshot_path):
+        raise BackupError(f"No snapshot at {snapshot_path}.")
+
+    source = sqlite3.connect(snapshot_path)
+    try:
+        check = source.execute("PRAGMA quick_check").fetchone()[0]
+        if check != "ok":
+            raise BackupError(f"{os.path.basename(snapshot_path)} failed the integrity check: {check}")
+
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def _snapshot_name(backup_dir: str) -> str:
+    """A timestamped name no snapshot (finished or in progress) in `backup_dir` uses yet."""
+    while True:
+        name = f"{SNAPSHOT_PREFIX}{datetime.now():%Y%m%d-%H%M%S-%f}{SNAPSHOT_SUFFIX}"
+        path = os.path.join(backup_dir, name)
+        if not (os.path.exists(path) or os.path.exists(path + ".partial")):
+            return name
+
+
+def _rotate(backup_dir: str, keep: int):
+    for stats in list_backups(backup_dir)[keep:]:
+        base = os.path.join(backup_dir, stats["name"][:-len(SNAPSHOT_SUFFIX)])
+        for path in (base + SNAPSHOT_SUFFIX, base + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
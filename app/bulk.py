@@ -0,0 +1,183 @@
+"""
+Set-based bulk edits over every expense matching the expenses filter.
+
+Each action is recorded in `bulk_action`. Category changes log only
+(expense_id, old category_id) pairs, and deletes move the rows into
+`deleted_expense`. Both are written with INSERT ... SELECT, so undoing an
+action over 100k rows never loads those rows into Python.
+
+The expenses list also shows archived rows, so an action covers the live
+table and every yearly archive overlapping the filter's dates. Ids are unique
+across all of them, and a deleted row remembers its archive year, so undo
+puts every row back where it was.
+"""
+from sqlalchemy import select, update, delete, insert, and_
+
+from .extensions import db
+from .models import Expense, BulkAction, BulkActionRow, DeletedExpense
+from .anomalies import move_category_stats
+from .archive import archive_table, archived_years
+
+# How Many Recent Actions Per Household Stay Undoable
+BULK_UNDO_KEEP = 10
+
+# Columns Copied Between `expense` And `deleted_expense`
+EXPENSE_COLUMNS = [c.name for c in Expense.__table__.columns]
+
+
+def expense_filter_conditions(E, household_id: int, filters: dict) -> list:
+    """WHERE conditions for the expenses filter (preset/show/category/start/end) on entity `E` (or a table's `.c`)."""
+    conditions = [
+        E.household_id == household_id,
+        E.spent_date >= filters["start"],
+        E.spent_date <= filters["end"],
+    ]
+    if filters.get("category_id"):
+        conditions.append(E.category_id == filters["category_id"])
+    if filters["show"] == "dupes":
+        conditions.append(E.is_duplicate == True)
+    elif filters["show"] == "flagged":
+        # Matches The Partial Index On Flagged Rows
+        conditions.append(E.anomaly_score.is_not(None))
+    return conditions
+
+
+def _matching_tables(filters: dict) -> list[tuple]:
+    """(table, archive year or None) for `expense` and each archive overlapping the filter's dates."""
+    years = archived_years(filters["start"], filters["end"])
+    return [(Expense.__table__, None)] + [(archive_table(year), year) for year in years]
+
+
+def recategorize_matching(household_id: int, filters: dict, category_id: int) -> BulkAction:
+    """Set `category_id` on every expense matching the filter, live or archived."""
+    action = _start_action(household_id, "category", category_id)
+    logged_ids = select(BulkActionRow.expense_id).where(BulkActionRow.action_id == action.id)
+
+    logged = 0
+    for table, _ in _matching_tables(filters):
+        conditions = expense_filter_conditions(table.c, household_id, filters)
+        move_category_stats(household_id, category_id, *conditions, table=table)
+
+        logged += db.session.execute(
+            insert(BulkActionRow).from_select(
+                ["action_id", "expense_id", "category_id"],
+                select(db.literal(action.id), table.c.id, table.c.category_id).where(
+                    *conditions,
+                    table.c.category_id != category_id,
+                ),
+            )
+        ).rowcount
+        db.session.execute(update(table).where(table.c.id.in_(logged_ids)).values(category_id=category_id))
+
+    return _finish_action(action, logged)
+
+
+def delete_matching(household_id: int, filters: dict) -> BulkAction:
+    """Delete every expense matching the filter, live or archived, keeping copies for undo."""
+    action = _start_action(household_id, "delete")
+    deleted_ids = select(DeletedExpense.id).where(DeletedExpense.action_id == action.id)
+
+    moved = 0
+    for table, year in _matching_tables(filters):
+        moved += db.session.execute(
+            insert(DeletedExpense).from_select(
+                ["action_id", "archive_year", *EXPENSE_COLUMNS],
+                select(db.literal(action.id), db.literal(year, db.Integer), *table.columns).where(
+                    *expense_filter_conditions(table.c, household_id, filters),
+                ),
+            )
+        ).rowcount
+        db.session.execute(delete(table).where(table.c.id.in_(deleted_ids)))
+
+    return _finish_action(action, moved)
+
+
+def undo_action(action: BulkAction) -> int:
+    """Reverse a bulk action. Returns the number of expenses restored."""
+    if action.kind == "category":
+        restored = sum(_undo_category(action, table) for table in _all_tables())
+    else:
+        restored = sum(_undo_delete(action, year) for year in _deleted_years(action))
+
+    _clear_log([action.id])
+    action.undone_at = db.func.now()
+    db.session.commit()
+    return restored
+
+
+def _all_tables() -> list:
+    """`expense` and every archive: an archive run since the action may have moved its rows."""
+    return [Expense.__table__] + [archive_table(year) for year in archived_years()]
+
+
+def _undo_category(action: BulkAction, table) -> int:
+    logged = and_(BulkActionRow.action_id == action.id, BulkActionRow.expense_id == table.c.id)
+    move_category_stats(action.household_id, BulkActionRow.category_id, logged, table=table)
+    old_category = select(BulkActionRow.category_id).where(logged).scalar_subquery()
+    return db.session.execute(
+        update(table)
+        .where(table.c.id.in_(select(BulkActionRow.expense_id).where(BulkActionRow.action_id == action.id)))
+        .values(category_id=old_category)
+    ).rowcount
+
+
+def _deleted_years(action: BulkAction) -> list:
+    return db.session.scalars(
+        select(DeletedExpense.archive_year).where(DeletedExpense.action_id == action.id).distinct()
+    ).all()
+
+
+def _undo_delete(action: BulkAction, year: int | None) -> int:
+    """Put back the rows the action deleted from `expense` (year None) or from one archive."""
+    if year is None:
+        table, from_table = Expense.__table__, DeletedExpense.archive_year.is_(None)
+    else:
+        table, from_table = archive_table(year), DeletedExpense.archive_year == year
+    return db.session.execute(
+        insert(table).from_select(
+            EXPENSE_COLUMNS,
+            select(*[DeletedExpense.__table__.c[name] for name in EXPENSE_COLUMNS])
+            .where(DeletedExpense.action_id == action.id, from_table)
+            # An id reused by a later insert can't be restored
+            .where(DeletedExpense.id.not_in(select(table.c.id))),
+        )
+    ).rowcount
+
+
+def _start_action(household_id: int, kind: str, category_id: int | None = None) -> BulkAction:
+    action = BulkAction(household_id=household_id, kind=kind, category_id=category_id)
+    db.session.add(action)
+    db.session.flush()
+    return action
+
+
+def _finish_action(action: BulkAction, row_count: int) -> BulkAction:
+    action.row_count = row_count
+    _prune(action.household_id)
+    db.session.commit()
+    return action
+
+
+def _prune(household_id: int):
+    """Forget everything but the newest BULK_UNDO_KEEP actions, along with their undo logs."""
+    keep = (
+        select(BulkAction.id)
+        .where(BulkAction.household_id == household_id)
+        .order_by(BulkAction.id.desc())
+        .limit(BULK_UNDO_KEEP)
+    )
+    stale = db.session.scalars(
+        select(BulkAction.id).where(BulkAction.household_id == household_id, BulkAction.id.not_in(keep))
+    ).all()
+    if not stale:
+        return
+
+    _clear_log(stale)
+    db.session.execute(
+        delete(BulkAction).where(BulkAction.id.in_(stale)).execution_options(synchronize_session=False)
+    )
+
+
+def _clear_log(action_ids: list[int]):
+    db.session.execute(delete(BulkActionRow).where(BulkActionRow.action_id.in_(action_ids)))
+    db.session.execute(delete(DeletedExpense).where(DeletedExpense.action_id.in_(action_ids)))
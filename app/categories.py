@@ -0,0 +1,139 @@
+"""
+User-defined expense categories.
+
+Expenses, bills and the bulk-edit log store a small integer `category_id`
+instead of the name, so renaming a category updates one `category` row.
+Names are resolved through per-household {name: id} / {id: name} maps that
+each app caches in its `extensions`, so apps on different databases in one
+process never share ids. Every add or rename bumps
+`household.categories_version`, and a cached map is reused only while that
+version is unchanged. The check is a primary-key lookup instead of a scan of
+the categories.
+
+The income category (where deposits land) is marked by `Category.is_income`
+rather than found by name, so it stays the income category when renamed.
+"""
+from flask import current_app
+from sqlalchemy import select, update, insert
+
+from .extensions import db
+from .models import Category, Household
+from .constants import EXPENSE_CATEGORIES, INCOME_CATEGORY
+
+CATEGORY_NAME_MAX = 50
+
+
+class CategoryError(ValueError):
+    """A category name is empty, too long, or already taken."""
+
+
+def _maps() -> dict[int, tuple[int, dict[str, int], dict[int, str], int | None]]:
+    """This app's {household_id: (categories_version, {name: id}, {id: name}, income category id)}."""
+    return current_app.extensions.setdefault("category_maps", {})
+
+
+def _cached(household_id: int) -> tuple[int, dict[str, int], dict[int, str], int | None]:
+    version = db.session.execute(
+        select(Household.categories_version).where(Household.id == household_id)
+    ).scalar()
+
+    maps = _maps()
+    cached = maps.get(household_id)
+    if cached is not None and cached[0] == version:
+        return cached
+
+    rows = db.session.execute(
+        select(Category.id, Category.name, Category.is_income)
+        .where(Category.household_id == household_id)
+        .order_by(Category.name)
+    ).all()
+    ids = {name: category_id for category_id, name, _ in rows}
+    names = {category_id: name for category_id, name, _ in rows}
+    income_id = next((category_id for category_id, _, is_income in rows if is_income), None)
+    maps[household_id] = (version, ids, names, income_id)
+    return maps[household_id]
+
+
+def category_maps(household_id: int) -> tuple[dict[str, int], dict[int, str]]:
+    """({name: id}, {id: name}) for a household, both ordered by name."""
+    _, ids, names, _ = _cached(household_id)
+    return ids, names
+
+
+def category_id_for(household_id: int, name: str) -> int | None:
+    """Id of an existing category, or None."""
+    return category_maps(household_id)[0].get(name)
+
+
+def income_category_id(household_id: int) -> int | None:
+    """Id of the household's income category (whatever it is named now), or None."""
+    return _cached(household_id)[3]
+
+
+def ensure_categories(household_id: int, names) -> dict[str, int]:
+    """
+    {name: id} covering `names`, creating the ones this household doesn't have yet.
+    New categories are committed right away, so a cached map never holds ids from a
+    transaction that is later rolled back; call this before starting other writes.
+    """
+    ids, _ = category_maps(household_id)
+    missing = sorted({_clean(name) for name in names} - set(ids))
+    if not missing:
+        return ids
+
+    db.session.execute(insert(Category), [{"household_id": household_id, "name": name} for name in missing])
+    _bump_version(household_id)
+    db.session.commit()
+    return category_maps(household_id)[0]
+
+
+def ensure_category(household_id: int, name: str) -> int:
+    """Id of the named category, created if needed."""
+    return ensure_categories(household_id, [name])[_clean(name)]
+
+
+def seed_categories(household_id: int):
+    """Give a new household the default categories, with INCOME_CATEGORY as its income category."""
+    ids = ensure_categories(household_id, EXPENSE_CATEGORIES)
+    if income_category_id(household_id) is not None:
+        return
+
+    db.session.execute(update(Category).where(Category.id == ids[INCOME_CATEGORY]).values(is_income=True))
+    _bump_version(household_id)
+    db.session.commit()
+
+
+def rename_category(household_id: int, category_id: int, name: str):
+    """Rename one category. Expenses and bills follow along, since they store the id."""
+    name = _clean(name)
+    ids, names = category_maps(household_id)
+    if category_id not in names:
+        raise CategoryError("Unknown category.")
+    if ids.get(name, category_id) != category_id:
+        raise CategoryError(f"There is already a category named \"{name}\".")
+
+    db.session.execute(
+        update(Category)
+        .where(Category.id == category_id, Category.household_id == household_id)
+        .values(name=name)
+    )
+    _bump_version(household_id)
+    db.session.commit()
+
+
+def _clean(name: str) -> str:
+    name = " ".join((name or "").split())
+    if not name:
+        raise CategoryError("Category name is required.")
+    if len(name) > CATEGORY_NAME_MAX:
+        raise CategoryError(f"Category names can be at most {CATEGORY_NAME_MAX} characters.")
+    return name
+
+
+def _bump_version(household_id: int):
+    db.session.execute(
+        update(Household)
+        .where(Household.id == household_id)
+        .values(categories_version=Household.categories_version + 1)
+    )
+    _maps().pop(household_id, None)
@@ -0,0 +1,241 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .archive import archive_expenses
+from .backup import BackupError, create_backup, list_backups, restore_backup
+from .duplicates import reconcile_duplicates
+from .extensions import db
+from .importer import IMPORT_BATCH_SIZE, statement_paths, write_expenses
+from .models import Household, DEFAULT_HOUSEHOLD_ID
+from .queryplans import PLAN_ROWS, collect_plans, hot_scans, snapshot_diffs, write_snapshots
+from .statements import parse_statement_file
+
+expenses_cli = AppGroup("expenses", help="Maintenance commands for imported expenses.")
+backup_cli = AppGroup("backup", help="Online snapshots of the database.")
+plans_cli = AppGroup("query-plans", help="EXPLAIN QUERY PLAN snapshots of the SQL behind every route.")
+
+
+@expenses_cli.command("archive")
+@click.option("--before", "before_raw", help="Archive expenses dated before this day (YYYY-MM-DD).")
+def archive_command(before_raw):
+    """Move old expenses into per-year archive tables."""
+    if before_raw:
+        cutoff = date.fromisoformat(before_raw)
+    else:
+        cutoff = date.today() - timedelta(days=current_app.config["EXPENSE_ARCHIVE_AFTER_DAYS"])
+
+    moved = archive_expenses(cutoff)
+    if not moved:
+        click.echo(f"Nothing to archive before {cutoff.isoformat()}.")
+        return
+
+    for year, count in moved.items():
+        click.echo(f"{year}: archived {count} expenses")
+    click.echo(f"Archived {sum(moved.values())} expenses dated before {cutoff.isoformat()}.")
+
+
+@expenses_cli.command("reconcile-duplicates")
+@click.option("--household", "household_id", type=int, help="Only this household (default: all).")
+def reconcile_duplicates_command(household_id):
+    """Recompute duplicate flags from fingerprints in one pass."""
+    started = time.perf_counter()
+    with db.engine.begin() as conn:
+        changed = reconcile_duplicates(conn, household_id)
+    click.echo(f"Updated duplicate flags on {changed} expenses in {time.perf_counter() - started:.2f}s.")
+
+
+def parse_in_order(pool, paths: list[str], ahead: int):
+    """
+    parse_statement_file() over `paths` in the workers, yielded in file order. At most `ahead`
+    files are parsed or waiting at a time, so parsed rows never pile up faster than they're written.
+    """
+    remaining = iter(paths)
+    in_flight = deque(pool.submit(parse_statement_file, path) for path in islice(remaining, ahead))
+    while in_flight:
+        result = in_flight.popleft().result()
+        for path in islice(remaining, 1):
+            in_flight.append(pool.submit(parse_statement_file, path))
+        yield result
+
+
+@expenses_cli.command("import-dir")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--household", "household_id", type=int, default=DEFAULT_HOUSEHOLD_ID, show_default=True)
+@click.option("--workers", type=int, help="Parser processes (default: one per CPU).")
+@click.option("--batch-size", type=int, default=IMPORT_BATCH_SIZE, show_default=True, help="Rows per commit.")
+def import_dir_command(directory, household_id, workers, batch_size):
+    """Import every CSV/OFX/QFX statement under DIRECTORY."""
+    if db.session.get(Household, household_id) is None:
+        raise click.BadParameter(f"No household with id {household_id}.", param_hint="--household")
+
+    paths = statement_paths(directory)
+    if not paths:
+        click.echo(f"No .csv, .ofx or .qfx files under {directory}.")
+        return
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    failed = []
+    partial = []
+    pending = []
+    inserted = duplicates = 0
+
+    def flush():
+        nonlocal inserted, duplicates, pending
+        n, d = write_expenses(household_id, pending)
+        inserted += n
+        duplicates += d
+        pending = []
+
+    # Workers Only Parse; This Process Is The Single Writer. Files Are Written In Order So Reruns Flag The Same Rows.
+    # Only Each File's Outcome Is Kept, So Memory Stays At About One Batch Plus The Files Parsed Ahead
+    with ProcessPoolExecutor(max_workers=workers) as pool, click.progressbar(
+        length=len(paths), label="Importing", show_pos=True,
+        item_show_func=lambda path: os.path.basename(path) if path else None,
+    ) as bar:
+        for result in parse_in_order(pool, paths, ahead=2 * workers):
+            if result["error"]:
+                failed.append((result["path"], result["error"]))
+            elif result["errors"]:
+                partial.append((result["path"], result["errors"], len(result["rows"])))
+
+            pending += result["rows"]
+            if len(pending) >= batch_size:
+                flush()
+            bar.update(1, result["path"])
+        flush()
+
+    for path, error in failed:
+        click.echo(f"FAILED   {path}: {error}", err=True)
+    for path, errors, rows in partial:
+        click.echo(f"SKIPPED  {path}: {errors} unreadable rows ({rows} imported)", err=True)
+
+    click.echo(
+        f"Imported {inserted} expenses ({duplicates} flagged as duplicates) from "
+        f"{len(paths) - len(failed)}/{len(paths)} files in {time.perf_counter() - started:.2f}s."
+    )
+
+
+@expenses_cli.command("analyze")
+def analyze_command():
+    """Refresh the query planner's statistics (run after a large import)."""
+    started = time.perf_counter()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    click.echo(f"Analyzed in {time.perf_counter() - started:.2f}s.")
+
+
+@expenses_cli.command("vacuum")
+def vacuum_command():
+    """Rebuild the database file to reclaim space left by deletes and archiving."""
+    path = db.engine.url.database
+    before = os.path.getsize(path)
+    started = time.perf_counter()
+
+    # VACUUM Can't Run Inside A Transaction
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+
+    after = os.path.getsize(path)
+    click.echo(f"Vacuumed in {time.perf_counter() - started:.2f}s: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB.")
+
+
+@backup_cli.command("create")
+@click.option("--keep", type=int, help="Snapshots to keep (default: BACKUP_KEEP).")
+def backup_create_command(keep):
+    """Snapshot the live database without blocking writers for long."""
+    keep = keep or current_app.config["BACKUP_KEEP"]
+    stats = create_backup(db.engine.url.database, current_app.config["BACKUP_DIR"], keep)
+    click.echo(
+        f"{stats['name']}: {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.2f}s, "
+        f"lock held {stats['lock_seconds']:.2f}s over {stats['steps']} steps "
+        f"(longest {stats['max_lock_seconds'] * 1000:.1f} ms, {stats['restarts']} restarts)."
+    )
+
+
+@backup_cli.command("list")
+def backup_list_command():
+    """Show snapshots, newest first."""
+    backups = list_backups(current_app.config["BACKUP_DIR"])
+    if not backups:
+        click.echo("No snapshots yet.")
+        return
+
+    for stats in backups:
+        if "seconds" not in stats:
+            click.echo(stats["name"])
+            continue
+        click.echo(
+            f"{stats['name']}  {stats['bytes'] / 1e6:8.1f} MB  {stats['seconds']:6.2f}s  "
+            f"lock {stats['lock_seconds']:.2f}s (max {stats['max_lock_seconds'] * 1000:.1f} ms)"
+        )
+
+
+@backup_cli.command("restore")
+@click.argument("name", required=False)
+@click.confirmation_option(prompt="This overwrites the live database. Continue?")
+def backup_restore_command(name):
+    """Replace the live database with snapshot NAME (default: the newest)."""
+    backup_dir = current_app.config["BACKUP_DIR"]
+    if not name:
+        backups = list_backups(backup_dir)
+        if not backups:
+            raise click.ClickException("No snapshots to restore.")
+        name = backups[0]["name"]
+
+    try:
+        restore_backup(os.path.join(backup_dir, name), db.engine.url.database)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+
+    # Pooled Connections May Have Cached The Old Schema
+    db.engine.dispose()
+    click.echo(f"Restored {name}.")
+
+
+def _collect_plans(rows: int) -> tuple[dict, list[str]]:
+    """Run the routes against a scratch database; report hot-query scans and routes the run missed."""
+    started = time.perf_counter()
+    plans, missed = collect_plans(rows)
+    statements = sum(len(s) for s in plans.values())
+    click.echo(f"Explained {statements} statements from {len(plans)} routes in {time.perf_counter() - started:.2f}s.")
+
+    problems = hot_scans(plans) + [f"{endpoint} was never requested; add it to the route run." for endpoint in missed]
+    for problem in problems:
+        click.echo(problem, err=True)
+    return plans, problems
+
+
+@plans_cli.command("check")
+@click.option("--rows", type=int, default=PLAN_ROWS, show_default=True, help="Synthetic expenses to plan against.")
+def plans_check_command(rows):
+    """Fail on hot-query table scans or on plans that differ from query_plans/."""
+    plans, problems = _collect_plans(rows)
+    diffs = snapshot_diffs(plans)
+    for diff in diffs:
+        click.echo(diff)
+
+    if diffs:
+        problems.append(f"{len(diffs)} route(s) changed plans; run `flask query-plans update` if that's expected.")
+    if problems:
+        raise click.ClickException(problems[-1] if diffs else f"{len(problems)} problem(s) found.")
+    click.echo("Query plans match the snapshots.")
+
+
+@plans_cli.command("update")
+@click.option("--rows", type=int, default=PLAN_ROWS, show_default=True, help="Synthetic expenses to plan against.")
+def plans_update_command(rows):
+    """Rewrite query_plans/ from a fresh run (still fails on hot-query table scans)."""
+    plans, problems = _collect_plans(rows)
+    write_snapshots(plans)
+    click.echo(f"Wrote {len(plans)} snapshots.")
+    if problems:
+        raise click.ClickException(f"{len(problems)} problem(s) found.")
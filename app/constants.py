@@ -11,4 +11,16 @@ EXPENSE_CATEGORIES = [
     "Fees",
     "Income",
     "Other",
-]
\ No newline at end of file
+]
+
+# The Default Category Flagged As Income (Category.is_income) For A New Household
+INCOME_CATEGORY = "Income"
+
+BILL_RECURRENCES = [
+    ("monthly", "Monthly"),
+    ("weekly", "Weekly"),
+    ("biweekly", "Every 2 Weeks"),
+    ("quarterly", "Quarterly"),
+    ("annual", "Annual"),
+    ("last_business_day", "Last Business Day"),
+]
@@ -0,0 +1,98 @@
+"""
+Dashboard figures for one household.
+
+This month's income and bills, the next paycheck, and the bills due before
+and after it. The dashboard page renders them, and the live-update stream
+(app/live.py) sends the ones that changed.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from .extensions import db
+from .models import Paycheck
+from .rows import bill_rows
+from .utils import bill_occurrences
+
+
+def dashboard_summary(household_id: int, today: date) -> dict:
+    """The dashboard template's variables."""
+    first_day = date(today.year, today.month, 1)
+
+    # First Day of Next Month
+    if today.month == 12:
+        first_next = date(today.year + 1, 1, 1)
+    else:
+        first_next = date(today.year, today.month + 1, 1)
+
+    total_income = (
+        db.session.query(func.coalesce(func.sum(Paycheck.amount), 0))
+        .filter(Paycheck.household_id == household_id)
+        .filter(Paycheck.pay_date >= first_day)
+        .filter(Paycheck.pay_date < first_next)
+        .scalar()
+    )
+
+    payday_date = db.session.execute(
+        select(Paycheck.pay_date)
+        .where(Paycheck.household_id == household_id, Paycheck.pay_date >= today)
+        .order_by(Paycheck.pay_date.asc())
+        .limit(1)
+    ).scalar()
+    next_paycheck_label = payday_date.strftime("%b %d, %Y") if payday_date else "—"
+
+    active_bills = bill_rows(household_id, active_only=True)
+    window_end = today + timedelta(days=30)
+
+    # Every Due Date From The Start Of This Month Through The Window, All Bills In One Pass
+    occurrences = bill_occurrences(
+        active_bills, first_day, max(window_end, first_next - timedelta(days=1), payday_date or today)
+    )
+
+    total_bills = sum(b.amount for b, due in occurrences if due < first_next)
+    remaining = float(total_income) - total_bills
+
+    bills_before_payday = []
+    upcoming_bills = []
+    for b, due in occurrences:
+        # Skip past dates, and any already marked paid
+        if due < today or (b.paid_through and b.paid_through >= due):
+            continue
+
+        item = {"name": b.name, "due": due, "amount": b.amount}
+        # If we don't have a payday yet, nothing is "before payday"
+        if payday_date and due <= payday_date:
+            bills_before_payday.append(item)
+        # If we have a payday, "upcoming" means after payday but within 30 days; otherwise just the next 30 days
+        elif due <= window_end:
+            upcoming_bills.append(item)
+    total_due_before_payday = sum(x['amount'] for x in bills_before_payday)
+
+    return {
+        "total_income": float(total_income),
+        "total_bills": float(total_bills),
+        "remaining": float(remaining),
+        "next_paycheck_label": next_paycheck_label,
+        "bills_before_payday": bills_before_payday,
+        "total_due_before_payday": total_due_before_payday,
+        "payday_date": payday_date,
+        "upcoming_bills": upcoming_bills,
+        "window_end": window_end,
+    }
+
+
+def summary_values(summary: dict) -> dict:
+    """The figures the page patches in place, JSON-ready and formatted the way the template shows them."""
+    def bills(items):
+        return [{"name": i["name"], "due": i["due"].strftime("%b %d"), "amount": round(i["amount"], 2)} for i in items]
+
+    return {
+        "total_income": round(summary["total_income"], 2),
+        "total_bills": round(summary["total_bills"], 2),
+        "remaining": round(summary["remaining"], 2),
+        "next_paycheck_label": summary["next_paycheck_label"],
+        "payday": summary["payday_date"].strftime("%b %d, %Y") if summary["payday_date"] else None,
+        "total_due_before_payday": round(summary["total_due_before_payday"], 2),
+        "bills_before_payday": bills(summary["bills_before_payday"]),
+        "upcoming_bills": bills(summary["upcoming_bills"]),
+    }
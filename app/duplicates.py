@@ -0,0 +1,101 @@
+"""
+Batch reconciliation of the expense duplicate flags.
+
+Import only sets `is_duplicate`/`duplicate_of_id` against what already exists,
+so deleting an original leaves its copies pointing at nothing.
+`reconcile_duplicates()` recomputes every cluster in one statement, with the
+same precedence as the importer. The lowest id per (household, FITID) is the
+original of every other row with that bank transaction id. Rows without such
+a copy fall back to their (household, fingerprint) cluster. Only rows whose
+flags actually change are written.
+"""
+from flask import current_app
+from sqlalchemy import event, select, update, union_all, func, case, and_, or_
+
+from .extensions import db
+from .models import Expense, ExpensePartition
+from .archive import archive_table
+
+
+def _copy_conditions(ranked):
+    """(copy by FITID, copy by fingerprint); NULLs share one partition, so a rank only counts when its key is set."""
+    return (
+        and_(ranked.c.fitid.is_not(None), ranked.c.fitid_rn > 1),
+        and_(ranked.c.fingerprint.is_not(None), ranked.c.fingerprint_rn > 1),
+    )
+
+
+def reconcile_duplicates(conn, household_id: int | None = None) -> int:
+    """Rewrite duplicate flags that disagree with the FITID and fingerprint clusters. Returns rows changed."""
+    live = Expense.__table__
+    branches = [select(live.c.id, live.c.household_id, live.c.fingerprint, live.c.fitid)]
+
+    # Archived Rows Can Still Be The Original Of A Live Copy
+    for (year,) in conn.execute(select(ExpensePartition.year)):
+        table = archive_table(year)
+        branches.append(select(table.c.id, table.c.household_id, table.c.fingerprint, table.c.fitid))
+
+    source = union_all(*branches).subquery("expense_all") if len(branches) > 1 else live
+    by_fingerprint = {"partition_by": (source.c.household_id, source.c.fingerprint), "order_by": source.c.id}
+    by_fitid = {"partition_by": (source.c.household_id, source.c.fitid), "order_by": source.c.id}
+
+    ranked = select(
+        source.c.id,
+        source.c.fingerprint,
+        source.c.fitid,
+        func.row_number().over(**by_fingerprint).label("fingerprint_rn"),
+        func.first_value(source.c.id).over(**by_fingerprint).label("fingerprint_first_id"),
+        func.row_number().over(**by_fitid).label("fitid_rn"),
+        func.first_value(source.c.id).over(**by_fitid).label("fitid_first_id"),
+    ).where(or_(source.c.fingerprint.is_not(None), source.c.fitid.is_not(None)))
+    if household_id is not None:
+        ranked = ranked.where(source.c.household_id == household_id)
+    ranked = ranked.subquery("windowed")
+
+    # Only Copies And Rows Currently Flagged Can Need A Change; Skip Materializing The Rest
+    ranked = select(ranked).where(or_(
+        *_copy_conditions(ranked),
+        ranked.c.id.in_(select(live.c.id).where(live.c.is_duplicate == True)),
+    )).subquery("ranked")
+
+    fitid_copy, fingerprint_copy = _copy_conditions(ranked)
+    is_duplicate = or_(fitid_copy, fingerprint_copy)
+    duplicate_of_id = case(
+        (fitid_copy, ranked.c.fitid_first_id),
+        (fingerprint_copy, ranked.c.fingerprint_first_id),
+        else_=None,
+    )
+
+    result = conn.execute(
+        update(live)
+        .where(live.c.id == ranked.c.id)
+        .where(or_(
+            live.c.is_duplicate != is_duplicate,
+            live.c.duplicate_of_id.is_distinct_from(duplicate_of_id),
+        ))
+        .values(is_duplicate=is_duplicate, duplicate_of_id=duplicate_of_id)
+    )
+    return result.rowcount
+
+
+def request_duplicate_reconcile(household_id: int):
+    """Reconcile this household's duplicates after the current commit, if enabled."""
+    if current_app.config["DUPLICATE_RECONCILE_ON_COMMIT"]:
+        db.session.info.setdefault("reconcile_households", set()).add(household_id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _reconcile_after_commit(session):
+    households = session.info.pop("reconcile_households", None)
+    if not households:
+        return
+
+    # The Session Can't Emit SQL Here, So Use A Connection Of Our Own
+    with db.engine.begin() as conn:
+        for household_id in households:
+            reconcile_duplicates(conn, household_id)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_reconcile(session):
+    session.info.pop("reconcile_households", None)
@@ -0,0 +1,127 @@
+"""
+Batched expense writes for statement imports.
+
+Used by the import page and by `flask expenses import-dir`, which parses files in
+worker processes and writes their rows here, by one writer, in large batches. A
+row whose FITID, or else fingerprint, matches an existing expense is flagged as
+a copy of it. Earlier rows of the same batch count as existing. Every other row
+is scored for unusual amounts (see app/anomalies.py).
+"""
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import select, func, update, bindparam, text
+
+from .extensions import db
+from .models import Expense
+from .anomalies import score_expenses
+from .archive import archive_table, archived_years
+from .categories import CATEGORY_NAME_MAX, ensure_categories
+from .statements import is_statement
+from .utils import expense_fingerprint, normalize_description
+
+# Rows Per Write Transaction
+IMPORT_BATCH_SIZE = 20000
+
+# Values Per IN (...) List When Looking Up Existing Expenses
+ID_CHUNK_SIZE = 500
+
+
+def statement_paths(directory: str) -> list[str]:
+    """Every CSV/OFX/QFX file under `directory`, in a stable order."""
+    return sorted(str(p) for p in Path(directory).rglob("*") if p.is_file() and is_statement(p.name))
+
+
+def _existing_ids(household_id: int, column: str, values: set, years: list[int]) -> dict:
+    """{value: lowest id} of live or archived expenses whose `column` is one of `values`."""
+    found = {}
+    values = list(values)
+    tables = [Expense.__table__] + [archive_table(year) for year in years]
+    for i in range(0, len(values), ID_CHUNK_SIZE):
+        chunk = values[i:i + ID_CHUNK_SIZE]
+        for table in tables:
+            rows = db.session.execute(
+                select(table.c[column], func.min(table.c.id))
+                .where(table.c.household_id == household_id, table.c[column].in_(chunk))
+                .group_by(table.c[column])
+            )
+            for value, expense_id in rows:
+                if value not in found or expense_id < found[value]:
+                    found[value] = expense_id
+    return found
+
+
+def write_expenses(household_id: int, rows: list[dict], commit: bool = True) -> tuple[int, int]:
+    """
+    Insert one batch of parsed rows in a single transaction. Returns (inserted, flagged as duplicates).
+    New categories are committed first (see ensure_categories), so call this before other pending writes.
+    """
+    if not rows:
+        return 0, 0
+
+    # Statement Category Names Become Ids; Names Seen For The First Time Become New Categories
+    names = [" ".join((item.get("category") or "").split())[:CATEGORY_NAME_MAX] or "Uncategorized" for item in rows]
+    category_ids = ensure_categories(household_id, set(names))
+
+    records = []
+    for item, name in zip(rows, names):
+        spent_date = date.fromisoformat(item["spent_date"])
+        amount = float(item["amount"])
+        records.append({
+            "household_id": household_id,
+            "spent_date": spent_date,
+            "description": item["description"],
+            "amount": amount,
+            "category_id": category_ids[name],
+            "fingerprint": expense_fingerprint(spent_date, amount, item["description"]),
+            "merchant": normalize_description(item["description"]),
+            "fitid": item.get("fitid"),
+            "is_duplicate": False,
+            "duplicate_of_id": None,
+        })
+
+    # Only The Archives For Years In This Batch Can Hold A Match: The Fingerprint Includes The Date,
+    # And A Bank Re-Exporting A FITID Reports It With The Same Posting Date
+    batch_years = {r["spent_date"].year for r in records}
+    years = [year for year in archived_years() if year in batch_years]
+    by_fitid = _existing_ids(household_id, "fitid", {r["fitid"] for r in records if r["fitid"]}, years)
+    by_fingerprint = _existing_ids(household_id, "fingerprint", {r["fingerprint"] for r in records}, years)
+
+    # Copies Of Rows Earlier In This Batch: {copy index: original index}, Resolved To Ids After Insert
+    batch_fitid: dict[str, int] = {}
+    batch_fingerprint: dict[str, int] = {}
+    batch_copies: dict[int, int] = {}
+    for i, r in enumerate(records):
+        fitid, fp = r["fitid"], r["fingerprint"]
+        if fitid and fitid in by_fitid:
+            r["duplicate_of_id"] = by_fitid[fitid]
+        elif fitid and fitid in batch_fitid:
+            batch_copies[i] = batch_fitid[fitid]
+        elif fp in by_fingerprint:
+            r["duplicate_of_id"] = by_fingerprint[fp]
+        elif fp in batch_fingerprint:
+            batch_copies[i] = batch_fingerprint[fp]
+        r["is_duplicate"] = r["duplicate_of_id"] is not None or i in batch_copies
+
+        if fitid:
+            batch_fitid.setdefault(fitid, i)
+        batch_fingerprint.setdefault(fp, i)
+
+    score_expenses(household_id, records)
+
+    live = Expense.__table__
+    db.session.execute(live.insert(), records)
+
+    if batch_copies:
+        # This Transaction Holds The Write Lock And Ids Are AUTOINCREMENT, So The Batch Got
+        # Consecutive Ids Ending At The Sequence (RETURNING In Order Would Insert Row By Row)
+        last_id = db.session.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'expense'")).scalar()
+        first_id = last_id - len(records) + 1
+        db.session.execute(
+            update(live).where(live.c.id == bindparam("copy_id")).values(duplicate_of_id=bindparam("original_id")),
+            [{"copy_id": first_id + i, "original_id": first_id + j} for i, j in batch_copies.items()],
+        )
+
+    if commit:
+        db.session.commit()
+    return len(records), sum(1 for r in records if r["is_duplicate"])
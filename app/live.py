@@ -0,0 +1,250 @@
+"""
+Live dashboard updates over server-sent events.
+
+Routes that change bills or paychecks call `publish_change(household_id)`,
+and after their commit the change lands on this process's bus. A watcher
+thread (one per process, running only while someone is subscribed) also
+polls `PRAGMA data_version` on a connection of its own. The value changes
+whenever any other connection commits, whether another worker, the CLI or
+an import. Either way the watcher recomputes the dashboard once per
+affected household and gives every figure that changed a new version.
+
+Streams are generators parked on one shared Condition, so an idle
+subscriber costs a blocked thread and nothing else. When woken, a stream
+sends only the figures newer than the last version it sent. Each event
+carries an SSE id, so a reconnecting browser (Last-Event-ID) gets only
+what it missed.
+
+The dashboard page reads its figures through the same bus. A reload with
+nothing committed since the last one reuses them instead of running the
+queries again.
+"""
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import event
+
+from .extensions import db
+from .dashboard import dashboard_summary, summary_values
+
+# Seconds Between data_version Checks While Anyone Is Subscribed
+LIVE_POLL_INTERVAL = 0.5
+
+# Comment Line Sent To Idle Streams So Proxies Keep Them Open And Dead Clients Are Noticed
+LIVE_KEEPALIVE = 15
+
+# Streams End After This Long; The Browser Reconnects (Maybe To Another Worker) And Resumes
+LIVE_STREAM_SECONDS = 300
+LIVE_RETRY_MS = 2000
+
+log = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    __slots__ = ("today", "summary", "values", "versions", "version")
+
+    def __init__(self, today, summary, values, versions, version):
+        self.today = today
+        self.summary = summary
+        self.values = values
+        self.versions = versions
+        self.version = version
+
+
+class ChangeBus:
+    """Per-app hub between committed changes, the dashboard figures and the SSE streams."""
+
+    def __init__(self, app):
+        self.app = app
+        self.boot = secrets.token_hex(4)
+
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)     # Wakes The Watcher
+        self._changed = threading.Condition(self._lock)  # Wakes The Streams
+        self._version = 0
+        self._snapshots: dict[int, _Snapshot] = {}
+        self._subscribers: dict[int, int] = {}
+        self._dirty: set[int] = set()
+        self._watcher = None
+
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._data_version = None
+
+    def publish(self, household_ids):
+        """Mark households' figures stale and wake the watcher."""
+        with self._lock:
+            self._dirty.update(household_ids)
+            self._work.notify()
+
+    def summary(self, household_id: int, today: date) -> tuple[dict, str]:
+        """(dashboard template variables, stream token) from the cached figures when nothing changed since."""
+        self._check_data_version()
+        with self._lock:
+            snap = self._snapshots.get(household_id)
+            if snap is not None and snap.today == today and household_id not in self._dirty:
+                return snap.summary, self._token(snap.version)
+            self._dirty.discard(household_id)
+
+        snap = self._store(household_id, today, dashboard_summary(household_id, today))
+        return snap.summary, self._token(snap.version)
+
+    def stream(self, household_id: int, since: str):
+        """SSE body: a `dashboard` event with the figures changed after `since`, each time some change."""
+        seen = self._parse_token(since)
+        self._subscribe(household_id)
+        try:
+            yield f"retry: {LIVE_RETRY_MS}\n\n"
+            deadline = time.monotonic() + LIVE_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                with self._lock:
+                    changes, version = self._changes_since(household_id, seen)
+                    wake_by = time.monotonic() + LIVE_KEEPALIVE
+                    while not changes and (remaining := wake_by - time.monotonic()) > 0:
+                        self._changed.wait(remaining)
+                        changes, version = self._changes_since(household_id, seen)
+
+                if not changes:
+                    yield ": keepalive\n\n"
+                    continue
+                seen = version
+                yield f"id: {self._token(version)}\nevent: dashboard\ndata: {json.dumps(changes)}\n\n"
+        finally:
+            self._unsubscribe(household_id)
+
+    def _token(self, version: int) -> str:
+        return f"{self.boot}-{version}"
+
+    def _parse_token(self, token: str) -> int:
+        # Versions From Another Process (Or Before A Restart) Mean Nothing Here: Send Every Figure
+        boot, _, version = (token or "").partition("-")
+        return int(version) if boot == self.boot and version.isdigit() else 0
+
+    def _changes_since(self, household_id: int, seen: int) -> tuple[dict, int]:
+        snap = self._snapshots.get(household_id)
+        if snap is None or snap.version <= seen:
+            return {}, seen
+        return {key: snap.values[key] for key, v in snap.versions.items() if v > seen}, snap.version
+
+    def _store(self, household_id: int, today: date, summary: dict) -> _Snapshot:
+        """Save freshly computed figures, versioning the ones that differ from the last snapshot."""
+        values = summary_values(summary)
+        with self._lock:
+            old = self._snapshots.get(household_id)
+            changed = [key for key, value in values.items() if old is None or old.values.get(key) != value]
+            versions = dict(old.versions) if old else {}
+            if changed:
+                self._version += 1
+                versions.update((key, self._version) for key in changed)
+
+            snap = _Snapshot(today, summary, values, versions, max(versions.values(), default=0))
+            self._snapshots[household_id] = snap
+            if changed and old is not None:
+                self._changed.notify_all()
+            return snap
+
+    def _check_data_version(self) -> bool:
+        """True (and every snapshot marked stale) if another connection committed since the last check."""
+        with self._db_lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.app.config["SQLALCHEMY_DATABASE_URI"].removeprefix("sqlite:///"),
+                                           check_same_thread=False)
+            data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            changed = self._data_version is not None and data_version != self._data_version
+            self._data_version = data_version
+
+        if changed:
+            with self._lock:
+                # Nobody Streams These; Recompute Them On The Next Page Load Instead
+                for household_id in set(self._snapshots) - set(self._subscribers):
+                    del self._snapshots[household_id]
+                self._dirty.update(self._subscribers)
+                self._work.notify()
+        return changed
+
+    def _subscribe(self, household_id: int):
+        with self._lock:
+            self._subscribers[household_id] = self._subscribers.get(household_id, 0) + 1
+            if household_id not in self._snapshots:
+                self._dirty.add(household_id)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="live-dashboard-watcher", daemon=True)
+                self._watcher.start()
+            self._work.notify()
+
+    def _unsubscribe(self, household_id: int):
+        with self._lock:
+            self._subscribers[household_id] -= 1
+            if not self._subscribers[household_id]:
+                del self._subscribers[household_id]
+            self._work.notify()
+
+    def _watch(self):
+        with self.app.app_context():
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._watcher = None
+                        return
+                    self._work.wait_for(lambda: self._dirty & set(self._subscribers) or not self._subscribers,
+                                        timeout=LIVE_POLL_INTERVAL)
+
+                self._check_data_version()
+                today = date.today()
+                with self._lock:
+                    stale = {h for h, snap in self._snapshots.items() if snap.today != today}
+                    households = (self._dirty | stale) & set(self._subscribers)
+                    self._dirty -= households
+
+                for household_id in households:
+                    try:
+                        self._store(household_id, today, dashboard_summary(household_id, today))
+                    except Exception:
+                        log.exception("Live dashboard update failed for household %s", household_id)
+                    finally:
+                        db.session.remove()
+
+    def after_fork(self):
+        """Start over in a forked child (called from the fork hook in app/__init__.py)."""
+        # Threads And SQLite Handles Don't Survive A Fork
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._changed = threading.Condition(self._lock)
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._data_version = None
+        self._watcher = None
+        self._subscribers = {}
+        self._snapshots = {}
+        self._dirty = set()
+
+
+def live_bus() -> ChangeBus:
+    bus = current_app.extensions.get("live_bus")
+    if bus is None:
+        bus = current_app.extensions.setdefault("live_bus", ChangeBus(current_app._get_current_object()))
+    return bus
+
+
+def publish_change(household_id: int):
+    """Tell dashboard streams this household changed, once the current commit succeeds."""
+    db.session.info.setdefault("changed_households", set()).add(household_id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_after_commit(session):
+    households = session.info.pop("changed_households", None)
+    bus = current_app.extensions.get("live_bus") if households else None
+    if bus is not None:
+        bus.publish(households)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("changed_households", None)
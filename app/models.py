@@ -1,22 +1,61 @@
 from datetime import date
 from .extensions import db
 
+DEFAULT_HOUSEHOLD_ID = 1
+
+class Household(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+
+    name = db.Column(db.String(120), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    # Bumped On Every Category Add/Rename So Cached Name/Id Maps Know They're Stale
+    categories_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class Category(db.Model):
+    """A household's expense category. Rows point at it by id, so a rename touches only this row (see app/categories.py)."""
+    __table_args__ = (
+        db.Index("ix_category_household_name", "household_id", "name", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
+
+    name = db.Column(db.String(50), nullable=False)
+    is_income = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false()) # Where Deposits Land; Survives Renames
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
 class Bill(db.Model):
+    __table_args__ = (
+        db.Index("ix_bill_household_active", "household_id", "is_active", "due_day"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
 
     name = db.Column(db.String(120), nullable=False)
-    category = db.Column(db.String(50), nullable=False, default="Other")
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
 
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     due_day = db.Column(db.Integer, nullable=False) # 1-31
 
+    # See BILL_RECURRENCES; anchor_date Is The First Due Date (Weekly/Biweekly) Or Sets The Months (Quarterly/Annual)
+    recurrence = db.Column(db.String(20), nullable=False, default="monthly", server_default="monthly")
+    anchor_date = db.Column(db.Date, nullable=True)
+    roll_forward_weekend = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     create_at = db.Column(db.Date, nullable=False, default=date.today)
 
     paid_through = db.Column(db.Date, nullable=True)
 
 class Paycheck(db.Model):
+    __table_args__ = (
+        db.Index("ix_paycheck_household_pay_date", "household_id", "pay_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
 
     source = db.Column(db.String(120), nullable=False) # e.g. Job, Side Gig
     amount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -26,23 +65,125 @@ class Paycheck(db.Model):
     created_at = db.Column(db.Date, nullable=False, default=date.today)
     
 class Expense(db.Model):
+    __table_args__ = (
+        db.Index("ix_expense_household_spent_date", "household_id", "spent_date", "id"),
+        db.Index("ix_expense_household_fingerprint", "household_id", "fingerprint"),
+        db.Index("ix_expense_household_duplicate", "household_id", "is_duplicate", "spent_date"),
+        db.Index("ix_expense_household_fitid", "household_id", "fitid"),
+        db.Index("ix_expense_household_category_date", "household_id", "category_id", "spent_date"),
+        db.Index("ix_expense_household_merchant", "household_id", "merchant"),
+        # Partial: Only Flagged Rows Are Indexed (See app/anomalies.py)
+        db.Index("ix_expense_household_flagged", "household_id", "spent_date", "id",
+                 sqlite_where=db.text("anomaly_score IS NOT NULL")),
+        # Ids Must Never Be Reused: Archives, The Undo Log And Duplicate Pointers Keep Them
+        {"sqlite_autoincrement": True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
     
     spent_date = db.Column(db.Date, nullable=False)
     description = db.Column(db.String(255), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     
-    category = db.Column(db.String(50), nullable=False, default="Uncategorized")
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
     
     created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
-    fingerprint = db.Column(db.String(64), nullable=True, index=True)
+    fingerprint = db.Column(db.String(64), nullable=True)
+    fitid = db.Column(db.String(255), nullable=True) # Bank's Transaction Id (OFX/QFX Imports)
     is_duplicate = db.Column(db.Boolean, nullable=False, default=False)
     duplicate_of_id = db.Column(db.Integer, nullable=True) 
+
+    # Standard Deviations Above Normal When Imported; NULL Unless Flagged
+    anomaly_score = db.Column(db.Float, nullable=True)
+
+    # normalize_description(description): Recurring-Charge Detection Loads A Merchant's Charges By It
+    merchant = db.Column(db.String(255), nullable=True)
  
 class PaySchedule(db.Model):
+     __table_args__ = (
+         db.Index("ix_pay_schedule_household", "household_id", "id"),
+     )
+
      id = db.Column(db.Integer, primary_key=True)
+     household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
      anchor_payday = db.Column(db.Date, nullable=False) # A Real PayDay Friday
      created_at = db.Column(db.DateTime, server_default=db.func.now())
-     
 
-    
\ No newline at end of file
+class ExpensePartition(db.Model):
+    """One row per yearly `expense_archive_<year>` table (see app/archive.py)."""
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+class BulkAction(db.Model):
+    """A filter-wide bulk edit that can be undone (see app/bulk.py)."""
+    __table_args__ = (
+        db.Index("ix_bulk_action_household", "household_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
+
+    kind = db.Column(db.String(20), nullable=False) # category | delete
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=True) # New category for "category" actions
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+    undone_at = db.Column(db.DateTime, nullable=True)
+
+class BulkActionRow(db.Model):
+    """Previous category of one expense touched by a "category" bulk action."""
+    action_id = db.Column(db.Integer, db.ForeignKey("bulk_action.id"), primary_key=True)
+    expense_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    category_id = db.Column(db.Integer, nullable=False)
+
+class DeletedExpense(db.Model):
+    """Expense removed by a "delete" bulk action, kept until the action is pruned."""
+    action_id = db.Column(db.Integer, db.ForeignKey("bulk_action.id"), primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    household_id = db.Column(db.Integer, nullable=False)
+
+    spent_date = db.Column(db.Date, nullable=False)
+    description = db.Column(db.String(255), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+
+    created_at = db.Column(db.DateTime, nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=True)
+    fitid = db.Column(db.String(255), nullable=True)
+    is_duplicate = db.Column(db.Boolean, nullable=False)
+    duplicate_of_id = db.Column(db.Integer, nullable=True)
+    anomaly_score = db.Column(db.Float, nullable=True)
+    merchant = db.Column(db.String(255), nullable=True)
+
+    archive_year = db.Column(db.Integer, nullable=True) # Yearly Archive Table It Came From; NULL For `expense`
+
+class StatementImport(db.Model):
+    """A statement file imported in full, keyed by the SHA-256 of its bytes (see app/uploads.py)."""
+    __table_args__ = (
+        db.Index("ix_statement_import_household_sha256", "household_id", "sha256", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), nullable=False)
+
+    sha256 = db.Column(db.String(64), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    duplicate_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+
+    imported_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+
+class ExpenseStat(db.Model):
+    """Running count, mean and M2 of expense amounts per category or merchant (see app/anomalies.py)."""
+    household_id = db.Column(db.Integer, db.ForeignKey("household.id"), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True) # category | merchant
+    key = db.Column(db.String(255), primary_key=True) # Category id, or normalized description
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+    mean = db.Column(db.Float, nullable=False, default=0)
+    m2 = db.Column(db.Float, nullable=False, default=0)
@@ -0,0 +1,346 @@
+"""
+Query-plan snapshots for every route.
+
+`flask query-plans check` builds a scratch database from the migrations and
+fills it with a few years of synthetic expenses, bills and paychecks
+(ANALYZEd, like a maintained database). It then drives every route in
+routes.py through the test client. Each SELECT/INSERT/UPDATE/DELETE that a
+request issues goes through EXPLAIN QUERY PLAN as it runs.
+
+Plans are grouped by endpoint and stored in query_plans/<endpoint>.txt, so
+a diff of those files shows exactly which statement's plan changed. Queries
+on the hot paths (HOT_QUERIES) must not fall back to a full table SCAN.
+"""
+import difflib
+import io
+import os
+import random
+import re
+import shutil
+import tempfile
+from datetime import date, timedelta
+
+from flask import request, has_request_context, url_for
+from flask_migrate import upgrade
+from sqlalchemy import event, select, text
+
+from . import create_app
+from .extensions import db
+from .models import Bill, BulkAction, Expense, Household, Paycheck, PaySchedule, Category, DEFAULT_HOUSEHOLD_ID
+from .archive import archive_expenses
+from .categories import ensure_category, seed_categories
+from .constants import EXPENSE_CATEGORIES
+from .importer import IMPORT_BATCH_SIZE, write_expenses
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "query_plans")
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations")
+
+# Synthetic Expenses In The Scratch Database (Spread Over This Year And The Three Before)
+PLAN_ROWS = 20000
+PLAN_SEED = 7
+
+# Archive Tables Show Up In Snapshots Under One Name, Whatever Year It Is
+ARCHIVE_NAME_RE = re.compile(r"expense_archive_\d{4}")
+ARCHIVE_NAME = "expense_archive_YYYY"
+EXPENSE_TABLES = ("expense", ARCHIVE_NAME)
+
+# (label, endpoint, tables that must always be read through an index)
+HOT_QUERIES = (
+    ("expenses range", "main.expenses", EXPENSE_TABLES),
+    ("expenses range", "main.expenses_rows", EXPENSE_TABLES),
+    ("fingerprint lookup", "main.expenses_import", EXPENSE_TABLES),
+    ("dashboard aggregates", "main.dashboard", ("expense", "paycheck", "bill")),
+    ("paycheck ordering", "main.paychecks", ("paycheck",)),
+    ("deposit matching", "main.paycheck_reconciliation", EXPENSE_TABLES + ("paycheck",)),
+)
+
+EXPLAINABLE_RE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+IN_LIST_RE = re.compile(r"\?(?:, \?)+")
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+
+MERCHANTS = ("Grocer", "Gas Station", "Cafe", "Pharmacy", "Streaming", "Hardware", "Bookshop", "Airline")
+
+
+def normalize_sql(statement: str) -> str:
+    """One line per statement; IN lists and archive table names don't depend on the data."""
+    sql = " ".join(statement.split())
+    sql = IN_LIST_RE.sub("?, ...", sql)
+    return ARCHIVE_NAME_RE.sub(ARCHIVE_NAME, sql)
+
+
+def render_plan(rows) -> list[str]:
+    """EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as indented lines."""
+    depth = {}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + ARCHIVE_NAME_RE.sub(ARCHIVE_NAME, detail))
+    return lines
+
+
+class PlanRecorder:
+    """Engine listener collecting {endpoint: {sql: plan lines}} for statements issued inside requests."""
+
+    def __init__(self):
+        self.plans: dict[str, dict[str, list[str]]] = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context() or not request.endpoint or not EXPLAINABLE_RE.match(statement):
+            return
+
+        sql = normalize_sql(statement)
+        statements = self.plans.setdefault(request.endpoint, {})
+        if sql in statements:
+            return
+
+        # Real executemany Passes A List Of Rows; Batched INSERT ... RETURNING Passes One Row With executemany Set
+        params = parameters
+        if executemany and parameters and isinstance(parameters[0], (tuple, list, dict)):
+            params = parameters[0]
+        rows = conn.connection.driver_connection.execute("EXPLAIN QUERY PLAN " + statement, params or ()).fetchall()
+        statements[sql] = render_plan(rows)
+
+
+def collect_plans(rows: int = PLAN_ROWS) -> tuple[dict, list[str]]:
+    """
+    Plans of every statement each route issues against a freshly seeded scratch database.
+    Returns ({endpoint: {sql: plan lines}}, endpoints of routes.py the run never reached).
+    """
+    scratch = tempfile.mkdtemp(prefix="query-plans-")
+    try:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(scratch, "plans.db"),
+            "TESTING": True,
+            "TEMPLATE_WARMUP": False,
+        })
+        # Uploads And Previews Go To The Scratch Folder Too
+        app.instance_path = scratch
+
+        hit = set()
+        app.before_request(lambda: hit.add(request.endpoint))
+
+        recorder = PlanRecorder()
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+            _seed(rows, random.Random(PLAN_SEED))
+            event.listen(db.engine, "before_cursor_execute", recorder)
+            try:
+                _drive_routes(app)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", recorder)
+            db.session.remove()
+            db.engine.dispose()
+
+        routes = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.startswith("main.")}
+        plans = {endpoint: recorder.plans.get(endpoint, {}) for endpoint in sorted(hit)}
+        return plans, sorted(routes - hit)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def hot_scans(plans: dict) -> list[str]:
+    """A message per full table scan in a hot query."""
+    problems = []
+    for label, endpoint, tables in HOT_QUERIES:
+        for sql, lines in plans.get(endpoint, {}).items():
+            for line in lines:
+                m = FULL_SCAN_RE.match(line.strip())
+                if m and m.group(1) in tables:
+                    problems.append(f"{label} ({endpoint}) scans {m.group(1)} without an index:\n  {sql}")
+    return problems
+
+
+def snapshot_text(endpoint: str, statements: dict) -> str:
+    parts = [f"-- {endpoint}\n"]
+    if not statements:
+        parts.append("-- (no statements)\n")
+    for sql, lines in statements.items():
+        parts.append("\n" + sql + "\n" + "".join(f"    {line}\n" for line in lines))
+    return "".join(parts)
+
+
+def snapshot_diffs(plans: dict, directory: str = SNAPSHOT_DIR) -> list[str]:
+    """Unified diffs between stored snapshots and `plans` (stale snapshot files count as removed)."""
+    diffs = []
+    stored = {name[:-len(".txt")] for name in os.listdir(directory) if name.endswith(".txt")} if os.path.isdir(directory) else set()
+    for endpoint in sorted(stored | set(plans)):
+        path = os.path.join(directory, endpoint + ".txt")
+        old = open(path).read().splitlines(keepends=True) if endpoint in stored else []
+        new = snapshot_text(endpoint, plans[endpoint]).splitlines(keepends=True) if endpoint in plans else []
+        if old != new:
+            diffs.append("".join(difflib.unified_diff(old, new, f"a/query_plans/{endpoint}.txt", f"b/query_plans/{endpoint}.txt")))
+    return diffs
+
+
+def write_snapshots(plans: dict, directory: str = SNAPSHOT_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".txt") and name[:-len(".txt")] not in plans:
+            os.remove(os.path.join(directory, name))
+    for endpoint, statements in plans.items():
+        with open(os.path.join(directory, endpoint + ".txt"), "w") as f:
+            f.write(snapshot_text(endpoint, statements))
+
+
+def _seed(rows: int, rng: random.Random):
+    """Years of expenses (two of them archived), bills, paychecks and a second household, then ANALYZE."""
+    today = date.today()
+    start = date(today.year - 3, 1, 1)
+    span = (today - start).days
+
+    def expense_rows(count, fitid_prefix):
+        batch = []
+        for i in range(count):
+            batch.append({
+                "spent_date": (start + timedelta(days=rng.randrange(span + 1))).isoformat(),
+                "description": f"{rng.choice(MERCHANTS)} #{rng.randrange(40)}",
+                "amount": round(rng.uniform(3, 250), 2),
+                "category": rng.choice(EXPENSE_CATEGORIES),
+                "fitid": f"{fitid_prefix}{i}" if i % 3 == 0 else None,
+            })
+            # Some Statements Overlap, So Some Rows Arrive Twice
+            if i % 50 == 0:
+                batch.append(dict(batch[-1], fitid=None))
+        return batch
+
+    other = Household(name="Other")
+    db.session.add(other)
+    db.session.commit()
+    seed_categories(other.id)
+
+    for household_id, count, prefix in ((DEFAULT_HOUSEHOLD_ID, rows, "SEED"), (other.id, rows // 20, "OTHER")):
+        batch = expense_rows(count, prefix)
+        for i in range(0, len(batch), IMPORT_BATCH_SIZE):
+            write_expenses(household_id, batch[i:i + IMPORT_BATCH_SIZE])
+
+        for name, category, recurrence in (("Rent", "Bills", "monthly"), ("Gym", "Other", "monthly"),
+                                           ("Insurance", "Bills", "quarterly"), ("Cleaner", "Other", "biweekly")):
+            db.session.add(Bill(
+                household_id=household_id, name=name, category_id=ensure_category(household_id, category),
+                amount=rng.randrange(20, 1500), due_day=rng.randrange(1, 29), recurrence=recurrence,
+                anchor_date=start, is_active=True,
+            ))
+
+        friday = start + timedelta(days=(4 - start.weekday()) % 7)
+        db.session.add(PaySchedule(household_id=household_id, anchor_payday=friday))
+        while friday <= today + timedelta(days=60):
+            db.session.add(Paycheck(household_id=household_id, source="Job", amount=2400, pay_date=friday))
+            friday += timedelta(days=14)
+        db.session.commit()
+
+    archive_expenses(date(today.year - 1, 1, 1))
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def _drive_routes(app):
+    """Call every route in routes.py, the expenses filter in several shapes."""
+    client = app.test_client()
+    today = date.today()
+
+    def call(method, endpoint, values=None, **kwargs):
+        with app.test_request_context():
+            path = url_for(endpoint, **(values or {}))
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}")
+        return response
+
+    def newest(model, **filters):
+        return db.session.execute(
+            select(model.id).filter_by(household_id=DEFAULT_HOUSEHOLD_ID, **filters).order_by(model.id.desc()).limit(1)
+        ).scalar()
+
+    category_id = db.session.execute(
+        select(Category.id).where(Category.household_id == DEFAULT_HOUSEHOLD_ID, Category.name == "Groceries")
+    ).scalar()
+
+    call("GET", "main.dashboard")
+    # The Stream Blocks Until Something Changes; Only Its Response Is Checked
+    call("GET", "main.dashboard_events").close()
+    for values in ({}, {"preset": "all_time"}, {"preset": "last_90"}, {"preset": "this_pay_period"},
+                   {"preset": "all_time", "show": "dupes"}, {"preset": "all_time", "show": "flagged"},
+                   {"preset": "all_time", "category_id": category_id}):
+        call("GET", "main.expenses", values)
+    first_page = call("GET", "main.expenses_rows", {"preset": "all_time"})
+    call("GET", "main.expenses_rows", {"preset": "all_time", "cursor": first_page.headers["X-Next-Cursor"]})
+
+    # Form Upload: Half The Rows Are Already Stored, So Their Fingerprints Match
+    existing = db.session.execute(
+        select(Expense.spent_date, Expense.description, Expense.amount)
+        .where(Expense.household_id == DEFAULT_HOUSEHOLD_ID).order_by(Expense.id.desc()).limit(20)
+    ).all()
+    lines = [f"{d.isoformat()},{desc},{amount}" for d, desc, amount in existing]
+    lines += [f"{today.isoformat()},Plan check {i},{i}.25" for i in range(20)]
+    csv_body = ("date,description,amount\n" + "\n".join(lines) + "\n").encode()
+
+    call("GET", "main.expenses_upload")
+    call("POST", "main.expenses_upload_post", data={"file": (io.BytesIO(csv_body), "plans.csv")},
+         content_type="multipart/form-data")
+    call("GET", "main.expenses_preview")
+    call("POST", "main.expenses_import")
+
+    # Resumable Upload Of An OFX Statement Repeating Stored FITIDs
+    transactions = "".join(
+        f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>{today:%Y%m%d}<TRNAMT>-{i}.10<FITID>SEED{i * 3}<NAME>Plan check OFX {i}</STMTTRN>\n"
+        for i in range(10)
+    )
+    ofx_body = f"OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKTRANLIST>\n{transactions}</BANKTRANLIST></OFX>\n".encode()
+    started = call("POST", "main.start_statement_upload", json={"filename": "plans.ofx", "size": len(ofx_body)}).get_json()
+    upload = {"upload_id": started["upload_id"]}
+    call("GET", "main.statement_upload_status", upload)
+    call("PUT", "main.put_statement_chunk", upload, data=ofx_body, headers={"Upload-Offset": "0"})
+    call("POST", "main.complete_statement_upload", upload)
+    call("POST", "main.expenses_import")
+
+    # Categorize, Bulk Edits And Their Undo
+    expense_ids = db.session.scalars(
+        select(Expense.id).where(Expense.household_id == DEFAULT_HOUSEHOLD_ID).order_by(Expense.id.desc()).limit(4)
+    ).all()
+    filters = {"preset": "last_90", "show": "all", "category_id": category_id}
+    # Row Changes As The Expenses Page Script Sends Them: A Fragment Request Carrying The Page's Filter
+    page_filter = {"preset": "all_time"}
+    call("POST", "main.update_expense_category", {"expense_id": expense_ids[0], **page_filter},
+         data={"category": "Groceries"}, headers={"X-Requested-With": "fetch"})
+    call("POST", "main.bulk_update_expense_category", data={"category": "Travel", "expense_ids": expense_ids[:2]})
+    call("POST", "main.bulk_update_matching_category", data={"category": "Travel", **filters})
+    call("POST", "main.undo_bulk_action", {"action_id": newest(BulkAction)})
+    call("POST", "main.bulk_delete_matching_expenses", data=filters)
+    call("POST", "main.undo_bulk_action", {"action_id": newest(BulkAction)})
+    call("POST", "main.delete_expense", {"expense_id": expense_ids[2], **page_filter}, headers={"X-Requested-With": "fetch"})
+    call("POST", "main.bulk_delete_expenses", data={"expense_ids": expense_ids[3:]})
+
+    # Bills
+    bill_form = {"name": "Plan check", "category": "Utilities", "amount": "42", "due_day": "12", "recurrence": "monthly"}
+    call("GET", "main.bills")
+    call("GET", "main.bill_suggestions")
+    call("POST", "main.create_bill", data=bill_form)
+    bill = {"bill_id": newest(Bill)}
+    call("GET", "main.edit_bill", bill)
+    call("POST", "main.update_bill", bill, data=dict(bill_form, amount="45"))
+    call("POST", "main.mark_bill_paid", bill)
+    call("POST", "main.mark_bill_unpaid", bill)
+    call("POST", "main.delete_bill", bill)
+
+    # Paychecks
+    paycheck_form = {"source": "Plan check", "amount": "100", "pay_date": today.isoformat()}
+    call("GET", "main.paychecks")
+    call("POST", "main.create_paycheck", data=paycheck_form)
+    paycheck = {"paycheck_id": newest(Paycheck)}
+    call("GET", "main.edit_paycheck", paycheck)
+    call("POST", "main.update_paycheck", paycheck, data=dict(paycheck_form, amount="120"))
+    call("POST", "main.delete_paycheck", paycheck)
+    call("GET", "main.paycheck_reconciliation")
+    call("POST", "main.create_paychecks_from_reconcile")
+
+    # Settings
+    friday = today + timedelta(days=(4 - today.weekday()) % 7)
+    call("GET", "main.pay_schedule_settings")
+    call("POST", "main.pay_schedule_settings", data={"anchor_payday": friday.isoformat()})
+    call("GET", "main.category_settings")
+    call("POST", "main.category_settings", data={"name": "Plan check"})
+    call("POST", "main.rename_household_category", {"category_id": category_id}, data={"name": "Food"})
+    call("GET", "main.household_settings")
+    call("POST", "main.household_settings", data={"name": "Plan check"})
+    call("POST", "main.switch_household", {"household_id": DEFAULT_HOUSEHOLD_ID})
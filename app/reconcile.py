@@ -0,0 +1,156 @@
+"""
+Paycheck reconciliation.
+
+Paychecks are entered by hand, while the same deposits arrive through
+statement imports as expenses in the income category (`Category.is_income`,
+"Income" unless renamed). Being money in, a deposit's amount is negative
+(charges are positive), so a $2,400 paycheck pairs with a -2400.00 deposit.
+This module pairs them by amount and date.
+
+Both sides are read in date order straight off their (household, ..., date)
+indexes. The live expense table and each yearly archive come back already
+sorted, and `heapq.merge` joins them. One pass over the two sorted streams
+then does the matching. Deposits enter a window when they come within
+`DATE_TOLERANCE_DAYS` after a paycheck, and leave it as extras once they fall
+that far behind. Each paycheck takes the nearest deposit in the window with
+a close enough amount. The work is the sort the indexes already did, plus a
+linear pass. Decades of history run in milliseconds.
+"""
+import heapq
+from collections import deque
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from .extensions import db
+from .models import Expense, Paycheck, PaySchedule
+from .archive import archive_table, archived_years
+from .categories import income_category_id
+
+# A Deposit Can Post A Few Days Before Or After The Pay Date
+DATE_TOLERANCE_DAYS = 3
+
+# Amounts Must Agree To The Cent
+AMOUNT_TOLERANCE_CENTS = 1
+
+PAY_PERIOD_DAYS = 14
+
+# Longest Paycheck Source Column
+SOURCE_MAX = 120
+
+
+def _cents(amount) -> int:
+    return round(float(amount) * 100)
+
+
+def _paychecks(household_id: int):
+    """(id, source, amount, pay_date) of every paycheck, oldest first."""
+    return db.session.execute(
+        select(Paycheck.id, Paycheck.source, Paycheck.amount, Paycheck.pay_date)
+        .where(Paycheck.household_id == household_id)
+        .order_by(Paycheck.pay_date.asc(), Paycheck.id.asc())
+    ).all()
+
+
+def _deposits(household_id: int):
+    """(id, spent_date, description, amount) of every non-duplicate income expense, live or archived, oldest first."""
+    income_id = income_category_id(household_id)
+    if income_id is None:
+        return []
+
+    streams = []
+    for table in [Expense.__table__] + [archive_table(year) for year in archived_years()]:
+        streams.append(db.session.execute(
+            select(table.c.id, table.c.spent_date, table.c.description, table.c.amount)
+            .where(
+                table.c.household_id == household_id,
+                table.c.category_id == income_id,
+                table.c.is_duplicate == False,
+            )
+            .order_by(table.c.spent_date.asc(), table.c.id.asc())
+        ).all())
+    return list(heapq.merge(*streams, key=lambda row: (row.spent_date, row.id)))
+
+
+def match_paychecks(paychecks, deposits, date_tolerance: int = DATE_TOLERANCE_DAYS,
+                    amount_tolerance: int = AMOUNT_TOLERANCE_CENTS) -> dict:
+    """
+    Pair date-ordered paychecks with date-ordered deposits in one merge pass.
+    Returns {"matched": [(paycheck, deposit)], "missing": [paycheck], "extra": [deposit]}.
+    """
+    tolerance = timedelta(days=date_tolerance)
+    matched, missing, extra = [], [], []
+    window = deque()
+    d = 0
+
+    for paycheck in paychecks:
+        # Deposits Too Old For This Paycheck Are Too Old For Every Later One
+        while window and window[0].spent_date < paycheck.pay_date - tolerance:
+            extra.append(window.popleft())
+        while d < len(deposits) and deposits[d].spent_date <= paycheck.pay_date + tolerance:
+            if deposits[d].spent_date < paycheck.pay_date - tolerance:
+                extra.append(deposits[d])
+            else:
+                window.append(deposits[d])
+            d += 1
+
+        # Nearest Date Wins, Then The Closer Amount
+        want = _cents(paycheck.amount)
+        best = None
+        for i, deposit in enumerate(window):
+            off = _cents(-deposit.amount) - want
+            if abs(off) > amount_tolerance:
+                continue
+            rank = (abs((deposit.spent_date - paycheck.pay_date).days), abs(off))
+            if best is None or rank < best[0]:
+                best = (rank, i)
+
+        if best is None:
+            missing.append(paycheck)
+        else:
+            matched.append((paycheck, window[best[1]]))
+            del window[best[1]]
+
+    extra.extend(window)
+    extra.extend(deposits[d:])
+    return {"matched": matched, "missing": missing, "extra": extra}
+
+
+def reconcile_paychecks(household_id: int) -> dict:
+    """Match every paycheck of a household against its imported deposits (see `match_paychecks`)."""
+    return match_paychecks(_paychecks(household_id), _deposits(household_id))
+
+
+def near_payday(day: date, anchor: date, tolerance: int = DATE_TOLERANCE_DAYS) -> bool:
+    """True if `day` is within `tolerance` days of a bi-weekly payday counted from `anchor`."""
+    offset = (day - anchor).days % PAY_PERIOD_DAYS
+    return min(offset, PAY_PERIOD_DAYS - offset) <= tolerance
+
+
+def create_paychecks_from_deposits(household_id: int) -> int | None:
+    """
+    Add a paycheck for each unmatched deposit landing on a scheduled payday.
+    Returns how many were added (not yet committed), or None without a pay schedule.
+    """
+    schedule = (
+        PaySchedule.query
+        .filter(PaySchedule.household_id == household_id)
+        .order_by(PaySchedule.id.desc())
+        .first()
+    )
+    if schedule is None:
+        return None
+
+    report = reconcile_paychecks(household_id)
+    added = 0
+    for deposit in report["extra"]:
+        if not near_payday(deposit.spent_date, schedule.anchor_payday):
+            continue
+        db.session.add(Paycheck(
+            household_id=household_id,
+            source=(deposit.description or "Deposit")[:SOURCE_MAX],
+            amount=-deposit.amount,
+            pay_date=deposit.spent_date,
+        ))
+        added += 1
+    return added
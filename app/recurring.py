@@ -0,0 +1,177 @@
+"""
+Recurring-charge detection.
+
+Expenses are grouped by merchant (`expense.merchant`, the description
+normalized the same way as `expense_fingerprint`). A first pass reads the
+per-merchant running amount stats that anomaly scoring already keeps in
+`expense_stat` (see app/anomalies.py). It keeps only merchants with enough
+charges and a steady amount, without scanning the expenses at all. Only
+those merchants' charges are then loaded, through the (household, merchant)
+indexes, and their intervals are summarized with NumPy, all merchants at
+once. A merchant whose interval matches a period and whose amount is steady
+becomes a Bill suggestion.
+
+The stats cover every non-duplicate charge as it was imported: deletes don't
+take charges back out, and income counts too. The first pass only narrows
+the search; the second judges each merchant's charges as they are now. A
+merchant whose odd charges were deleted can still look unsteady to the first.
+"""
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select, func
+
+from .extensions import db
+from .models import Bill, Expense, ExpenseStat
+from .archive import archive_table, archived_years
+from .categories import income_category_id
+from .utils import normalize_description
+
+# (frequency, period in days, allowed deviation in days, minimum charges)
+PATTERNS = (
+    ("weekly", 7.0, 1.5, 4),
+    ("monthly", 30.44, 3.5, 3),
+    ("annual", 365.25, 10.0, 3),
+)
+
+# Charges Must Stay Within 10% Of Their Average
+AMOUNT_TOLERANCE = 0.10
+
+# julianday() Of 0001-01-01 Is 1721425.5 While date.toordinal() Of It Is 1
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+# Merchants Per IN (...) List When Fetching Candidate Charges
+MERCHANT_CHUNK_SIZE = 500
+
+
+def _charge_tables():
+    return [Expense.__table__] + [archive_table(year) for year in archived_years()]
+
+
+def _charge_conditions(table, household_id: int, income_id: int | None) -> list:
+    """Non-duplicate, non-income charges of one household."""
+    conditions = [
+        table.c.household_id == household_id,
+        table.c.is_duplicate == False,
+    ]
+    if income_id is not None:
+        conditions.append(table.c.category_id != income_id)
+    return conditions
+
+
+def _candidate_merchants(household_id: int) -> list[str]:
+    """
+    Merchants that could be recurring, judged from their running amount stats alone:
+    enough charges, and a standard deviation (sqrt(m2 / count)) within AMOUNT_TOLERANCE of the mean.
+    """
+    return db.session.scalars(
+        select(ExpenseStat.key).where(
+            ExpenseStat.household_id == household_id,
+            ExpenseStat.kind == "merchant",
+            ExpenseStat.count >= min(min_count for *_, min_count in PATTERNS),
+            # Squared Both Sides: m2 / count <= (AMOUNT_TOLERANCE * mean)^2
+            ExpenseStat.m2 <= ExpenseStat.count * AMOUNT_TOLERANCE ** 2 * ExpenseStat.mean * ExpenseStat.mean,
+        )
+    ).all()
+
+
+def _charges(household_id: int, merchants: list[str]):
+    """(merchant, description, julian day, amount) of the given merchants' charges, live or archived."""
+    income_id = income_category_id(household_id)
+    rows = []
+    for i in range(0, len(merchants), MERCHANT_CHUNK_SIZE):
+        chunk = merchants[i:i + MERCHANT_CHUNK_SIZE]
+        for table in _charge_tables():
+            rows += db.session.execute(
+                select(table.c.merchant, table.c.description, func.julianday(table.c.spent_date), table.c.amount)
+                .where(*_charge_conditions(table, household_id, income_id), table.c.merchant.in_(chunk))
+            ).all()
+    return rows
+
+
+def detect_recurring(household_id: int, today: date) -> list[dict]:
+    """
+    Bill suggestions for merchants charged on a weekly, monthly or annual rhythm.
+    Merchants that already have a bill with the same normalized name are skipped.
+    """
+    rows = _charges(household_id, _candidate_merchants(household_id))
+    if len(rows) < 2:
+        return []
+
+    merchants, descriptions, julian_days, amounts = zip(*rows)
+
+    # Rows -> Merchant Codes, And Description Codes For Naming Each Suggestion After Its Last Charge
+    merchant_codes: dict[str, int] = {}
+    merchant = np.fromiter(
+        (merchant_codes.setdefault(m, len(merchant_codes)) for m in merchants), dtype=np.int64, count=len(rows)
+    )
+    desc_codes: dict[str, int] = {}
+    desc_idx = np.fromiter(
+        (desc_codes.setdefault(d, len(desc_codes)) for d in descriptions), dtype=np.int64, count=len(rows)
+    )
+    days = (np.asarray(julian_days, dtype=np.float64) - JULIAN_ORDINAL_OFFSET).astype(np.int64)
+    amount = np.asarray(amounts, dtype=np.float64)
+
+    # Sort By (Merchant, Day) So Each Merchant's Charges Are Contiguous And In Order
+    order = np.lexsort((days, merchant))
+    merchant, days, amount, desc_idx = merchant[order], days[order], amount[order], desc_idx[order]
+    groups = len(merchant_codes)
+
+    count = np.bincount(merchant, minlength=groups)
+    amount_mean = np.bincount(merchant, weights=amount, minlength=groups) / count
+    amount_var = np.bincount(merchant, weights=amount * amount, minlength=groups) / count - amount_mean ** 2
+    amount_std = np.sqrt(np.clip(amount_var, 0, None))
+
+    # Intervals Between Consecutive Charges Of The Same Merchant
+    same = merchant[1:] == merchant[:-1]
+    gap_merchant = merchant[1:][same]
+    gaps = np.diff(days)[same].astype(np.float64)
+    gap_count = np.bincount(gap_merchant, minlength=groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap_mean = np.bincount(gap_merchant, weights=gaps, minlength=groups) / gap_count
+        gap_var = np.bincount(gap_merchant, weights=gaps * gaps, minlength=groups) / gap_count - gap_mean ** 2
+    gap_std = np.sqrt(np.clip(gap_var, 0, None))
+
+    # Last Charge Per Merchant (The Final Row Of Each Contiguous Run)
+    last_pos = np.flatnonzero(np.r_[merchant[1:] != merchant[:-1], True])
+    last_day = np.zeros(groups, dtype=np.int64)
+    last_day[merchant[last_pos]] = days[last_pos]
+    last_desc = np.zeros(groups, dtype=np.int64)
+    last_desc[merchant[last_pos]] = desc_idx[last_pos]
+    last_amount = np.zeros(groups, dtype=np.float64)
+    last_amount[merchant[last_pos]] = amount[last_pos]
+
+    steady = amount_std <= AMOUNT_TOLERANCE * np.abs(amount_mean)
+    frequency = np.full(groups, "", dtype=object)
+    for name, period, tolerance, min_count in PATTERNS:
+        matches = (
+            (frequency == "")
+            & (count >= min_count)
+            & (np.abs(gap_mean - period) <= tolerance)
+            & (gap_std <= tolerance)
+            & steady
+            # Still Active: The Next Charge Isn't Long Overdue
+            & (today.toordinal() - last_day <= period + 2 * tolerance)
+        )
+        frequency[matches] = name
+
+    billed = {normalize_description(name) for (name,) in db.session.query(Bill.name).filter(Bill.household_id == household_id)}
+    merchant_names = list(merchant_codes)
+    desc_names = list(desc_codes)
+
+    suggestions = []
+    for g in np.flatnonzero(frequency != ""):
+        if merchant_names[g] in billed:
+            continue
+        last = date.fromordinal(int(last_day[g]))
+        suggestions.append({
+            "name": desc_names[last_desc[g]],
+            "frequency": frequency[g],
+            "amount": round(float(last_amount[g]), 2),
+            "due_day": last.day,
+            "charges": int(count[g]),
+            "last_date": last,
+        })
+
+    suggestions.sort(key=lambda s: (s["frequency"], s["name"].lower()))
+    return suggestions
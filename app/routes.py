@@ -1,29 +1,41 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from .models import Bill, Paycheck, Expense, PaySchedule
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, session, make_response, g, jsonify
+from .models import Bill, Paycheck, Expense, PaySchedule, Household, BulkAction, StatementImport, Category, DEFAULT_HOUSEHOLD_ID
 from .extensions import db
-from datetime import date, timedelta, datetime
-from sqlalchemy import func
-from .utils import next_due_date
-import csv
-import io
-from .constants import EXPENSE_CATEGORIES
-import hashlib
-import re
+from datetime import date, timedelta
+from itertools import islice
+from sqlalchemy import func, or_, and_
+from .utils import next_bill_due_dates
+from .archive import expense_entity
+from .categories import CategoryError, category_id_for, category_maps, ensure_category, rename_category, seed_categories
+from .anomalies import move_category_stats
+from .bulk import expense_filter_conditions, recategorize_matching, delete_matching, undo_action
+from .duplicates import request_duplicate_reconcile
+from .live import live_bus, publish_change
+from .recurring import detect_recurring
+from .reconcile import create_paychecks_from_deposits, reconcile_paychecks
+from .rows import ExpenseRow, bill_rows, expense_row_select, fetch_rows, paycheck_rows
+from .importer import write_expenses
+from .statements import StatementError, collect_rows, decode_csv_bytes, is_ofx, is_statement, iter_csv_rows, iter_ofx_rows
+from .uploads import (
+    UPLOAD_CHUNK_SIZE, UPLOAD_MAX_SIZE, PREVIEW_MAX_ROWS, SHA256_RE, UploadError,
+    append_chunk, discard_preview, discard_upload, file_digest, find_import, finish_upload, get_upload,
+    import_report, load_preview, save_preview, start_upload, upload_offset, upload_path,
+)
+from .constants import BILL_RECURRENCES
 
 # Helper Functions
-def expense_fingerprint(spent_date, amount, description):
-    desc = (description or "").strip().lower()
-    desc = re.sub(r"\s+", " ", desc)
-    desc = re.sub(r"[^a-z0-9 \-]", "", desc)
-    
-    key = f"{spent_date.isoformat()}|{float(amount):.2f}|{desc}"
-    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+def owned(model):
+    """Query for `model` limited to the current household."""
+    return model.query.filter(model.household_id == g.household_id)
+
+def get_owned_or_404(model, object_id: int):
+    return owned(model).filter(model.id == object_id).first_or_404()
 
 def get_pay_period(today: date) -> tuple[date, date]:
     """
     Returns (start, end) for the current bi-weekly pay period ancored to a stored payday.
     """
-    schedule = PaySchedule.query.order_by(PaySchedule.id.desc()).first()
+    schedule = owned(PaySchedule).order_by(PaySchedule.id.desc()).first()
     
     # Fallback if not configured yet: Rolling 14 days
     if not schedule:
@@ -51,100 +63,58 @@ def get_pay_period(today: date) -> tuple[date, date]:
 
 main = Blueprint('main', __name__)
 
-@main.route("/")
-def dashboard():
-    today = date.today()
-    first_day = date(today.year, today.month, 1)
-    
-    # First Day of Next Month
-    if today.month == 12:
-        first_next = date(today.year + 1, 1, 1)
-    else:
-        first_next = date(today.year, today.month + 1, 1)
+@main.before_request
+def load_household():
+    household_id = session.get("household_id", DEFAULT_HOUSEHOLD_ID)
 
-    total_bills = (
-        db.session.query(func.coalesce(func.sum(Bill.amount), 0))
-        .filter(Bill.is_active == True)
-        .scalar()
-    )
+    # A Household Deleted Elsewhere Falls Back To The Default One
+    if household_id != DEFAULT_HOUSEHOLD_ID and db.session.get(Household, household_id) is None:
+        session.pop("household_id", None)
+        household_id = DEFAULT_HOUSEHOLD_ID
 
-    total_income = (
-        db.session.query(func.coalesce(func.sum(Paycheck.amount), 0))
-        .filter(Paycheck.pay_date >= first_day)
-        .filter(Paycheck.pay_date < first_next)
-        .scalar()
-    )
+    g.household_id = household_id
 
-    remaining = float(total_income) - float(total_bills)
+@main.context_processor
+def inject_category_names():
+    """{id: name} for the current household, so templates can show rows' `category_id`."""
+    if "household_id" not in g:
+        return {}
+    return {"category_names": category_maps(g.household_id)[1]}
 
-    next_paycheck = (
-        Paycheck.query
-        .filter(Paycheck.pay_date >= date.today())
-        .order_by(Paycheck.pay_date.asc())
-        .first()
+@main.route("/")
+def dashboard():
+    summary, live_token = live_bus().summary(g.household_id, date.today())
+    return render_template("dashboard.html", live_token=live_token, **summary)
+
+@main.route("/events/dashboard")
+def dashboard_events():
+    """Server-sent events with the dashboard figures that change while the page is open."""
+    since = request.headers.get("Last-Event-ID") or request.args.get("since", "")
+    return Response(
+        live_bus().stream(g.household_id, since),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    next_paycheck_label = next_paycheck.pay_date.strftime("%b %d, %Y") if next_paycheck else "—"
-    payday_date = next_paycheck.pay_date if next_paycheck else None
-    
-    active_bills = Bill.query.filter(Bill.is_active == True).all()
-    
-    bills_before_payday = []
-    for b in active_bills:
-        due = next_due_date(b.due_day, today)
-        # Skip if already marked paid for this due date
-        if b.paid_through and b.paid_through >= due: 
-            continue
-        
-        
-        # If we don't have a payday yet, we won't filter (Show empty list for now)
-        if payday_date and today <= due <= payday_date:
-            bills_before_payday.append({
-                "name": b.name,
-                "due": due, 
-                "amount": float(b.amount),
-            })
-    bills_before_payday.sort(key=lambda x: x['due'])
-    total_due_before_payday = sum(x['amount'] for x in bills_before_payday)
-    
-    window_end = today + timedelta(days=30)
-    
-    upcoming_bills = []
-    for b in active_bills:
-        due = next_due_date(b.due_day, today)
-        # Skip if already marked paid for this due date
-        if b.paid_through and b.paid_through >= due: 
-            continue
-        
-        # If we have a payday, "upcoming" means after payday but within 30 days
-        if payday_date:
-            if due > payday_date and due <= window_end:
-                upcoming_bills.append({"name": b.name, "due": due, "amount": float(b.amount)})
-            else:
-                # If no payday exists yet, just show next 30 days
-                if today <= due <= window_end:
-                    upcoming_bills.append({"name": b.name, "due": due, "amount": float(b.amount)})  
-    upcoming_bills.sort(key=lambda x: x["due"])
 
-    return render_template(
-        "dashboard.html",
-        total_income=float(total_income),
-        total_bills=float(total_bills),
-        remaining=float(remaining),
-        next_paycheck_label=next_paycheck_label,
-        bills_before_payday=bills_before_payday,
-        total_due_before_payday=total_due_before_payday,
-        payday_date=payday_date,
-        upcoming_bills=upcoming_bills,
-        window_end=window_end,
-    )
-    
 # Expenses Routes
 
-@main.route("/expenses")
-def expenses():
-    # --- filters from query string ---
-    preset = request.args.get("preset", "this_month")
-    show = request.args.get("show", "all")  # all | dupes
+EXPENSES_PAGE_SIZE = 50
+
+# Stay Well Under SQLite's Bound-Variable Limit For id IN (...) Lists
+ID_CHUNK_SIZE = 500
+
+# Sentinel For An Exhausted Statement Parser (Parsers Yield None For Bad Rows)
+END_OF_ROWS = object()
+
+def expense_filters(args) -> dict:
+    """Parse the expenses filter (preset, show, category_id, start, end) from a query string."""
+    preset = args.get("preset", "this_month")
+    show = args.get("show", "all")  # all | dupes | flagged
+
+    try:
+        category_id = int(args.get("category_id") or 0) or None
+    except ValueError:
+        category_id = None
 
     today = date.today()
     end = today
@@ -161,11 +131,9 @@ def expenses():
     else:
         start = date(today.year, today.month, 1)
 
-    
-
     # optional custom override
-    start_raw = request.args.get("start")
-    end_raw = request.args.get("end")
+    start_raw = args.get("start")
+    end_raw = args.get("end")
 
     try:
         if start_raw:
@@ -175,200 +143,301 @@ def expenses():
     except ValueError:
         flash("Invalid date filter. Use YYYY-MM-DD.", "warning")
 
-    # --- build query ---
-    q = Expense.query.filter(Expense.spent_date >= start, Expense.spent_date <= end)
+    return {"preset": preset, "show": show, "category_id": category_id, "start": start, "end": end}
+
+def expense_filter_query(filters: dict):
+    """
+    Returns (select, entity) for the filter: `ExpenseRow` columns of the matching rows.
+    `entity` is `Expense`, or an alias of it that also covers archived years overlapping
+    the range; filter and order on its columns.
+    """
+    E = expense_entity(g.household_id, filters["start"], filters["end"])
+    q = expense_row_select(E).where(*expense_filter_conditions(E, g.household_id, filters))
+    return q, E
+
+def expense_total(q, E):
+    """Sum of the amounts `q` (from `expense_filter_query`) matches."""
+    return db.session.execute(q.with_only_columns(func.coalesce(func.sum(E.amount), 0))).scalar()
+
+def expense_page(q, E, cursor: str | None = None) -> tuple[list[ExpenseRow], str | None]:
+    """
+    One page of expenses, newest first. `cursor` is "<spent_date>:<id>" of the last row
+    already shown, so later pages seek on the index instead of using OFFSET.
+    """
+    if cursor:
+        try:
+            cursor_date_raw, cursor_id_raw = cursor.split(":", 1)
+            cursor_date = date.fromisoformat(cursor_date_raw)
+            cursor_id = int(cursor_id_raw)
+        except ValueError:
+            return [], None
+        q = q.where(or_(
+            E.spent_date < cursor_date,
+            and_(E.spent_date == cursor_date, E.id < cursor_id),
+        ))
+
+    rows = fetch_rows(q.order_by(E.spent_date.desc(), E.id.desc()).limit(EXPENSES_PAGE_SIZE + 1), ExpenseRow)
+    if len(rows) <= EXPENSES_PAGE_SIZE:
+        return rows, None
 
-    if show == "dupes":
-        q = q.filter(Expense.is_duplicate == True)
+    rows = rows[:EXPENSES_PAGE_SIZE]
+    last = rows[-1]
+    return rows, f"{last.spent_date.isoformat()}:{last.id}"
 
-    expenses = q.order_by(Expense.spent_date.desc(), Expense.id.desc()).limit(200).all()
-    total = q.with_entities(func.coalesce(func.sum(Expense.amount), 0)).scalar()
+def wants_fragment() -> bool:
+    """True when the expenses page script asked for an HTML fragment instead of a redirect."""
+    return request.headers.get("X-Requested-With") == "fetch"
+
+def with_expense_total(response):
+    """
+    Add X-Expense-Total: the total of the expenses filter in the query string (the page's own),
+    so the page script can update its "Total (filtered)" after a row change.
+    """
+    q, E = expense_filter_query(expense_filters(request.args))
+    response.headers["X-Expense-Total"] = f"{float(expense_total(q, E)):.2f}"
+    return response
+
+@main.route("/expenses")
+def expenses():
+    filters = expense_filters(request.args)
+    q, E = expense_filter_query(filters)
+
+    expenses, next_cursor = expense_page(q, E)
+    total = expense_total(q, E)
+
+    recent_actions = (
+        owned(BulkAction)
+        .filter(BulkAction.undone_at.is_(None))
+        .order_by(BulkAction.id.desc())
+        .limit(3)
+        .all()
+    )
 
     return render_template(
         "expenses.html",
         expenses=expenses,
+        next_cursor=next_cursor,
         total=total,
-        categories=EXPENSE_CATEGORIES,
-        show=show,
-        preset=preset,
-        start=start,
-        end=end,
+        recent_actions=recent_actions,
+        categories=list(category_maps(g.household_id)[0]),
+        **filters,
     )
 
+@main.route("/expenses/rows")
+def expenses_rows():
+    """Table-body fragment: the next page of rows, or the first page of a new filter."""
+    filters = expense_filters(request.args)
+    q, E = expense_filter_query(filters)
+
+    expenses, next_cursor = expense_page(q, E, request.args.get("cursor"))
+
+    response = make_response(render_template("_expense_rows.html", expenses=expenses))
+    response.headers["X-Next-Cursor"] = next_cursor or ""
+    return response
+
 
 @main.route("/expenses/upload", methods=["GET"])
 def expenses_upload():
-    return render_template("expenses_upload.html")
+    return render_template("expenses_upload.html", chunk_size=UPLOAD_CHUNK_SIZE)
+
+def preview_statement(f, filename: str, sha256: str, size: int) -> str | None:
+    """
+    Parse a statement into an on-disk preview for the import step.
+    Returns an error message to show instead, if any.
+    """
+    try:
+        if is_ofx(filename):
+            # Streamed: Rows Are Emitted While The File Is Read
+            rows = iter_ofx_rows(f)
+        else:
+            rows = iter_csv_rows(decode_csv_bytes(f.read()))
+    except StatementError as e:
+        return str(e)
+
+    # Safety Cap: Keep The First PREVIEW_MAX_ROWS Rows, And Note Whether Any Were Left Over
+    rows = iter(rows)
+    preview, errors = collect_rows(islice(rows, PREVIEW_MAX_ROWS))
+    truncated = next(rows, END_OF_ROWS) is not END_OF_ROWS
+    if not preview:
+        return "No valid rows found. Check date format (YYYY-MM-DD) and required columns."
+
+    discard_preview(session.get("expense_import"))
+    session["expense_import"] = save_preview(preview, errors, filename, sha256, size, truncated)
+    return None
 
 @main.route("/expenses/upload", methods=["POST"])
 def expenses_upload_post():
     """
-    Upload CSV -> parse -> store preview rows in session -> redirect to preview page.
-    Expected columns (case-insensitive): date, description, amount, category(optional)
+    Upload CSV or OFX/QFX -> parse -> store preview rows on disk -> redirect to preview page.
+    CSV columns (case-insensitive): date, description, amount, category(optional)
     """
     f = request.files.get("file")
     if not f or f.filename == "":
-        flash("Please choose a CSV file.", "danger")
+        flash("Please choose a CSV, OFX or QFX file.", "danger")
         return redirect(url_for("main.expenses_upload"))
-    
-    raw_bytes = f.read()
 
-    raw = None
-    for enc in ("utf-8-sig", "utf-16", "utf-16le", "utf-16be", "cp1252", "latin-1"):
-        try:
-            raw = raw_bytes.decode(enc)
-            break
-        except UnicodeDecodeError:
-            continue
+    # Whole-File Hash First: A Statement That Was Already Imported Isn't Parsed Again
+    sha256, size = file_digest(f.stream)
+    record = find_import(g.household_id, sha256)
+    if record:
+        flash(import_report(record), "warning")
+        return redirect(url_for("main.expenses"))
 
-    if raw is None:
-        raw = raw_bytes.decode("utf-8", errors="replace")
-
-    
-    reader = csv.DictReader(io.StringIO(raw))
-    if not reader.fieldnames:
-        flash("CSV appears to be empty or missing a header row.", "danger")
-        return redirect(url_for("main.expenses_upload"))
-    
-    # Normalize header names
-    headers = [h.strip().lower() for h in reader.fieldnames]
-    
-    def pick(col_name: str) -> str | None:
-        for h in reader.fieldnames:
-            if h and h.strip().lower() == col_name:
-                return h
-        return None
-    
-    col_date = pick("date")
-    col_desc = pick("description")
-    col_amt = pick("amount")
-    col_cat = pick("category")
-    
-    if not (col_date and col_desc and col_amt):
-        flash("CSV must include headers: date, description, amount (category optional).", "danger")
-        return redirect(url_for("main.expenses_upload"))
-    
-    preview = []
-    errors = 0
-    
-    for i, row in enumerate(reader, start=1):
-        if i > 2000: # Safety Cap
-            break
-        
-        date_raw = (row.get(col_date) or "").strip()
-        desc = (row.get(col_desc) or "").strip()
-        amt_raw = (row.get(col_amt) or "").strip()
-        cat = ((row.get(col_cat) or "").strip() if col_cat else "") or "Uncategorized"
-
-        if not date_raw or not desc or not amt_raw:
-            errors += 1
-            continue
-        
-        # Parse Date: Expects YYYY-MM-DD (Expand Later)
-        try:
-            # Supports YYYY-MM-DD and MM/DD/YYYY
-            if "-" in date_raw:
-                spent_date = date.fromisoformat(date_raw)
-            else:
-                spent_date = datetime.strptime(date_raw, "%m/%d/%Y").date()
-        except ValueError:
-            errors += 1
-            continue
-    
-        # Parse Amount
-        try: 
-            amount = float(amt_raw.replace("$", "").replace(",", ""))
-        except ValueError:
-            errors += 1
-            continue
-        
-        preview.append({
-            "spent_date": spent_date.isoformat(),
-            "description": desc,
-            "amount": round(amount, 2),
-            "category": cat,
-        })
-        
-        
-        
-    session["expense_import_preview"] = preview
-    session["expense_import_errors"] = errors
-    
-    if not preview:
-        flash("No valid rows found. Check date format (YYYY-MM-DD) and required columns.", "danger")
+    error = preview_statement(f.stream, f.filename, sha256, size)
+    if error:
+        flash(error, "danger")
         return redirect(url_for("main.expenses_upload"))
     
     return redirect(url_for("main.expenses_preview"))
 
+# Resumable Uploads: Start -> PUT Chunks (Upload-Offset Header) -> Complete. See app/uploads.py
+
+@main.route("/expenses/uploads", methods=["POST"])
+def start_statement_upload():
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get("filename") or "").strip()
+    sha256 = str(data.get("sha256") or "").lower() or None
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        size = 0
+
+    if not is_statement(filename):
+        return jsonify(error="Please choose a CSV, OFX or QFX file."), 400
+    if not 0 < size <= UPLOAD_MAX_SIZE:
+        return jsonify(error=f"Files must be under {UPLOAD_MAX_SIZE // (1024 * 1024)} MB."), 400
+    if sha256 and not SHA256_RE.match(sha256):
+        return jsonify(error="Invalid checksum."), 400
+
+    # Known Statement: Answer From The Import Record Without Uploading Anything
+    record = find_import(g.household_id, sha256) if sha256 else None
+    if record:
+        flash(import_report(record), "warning")
+        return jsonify(status="imported", message=import_report(record), redirect=url_for("main.expenses"))
+
+    meta = start_upload(g.household_id, filename, size, sha256)
+    return jsonify(status="uploading", upload_id=meta["id"], offset=upload_offset(meta), chunk_size=UPLOAD_CHUNK_SIZE)
+
+@main.route("/expenses/uploads/<upload_id>", methods=["GET"])
+def statement_upload_status(upload_id):
+    meta = get_upload(upload_id, g.household_id)
+    if not meta:
+        return jsonify(error="Unknown upload."), 404
+    return jsonify(offset=upload_offset(meta), size=meta["size"])
+
+@main.route("/expenses/uploads/<upload_id>", methods=["PUT"])
+def put_statement_chunk(upload_id):
+    meta = get_upload(upload_id, g.household_id)
+    if not meta:
+        return jsonify(error="Unknown upload."), 404
+
+    offset = request.headers.get("Upload-Offset", type=int)
+    if offset is None or (request.content_length or 0) > UPLOAD_CHUNK_SIZE:
+        return jsonify(error=f"Send chunks of at most {UPLOAD_CHUNK_SIZE} bytes with an Upload-Offset header."), 400
+
+    try:
+        new_offset = append_chunk(meta, offset, request.get_data(cache=False))
+    except UploadError as e:
+        # Client Resumes From The Offset We Actually Have
+        return jsonify(error=str(e), offset=e.offset), 409
+    return jsonify(offset=new_offset)
+
+@main.route("/expenses/uploads/<upload_id>/complete", methods=["POST"])
+def complete_statement_upload(upload_id):
+    meta = get_upload(upload_id, g.household_id)
+    if not meta:
+        return jsonify(error="Unknown upload."), 404
+
+    try:
+        sha256 = finish_upload(meta)
+    except UploadError as e:
+        if e.offset == 0:
+            discard_upload(meta)
+        return jsonify(error=str(e), offset=e.offset), 409
+
+    record = find_import(g.household_id, sha256)
+    if record:
+        discard_upload(meta)
+        flash(import_report(record), "warning")
+        return jsonify(status="imported", message=import_report(record), redirect=url_for("main.expenses"))
+
+    with open(upload_path(meta), "rb") as f:
+        error = preview_statement(f, meta["filename"], sha256, meta["size"])
+    discard_upload(meta)
+    if error:
+        return jsonify(error=error), 422
+    return jsonify(status="parsed", redirect=url_for("main.expenses_preview"))
+
 @main.route("/expenses/preview")
 def expenses_preview():
-    preview = session.get("expense_import_preview", [])
-    errors = session.get("expense_import_errors", 0)
-    preview_rows = preview[:50] 
-    return render_template("expenses_preview.html", preview=preview_rows, total_rows=len(preview), errors=errors)
+    preview = load_preview(session.get("expense_import")) or {"rows": [], "errors": 0}
+    preview_rows = preview["rows"][:50] 
+    return render_template(
+        "expenses_preview.html", preview=preview_rows, total_rows=len(preview["rows"]), errors=preview["errors"],
+        truncated=preview.get("truncated", False), max_rows=PREVIEW_MAX_ROWS,
+    )
 
 @main.route("/expenses/import", methods=["POST"])
 def expenses_import():
-    preview = session.get("expense_import_preview", [])
+    preview_id = session.get("expense_import")
+    preview = load_preview(preview_id)
     if not preview:
-        flash("Nothing to import, Upload a CSV first.", "warning")
+        flash("Nothing to import, Upload a statement first.", "warning")
         return redirect(url_for("main.expenses_upload"))
-    
-    count = 0
-
-    for item in preview:
-        spent_date = date.fromisoformat(item["spent_date"])
-        amount = float(item["amount"])
-        description = item["description"]
-        category = item.get("category") or "Uncategorized"
-
-        fp = expense_fingerprint(spent_date, amount, description)
-
-        existing = Expense.query.filter_by(fingerprint=fp).first()
-
-        e = Expense(
-            spent_date=spent_date,
-            description=description,
-            amount=amount,
-            category=category,
-            fingerprint=fp,
-            is_duplicate=bool(existing),
-            duplicate_of_id=existing.id if existing else None
-        )
-
-        db.session.add(e)
-        count += 1
 
-        
-    db.session.commit()
+    # Same Preview Confirmed Twice (e.g. From Two Tabs)
+    record = find_import(g.household_id, preview["sha256"])
+    if record:
+        flash(import_report(record), "warning")
+    else:
+        count, duplicates = write_expenses(g.household_id, preview["rows"], commit=False)
+        # A Cut-Off Preview Didn't Import The Whole File, So Don't Mark The File As Imported
+        if not preview.get("truncated"):
+            db.session.add(StatementImport(
+                household_id=g.household_id,
+                sha256=preview["sha256"],
+                filename=preview["filename"][:255],
+                size=preview["size"],
+                row_count=count,
+                duplicate_count=duplicates,
+                error_count=preview["errors"],
+            ))
+        db.session.commit()
+        flash(f"Imported {count} expenses ({duplicates} flagged as duplicates).", "success")
     
     # Clear Preview
-    session.pop("expense_import_preview", None)
-    session.pop("expense_import_errors", None)
+    discard_preview(preview_id)
+    session.pop("expense_import", None)
     
-    flash(f"Imported {count} expenses.", "success")
     return redirect(url_for("main.expenses"))
 
 @main.route("/expenses/<int:expense_id>/category", methods=["POST"])
 def update_expense_category(expense_id):
-    e = Expense.query.get_or_404(expense_id)
-    category = (request.form.get("category") or "").strip()
-    
-    if category not in EXPENSE_CATEGORIES:
+    e = get_owned_or_404(Expense, expense_id)
+    # Row Inputs Are Named Per Row So They Can Live Inside The Bulk Form
+    category = (request.form.get(f"category_{expense_id}") or request.form.get("category") or "").strip()
+    category_id = category_id_for(g.household_id, category)
+    
+    if category_id is None:
+        if wants_fragment():
+            return "Invalid category.", 400
         flash("Invalid category.", "danger")
         return redirect(request.referrer or url_for("main.expenses"))
 
-    e.category = category
+    move_category_stats(g.household_id, category_id, Expense.id == e.id)
+    e.category_id = category_id
     db.session.commit()
+    if wants_fragment():
+        return with_expense_total(make_response(render_template("_expense_row.html", e=e)))
     flash("Category updated.", "success")
     return redirect(request.referrer or url_for("main.expenses"))
 
 @main.route("/expenses/bulk-category", methods=["POST"])
 def bulk_update_expense_category():
-    category = (request.form.get("category") or "").strip()
+    category_id = category_id_for(g.household_id, (request.form.get("category") or "").strip())
     ids = request.form.getlist("expense_ids")
     
-    if category not in EXPENSE_CATEGORIES:
+    if category_id is None:
         flash("Invalid category.", "danger")
         return redirect(request.referrer or url_for("main.expenses"))
     
@@ -388,10 +457,12 @@ def bulk_update_expense_category():
         flash("No valid expenses selected.", "warning")
         return redirect(request.referrer or url_for("main.expenses"))
     
-    Expense.query.filter(Expense.id.in_(expense_ids)).update(
-        {"category": category},
-        synchronize_session=False
-    )
+    for i in range(0, len(expense_ids), ID_CHUNK_SIZE):
+        move_category_stats(g.household_id, category_id, Expense.id.in_(expense_ids[i:i + ID_CHUNK_SIZE]))
+        owned(Expense).filter(Expense.id.in_(expense_ids[i:i + ID_CHUNK_SIZE])).update(
+            {"category_id": category_id},
+            synchronize_session=False
+        )
     db.session.commit()
     
     flash(f"Updated {len(expense_ids)} expenses.", "success")
@@ -399,9 +470,12 @@ def bulk_update_expense_category():
     
 @main.route("/expenses/<int:expense_id>/delete", methods=["POST"])  
 def delete_expense(expense_id):
-    e = Expense.query.get_or_404(expense_id)
+    e = get_owned_or_404(Expense, expense_id)
     db.session.delete(e)
+    request_duplicate_reconcile(g.household_id)
     db.session.commit()
+    if wants_fragment():
+        return with_expense_total(make_response("", 204))
     flash("Expense deleted.", "success")
     return redirect(request.referrer or url_for("main.expenses"))
 
@@ -424,29 +498,90 @@ def bulk_delete_expenses():
         flash("No valid expenses selected.", "warning")
         return redirect(request.referrer or url_for("main.expenses"))
     
-    deleted = Expense.query.filter(Expense.id.in_(expense_ids)).delete(synchronize_session=False)
+    deleted = 0
+    for i in range(0, len(expense_ids), ID_CHUNK_SIZE):
+        deleted += owned(Expense).filter(Expense.id.in_(expense_ids[i:i + ID_CHUNK_SIZE])).delete(synchronize_session=False)
+    request_duplicate_reconcile(g.household_id)
     db.session.commit()
     
     flash(f"Deleted {deleted} expenses.", "success")
     return redirect(request.referrer or url_for("main.expenses"))
 
+@main.route("/expenses/bulk-category/matching", methods=["POST"])
+def bulk_update_matching_category():
+    """Apply a category to every expense matching the posted filter, not just the checked rows."""
+    category_id = category_id_for(g.household_id, (request.form.get("category") or "").strip())
+    
+    if category_id is None:
+        flash("Invalid category.", "danger")
+        return redirect(request.referrer or url_for("main.expenses"))
+    
+    action = recategorize_matching(g.household_id, expense_filters(request.form), category_id)
+    
+    flash(f"Updated {action.row_count} expenses matching the filter.", "success")
+    return redirect(request.referrer or url_for("main.expenses"))
+
+@main.route("/expenses/bulk-delete/matching", methods=["POST"])
+def bulk_delete_matching_expenses():
+    """Delete every expense matching the posted filter. Undoable from the expenses page."""
+    request_duplicate_reconcile(g.household_id)
+    action = delete_matching(g.household_id, expense_filters(request.form))
+    
+    flash(f"Deleted {action.row_count} expenses matching the filter.", "success")
+    return redirect(request.referrer or url_for("main.expenses"))
+
+@main.route("/expenses/bulk-actions/<int:action_id>/undo", methods=["POST"])
+def undo_bulk_action(action_id):
+    action = get_owned_or_404(BulkAction, action_id)
+    
+    if action.undone_at:
+        flash("That bulk action was already undone.", "warning")
+        return redirect(request.referrer or url_for("main.expenses"))
+    
+    request_duplicate_reconcile(g.household_id)
+    restored = undo_action(action)
+    
+    flash(f"Undo restored {restored} of {action.row_count} expenses.", "info")
+    return redirect(request.referrer or url_for("main.expenses"))
+
     
 # Bills Routes
         
 @main.route('/bills')
 def bills():
-    bills = Bill.query.order_by(Bill.due_day.asc(), Bill.name.asc()).all()
-    return render_template('bills.html', bills=bills)
+    bills = bill_rows(g.household_id)
+    next_due = dict(zip((b.id for b in bills), next_bill_due_dates(bills, date.today())))
+    return render_template('bills.html', bills=bills, next_due=next_due, recurrences=BILL_RECURRENCES)
+
+@main.route("/bills/suggestions")
+def bill_suggestions():
+    suggestions = detect_recurring(g.household_id, date.today())
+    return render_template("bill_suggestions.html", suggestions=suggestions)
 
 @main.route("/bills/<int:bill_id>/delete", methods=["POST"])
 def delete_bill(bill_id):
-    bill = Bill.query.get_or_404(bill_id)
+    bill = get_owned_or_404(Bill, bill_id)
     db.session.delete(bill)
+    publish_change(g.household_id)
     db.session.commit()
     flash("Bill deleted.", "success")
     return redirect(url_for("main.bills"))
 
 
+def bill_schedule_from_form(form) -> tuple[str, date | None, bool]:
+    """(recurrence, anchor_date, roll_forward_weekend) from a bill form. Raises ValueError with a message to flash."""
+    recurrence = form.get("recurrence", "monthly").strip() or "monthly"
+    if recurrence not in dict(BILL_RECURRENCES):
+        raise ValueError("Unknown repeat schedule.")
+
+    anchor_raw = form.get("anchor_date", "").strip()
+    try:
+        anchor_date = date.fromisoformat(anchor_raw) if anchor_raw else None
+    except ValueError:
+        raise ValueError("Start date must be a valid date.")
+
+    return recurrence, anchor_date, form.get("roll_forward_weekend") == "on"
+
 # Create Bills Forms/Route
 @main.route('/bill/new', methods=['POST'])
 def create_bill():
@@ -474,15 +609,32 @@ def create_bill():
     except ValueError:
         flash("Due Day Must be an Integer between 1 and 31.", "danger")
         return redirect(url_for('main.bills'))
+
+    try:
+        recurrence, anchor_date, roll_forward_weekend = bill_schedule_from_form(request.form)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('main.bills'))
+
+    try:
+        category_id = ensure_category(g.household_id, category)
+    except CategoryError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('main.bills'))
     
     bill = Bill(
+        household_id=g.household_id,
         name=name,
-        category=category,
+        category_id=category_id,
         amount=amount,
         due_day=due_day,
+        recurrence=recurrence,
+        anchor_date=anchor_date,
+        roll_forward_weekend=roll_forward_weekend,
         is_active=True
     )
     db.session.add(bill)
+    publish_change(g.household_id)
     db.session.commit()
 
     flash("Bill Added.", "success")
@@ -491,13 +643,13 @@ def create_bill():
 # Edit Bills
 @main.route("/bills/<int:bill_id>/edit")
 def edit_bill(bill_id):
-    bill = Bill.query.get_or_404(bill_id)
-    return render_template("bill_edit.html", bill=bill)
+    bill = get_owned_or_404(Bill, bill_id)
+    return render_template("bill_edit.html", bill=bill, recurrences=BILL_RECURRENCES)
 
 
 @main.route("/bills/<int:bill_id>/update", methods=["POST"])
 def update_bill(bill_id):
-    bill = Bill.query.get_or_404(bill_id)
+    bill = get_owned_or_404(Bill, bill_id)
 
     name = request.form.get("name", "").strip()
     category = request.form.get("category", "Other").strip() or "Other"
@@ -523,33 +675,51 @@ def update_bill(bill_id):
         flash("Due day must be an integer between 1 and 31.", "danger")
         return redirect(url_for("main.edit_bill", bill_id=bill_id))
 
+    try:
+        recurrence, anchor_date, roll_forward_weekend = bill_schedule_from_form(request.form)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("main.edit_bill", bill_id=bill_id))
+
+    try:
+        category_id = ensure_category(g.household_id, category)
+    except CategoryError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("main.edit_bill", bill_id=bill_id))
+
     bill.name = name
-    bill.category = category
+    bill.category_id = category_id
     bill.amount = amount
     bill.due_day = due_day
+    bill.recurrence = recurrence
+    bill.anchor_date = anchor_date
+    bill.roll_forward_weekend = roll_forward_weekend
     bill.is_active = (is_active_raw == "on")
 
+    publish_change(g.household_id)
     db.session.commit()
     flash("Bill updated.", "success")
     return redirect(url_for("main.bills"))
 
 @main.route("/bills/<int:bill_id>/paid", methods=["POST"])
 def mark_bill_paid(bill_id):
-    bill = Bill.query.get_or_404(bill_id)
+    bill = get_owned_or_404(Bill, bill_id)
     today = date.today()
     
     # Use Helper to Mark Paid through the next Due Date
-    due = next_due_date(bill.due_day, today)
+    due = next_bill_due_dates([bill], today)[0]
     bill.paid_through = due
     
+    publish_change(g.household_id)
     db.session.commit()
     flash("Bill marked as paid.", "success")
     return redirect(request.referrer or url_for("main.bills"))
 
 @main.route("/bills/<int:bill_id>/unpaid", methods=["POST"])
 def mark_bill_unpaid(bill_id):
-    bill = Bill.query.get_or_404(bill_id)
+    bill = get_owned_or_404(Bill, bill_id)
     bill.paid_through = None
+    publish_change(g.household_id)
     db.session.commit()
     flash("Bill marked as unpaid.", "info")
     return redirect(request.referrer or url_for("main.bills"))
@@ -558,7 +728,7 @@ def mark_bill_unpaid(bill_id):
 
 @main.route("/paychecks")
 def paychecks():
-    paychecks = Paycheck.query.order_by(Paycheck.pay_date.asc()).all()
+    paychecks = paycheck_rows(g.household_id)
     return render_template("paychecks.html", paychecks=paychecks)
 
 @main.route("/paychecks/new", methods=["POST"])
@@ -584,8 +754,9 @@ def create_paycheck():
         flash("Pay date must be a valid date.", "danger")
         return redirect(url_for("main.paychecks"))
 
-    paycheck = Paycheck(source=source, amount=amount, pay_date=pay_date)
+    paycheck = Paycheck(household_id=g.household_id, source=source, amount=amount, pay_date=pay_date)
     db.session.add(paycheck)
+    publish_change(g.household_id)
     db.session.commit()
 
     flash("Paycheck added.", "success")
@@ -595,21 +766,22 @@ def create_paycheck():
 
 @main.route('/paychecks/<int:paycheck_id>/delete', methods=['POST'])
 def delete_paycheck(paycheck_id):
-    paycheck = Paycheck.query.get_or_404(paycheck_id)
+    paycheck = get_owned_or_404(Paycheck, paycheck_id)
     db.session.delete(paycheck)
+    publish_change(g.household_id)
     db.session.commit()
     flash("Paycheck deleted.", "success")
     return redirect(url_for("main.paychecks"))
 
 @main.route("/paychecks/<int:paycheck_id>/edit")
 def edit_paycheck(paycheck_id):
-    paycheck = Paycheck.query.get_or_404(paycheck_id)
+    paycheck = get_owned_or_404(Paycheck, paycheck_id)
     return render_template("paycheck_edit.html", paycheck=paycheck)
 
 
 @main.route("/paychecks/<int:paycheck_id>/update", methods=["POST"])
 def update_paycheck(paycheck_id):
-    paycheck = Paycheck.query.get_or_404(paycheck_id)
+    paycheck = get_owned_or_404(Paycheck, paycheck_id)
 
     source = request.form.get("source", "").strip()
     amount_raw = request.form.get("amount", "0").strip()
@@ -635,14 +807,43 @@ def update_paycheck(paycheck_id):
     paycheck.amount = amount
     paycheck.pay_date = pay_date
 
+    publish_change(g.household_id)
     db.session.commit()
     flash("Paycheck updated.", "success")
     return redirect(url_for("main.paychecks"))
 
+# Paycheck Reconciliation
+
+# Newest Rows Shown Per Section Of The Report
+RECONCILE_SHOW_ROWS = 100
+
+@main.route("/paychecks/reconcile")
+def paycheck_reconciliation():
+    report = reconcile_paychecks(g.household_id)
+    counts = {key: len(items) for key, items in report.items()}
+    newest = {key: items[::-1][:RECONCILE_SHOW_ROWS] for key, items in report.items()}
+    has_schedule = owned(PaySchedule).first() is not None
+    return render_template(
+        "paycheck_reconcile.html", report=newest, counts=counts,
+        show_rows=RECONCILE_SHOW_ROWS, has_schedule=has_schedule,
+    )
+
+@main.route("/paychecks/reconcile/create", methods=["POST"])
+def create_paychecks_from_reconcile():
+    added = create_paychecks_from_deposits(g.household_id)
+    if added is None:
+        flash("Set a pay schedule first, so deposits can be checked against paydays.", "warning")
+        return redirect(url_for("main.pay_schedule_settings"))
+
+    publish_change(g.household_id)
+    db.session.commit()
+    flash(f"Added {added} paycheck{'s' if added != 1 else ''} from unmatched payday deposits.", "success")
+    return redirect(url_for("main.paycheck_reconciliation"))
+
 # Settings Routes
 @main.route("/settings/pay-schedule", methods=["GET", "POST"])
 def pay_schedule_settings():
-    schedule = PaySchedule.query.order_by(PaySchedule.id.desc()).first()
+    schedule = owned(PaySchedule).order_by(PaySchedule.id.desc()).first()
     
     if request.method == "POST":
         anchor_raw = request.form.get("anchor_payday", "").strip()
@@ -660,11 +861,69 @@ def pay_schedule_settings():
             flash("That date is not a Friday. Please select a Friday payday.", "warning")
             return redirect(url_for("main.pay_schedule_settings"))
         
-        db.session.add(PaySchedule(anchor_payday=anchor))
+        db.session.add(PaySchedule(household_id=g.household_id, anchor_payday=anchor))
         db.session.commit()
         flash("Pay schedule saved.", "success")
         return redirect(url_for("main.pay_schedule_settings"))
     
     return render_template("pay_schedule_settings.html", schedule=schedule)
-        
 
+@main.route("/settings/households", methods=["GET", "POST"])
+def household_settings():
+    if request.method == "POST":
+        name = request.form.get("name", "").strip()
+        if not name:
+            flash("Household name is required.", "danger")
+            return redirect(url_for("main.household_settings"))
+
+        household = Household(name=name)
+        db.session.add(household)
+        db.session.commit()
+        seed_categories(household.id)
+        session["household_id"] = household.id
+        flash(f"Household \"{name}\" created.", "success")
+        return redirect(url_for("main.dashboard"))
+
+    households = Household.query.order_by(Household.id.asc()).all()
+    return render_template("household_settings.html", households=households, current_id=g.household_id)
+
+@main.route("/settings/categories", methods=["GET", "POST"])
+def category_settings():
+    if request.method == "POST":
+        try:
+            ensure_category(g.household_id, request.form.get("name", ""))
+        except CategoryError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("main.category_settings"))
+
+        flash("Category added.", "success")
+        return redirect(url_for("main.category_settings"))
+
+    # Live Expenses Only; Counted On The (household_id, category_id, spent_date) Index
+    counts = dict(
+        db.session.query(Expense.category_id, func.count(Expense.id))
+        .filter(Expense.household_id == g.household_id)
+        .group_by(Expense.category_id)
+        .all()
+    )
+    categories = owned(Category).order_by(Category.name.asc()).all()
+    return render_template("category_settings.html", categories=categories, counts=counts)
+
+@main.route("/settings/categories/<int:category_id>/rename", methods=["POST"])
+def rename_household_category(category_id):
+    category = get_owned_or_404(Category, category_id)
+    try:
+        rename_category(g.household_id, category.id, request.form.get("name", ""))
+    except CategoryError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("main.category_settings"))
+
+    flash("Category renamed.", "success")
+    return redirect(url_for("main.category_settings"))
+
+@main.route("/settings/households/<int:household_id>/switch", methods=["POST"])
+def switch_household(household_id):
+    household = Household.query.get_or_404(household_id)
+    session["household_id"] = household.id
+    flash(f"Switched to {household.name}.", "info")
+    return redirect(url_for("main.dashboard"))
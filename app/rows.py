@@ -0,0 +1,98 @@
+"""
+Read-only rows for the list pages and the dashboard.
+
+The expenses, bills and paychecks pages only render tables. Loading full ORM
+instances for them costs an identity-map entry, change tracking and a
+Decimal per Numeric amount on every row. Here each page selects only the
+columns its template uses with a Core `select()`. The results become small
+NamedTuples that the session never tracks.
+
+Amounts come back as floats through `type_coerce`, since all a page does
+with them is format two decimals. Anything that edits a row still loads the
+model. Expense rows also say whether they came from an archive table, since
+those render read-only.
+"""
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import Float, select, type_coerce
+
+from .extensions import db
+from .models import Bill, Paycheck
+from .archive import is_archived
+
+
+class ExpenseRow(NamedTuple):
+    id: int
+    spent_date: date
+    description: str
+    category_id: int
+    amount: float
+    is_duplicate: bool
+    anomaly_score: float | None
+    archived: bool
+
+
+class BillRow(NamedTuple):
+    id: int
+    name: str
+    category_id: int
+    amount: float
+    due_day: int
+    recurrence: str
+    anchor_date: date | None
+    create_at: date
+    roll_forward_weekend: bool
+    is_active: bool
+    paid_through: date | None
+
+
+class PaycheckRow(NamedTuple):
+    id: int
+    source: str
+    amount: float
+    pay_date: date
+
+
+def _float(column):
+    return type_coerce(column, Float).label(column.key)
+
+
+def expense_row_select(E):
+    """SELECT of `ExpenseRow` columns from `Expense` or an `expense_entity()` alias; add WHERE/ORDER BY."""
+    return select(
+        E.id, E.spent_date, E.description, E.category_id, E.amount, E.is_duplicate, E.anomaly_score,
+        is_archived(E).label("archived"),
+    )
+
+
+def bill_row_select():
+    """SELECT of `BillRow` columns; add WHERE/ORDER BY."""
+    return select(
+        Bill.id, Bill.name, Bill.category_id, _float(Bill.amount), Bill.due_day, Bill.recurrence,
+        Bill.anchor_date, Bill.create_at, Bill.roll_forward_weekend, Bill.is_active, Bill.paid_through,
+    )
+
+
+def fetch_rows(stmt, row_type) -> list:
+    """Run a row SELECT and wrap each result tuple in `row_type`."""
+    make = row_type._make
+    return [make(row) for row in db.session.execute(stmt).tuples()]
+
+
+def bill_rows(household_id: int, active_only: bool = False) -> list[BillRow]:
+    """A household's bills ordered by due day, then name."""
+    stmt = bill_row_select().where(Bill.household_id == household_id)
+    if active_only:
+        stmt = stmt.where(Bill.is_active == True)
+    return fetch_rows(stmt.order_by(Bill.due_day.asc(), Bill.name.asc()), BillRow)
+
+
+def paycheck_rows(household_id: int) -> list[PaycheckRow]:
+    """A household's paychecks, oldest first."""
+    stmt = (
+        select(Paycheck.id, Paycheck.source, _float(Paycheck.amount), Paycheck.pay_date)
+        .where(Paycheck.household_id == household_id)
+        .order_by(Paycheck.pay_date.asc())
+    )
+    return fetch_rows(stmt, PaycheckRow)
@@ -0,0 +1,216 @@
+"""
+Bank statement parsing (CSV and OFX/QFX).
+
+Parsers yield preview rows shaped like
+{"spent_date": "YYYY-MM-DD", "description": str, "amount": float, "category": str, "fitid": str | None},
+or None for a row that couldn't be parsed. Amounts follow the CSV convention:
+charges are positive and money coming in (deposits, refunds) is negative.
+"""
+import codecs
+import csv
+import html
+import io
+import re
+from datetime import date, datetime
+
+OFX_EXTENSIONS = (".ofx", ".qfx")
+STATEMENT_EXTENSIONS = (".csv",) + OFX_EXTENSIONS
+
+# Bytes Read From An OFX Stream At A Time
+OFX_CHUNK_SIZE = 64 * 1024
+
+OFX_TAG_RE = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+class StatementError(ValueError):
+    """The file can't be read as a statement at all (as opposed to a bad row)."""
+
+
+def is_ofx(filename: str) -> bool:
+    return (filename or "").lower().endswith(OFX_EXTENSIONS)
+
+
+def is_statement(filename: str) -> bool:
+    return (filename or "").lower().endswith(STATEMENT_EXTENSIONS)
+
+
+def collect_rows(rows) -> tuple[list[dict], int]:
+    """Drain a parser into (rows, error count); cap it with `itertools.islice` first if needed."""
+    parsed = []
+    errors = 0
+    for row in rows:
+        if row is None:
+            errors += 1
+        else:
+            parsed.append(row)
+    return parsed, errors
+
+
+def decode_csv_bytes(raw_bytes: bytes) -> str:
+    for enc in ("utf-8-sig", "utf-16", "utf-16le", "utf-16be", "cp1252", "latin-1"):
+        try:
+            return raw_bytes.decode(enc)
+        except UnicodeDecodeError:
+            continue
+
+    return raw_bytes.decode("utf-8", errors="replace")
+
+
+def iter_csv_rows(raw: str):
+    """
+    Rows from CSV text. Expected columns (case-insensitive): date, description, amount, category(optional)
+    """
+    reader = csv.DictReader(io.StringIO(raw))
+    if not reader.fieldnames:
+        raise StatementError("CSV appears to be empty or missing a header row.")
+
+    def pick(col_name: str) -> str | None:
+        for h in reader.fieldnames:
+            if h and h.strip().lower() == col_name:
+                return h
+        return None
+
+    col_date = pick("date")
+    col_desc = pick("description")
+    col_amt = pick("amount")
+    col_cat = pick("category")
+
+    if not (col_date and col_desc and col_amt):
+        raise StatementError("CSV must include headers: date, description, amount (category optional).")
+
+    return _csv_rows(reader, col_date, col_desc, col_amt, col_cat)
+
+
+def _csv_rows(reader, col_date, col_desc, col_amt, col_cat):
+    for row in reader:
+        date_raw = (row.get(col_date) or "").strip()
+        desc = (row.get(col_desc) or "").strip()
+        amt_raw = (row.get(col_amt) or "").strip()
+        cat = ((row.get(col_cat) or "").strip() if col_cat else "") or "Uncategorized"
+
+        if not date_raw or not desc or not amt_raw:
+            yield None
+            continue
+
+        # Parse Date: Supports YYYY-MM-DD and MM/DD/YYYY
+        try:
+            if "-" in date_raw:
+                spent_date = date.fromisoformat(date_raw)
+            else:
+                spent_date = datetime.strptime(date_raw, "%m/%d/%Y").date()
+        except ValueError:
+            yield None
+            continue
+
+        # Parse Amount
+        try:
+            amount = float(amt_raw.replace("$", "").replace(",", ""))
+        except ValueError:
+            yield None
+            continue
+
+        yield {
+            "spent_date": spent_date.isoformat(),
+            "description": desc,
+            "amount": round(amount, 2),
+            "category": cat,
+            "fitid": None,
+        }
+
+
+def _ofx_events(stream):
+    """
+    (is_end, TAG, text) for every tag in an OFX stream, read in fixed-size chunks.
+
+    Works for SGML (v1, leaf elements without closing tags) and XML (v2) alike,
+    since only the tag name and the text up to the next '<' are used. Headers,
+    `<?xml ...?>` and `<?OFX ...?>` processing instructions don't match the tag pattern.
+    """
+    first = stream.read(OFX_CHUNK_SIZE)
+    if isinstance(first, str):
+        decoder = None
+    else:
+        # v2 Files Are XML (Usually UTF-8); v1 SGML Files Are Almost Always cp1252/US-ASCII
+        head = first[:512].lower()
+        encoding = "utf-8" if b"utf-8" in head or b"<?xml" in head else "cp1252"
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    buffer = ""
+    chunk = first
+    while chunk:
+        buffer += decoder.decode(chunk) if decoder else chunk
+
+        # The Last Tag May Be Cut Off Mid-Chunk; Keep It For The Next Round
+        cut = buffer.rfind("<")
+        if cut > 0:
+            for m in OFX_TAG_RE.finditer(buffer, 0, cut):
+                yield m.group(1) == "/", m.group(2).upper(), m.group(3)
+            buffer = buffer[cut:]
+
+        chunk = stream.read(OFX_CHUNK_SIZE)
+
+    if decoder:
+        buffer += decoder.decode(b"", final=True)
+    for m in OFX_TAG_RE.finditer(buffer):
+        yield m.group(1) == "/", m.group(2).upper(), m.group(3)
+
+
+def iter_ofx_rows(stream):
+    """Rows from an OFX/QFX statement, emitted as each <STMTTRN> closes."""
+    fields = None
+    for is_end, tag, text in _ofx_events(stream):
+        if tag == "STMTTRN":
+            if fields is not None:
+                yield _ofx_row(fields)
+            fields = None if is_end else {}
+            continue
+
+        if fields is not None and not is_end:
+            value = html.unescape(text.strip())
+            if value:
+                fields[tag] = value
+
+    # Truncated File: Still Emit The Open Transaction
+    if fields:
+        yield _ofx_row(fields)
+
+
+def _ofx_row(fields: dict) -> dict | None:
+    posted = fields.get("DTPOSTED", "")
+    desc = fields.get("NAME") or fields.get("MEMO") or ""
+
+    try:
+        # DTPOSTED Is YYYYMMDD[HHMMSS[.XXX]][TZ]
+        spent_date = datetime.strptime(posted[:8], "%Y%m%d").date()
+        amount = float(fields.get("TRNAMT", "").replace(",", ""))
+    except ValueError:
+        return None
+
+    if not desc:
+        return None
+
+    # TRNAMT Is Signed From The Account's Side (Charges Negative); Flip It To The CSV Convention
+    return {
+        "spent_date": spent_date.isoformat(),
+        "description": desc,
+        "amount": round(-amount, 2),
+        "category": "Uncategorized",
+        "fitid": fields.get("FITID"),
+    }
+
+
+def parse_statement_file(path: str) -> dict:
+    """
+    Parse one statement file from disk into {"path", "rows", "errors", "error"}.
+    Used by the offline importer's worker processes, so it returns plain data only.
+    """
+    try:
+        with open(path, "rb") as f:
+            if is_ofx(path):
+                rows, errors = collect_rows(iter_ofx_rows(f))
+            else:
+                rows, errors = collect_rows(iter_csv_rows(decode_csv_bytes(f.read())))
+    except (StatementError, csv.Error, OSError) as e:
+        return {"path": path, "rows": [], "errors": 0, "error": str(e)}
+
+    return {"path": path, "rows": rows, "errors": errors, "error": None}
@@ -0,0 +1,211 @@
+"""
+Resumable statement uploads and on-disk import previews.
+
+A client starts an upload, PUTs the file in chunks at increasing offsets, then
+completes it. Chunks are appended to instance/uploads/<id>.part, and a .json
+file next to it keeps the declared name, size and SHA-256. After a dropped
+connection the client asks for the current offset and carries on from there.
+
+Every finished file is hashed as a whole before it is parsed. A file this
+household already imported is answered from its StatementImport record
+instead of being parsed (and imported) again.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+
+from flask import current_app
+
+from .models import StatementImport
+
+# Largest Chunk Accepted Per Request
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_MAX_SIZE = 200 * 1024 * 1024
+
+# Unfinished Uploads And Unconfirmed Previews Are Removed After A Day
+UPLOAD_STALE_AFTER = 24 * 60 * 60
+
+# Rows Kept From One Statement For The Preview/Import Step
+PREVIEW_MAX_ROWS = 50000
+
+UPLOAD_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadError(ValueError):
+    """A chunk or finished upload doesn't line up with what was declared."""
+
+    def __init__(self, message: str, offset: int | None = None):
+        super().__init__(message)
+        self.offset = offset
+
+
+def uploads_dir() -> str:
+    path = os.path.join(current_app.instance_path, "uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_digest(f) -> tuple[str, int]:
+    """(SHA-256, size in bytes) of a binary file object, read in chunks; leaves it rewound."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    f.seek(0)
+    return digest.hexdigest(), size
+
+
+def find_import(household_id: int, sha256: str) -> StatementImport | None:
+    return StatementImport.query.filter_by(household_id=household_id, sha256=sha256).first()
+
+
+def import_report(record: StatementImport) -> str:
+    return (
+        f"{record.filename} was already imported on {record.imported_at:%b %d, %Y}: "
+        f"{record.row_count} expenses ({record.duplicate_count} flagged as duplicates, "
+        f"{record.error_count} rows skipped)."
+    )
+
+
+def _path(upload_id: str, suffix: str) -> str:
+    return os.path.join(uploads_dir(), upload_id + suffix)
+
+
+def _new_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def _remove_stale():
+    cutoff = time.time() - UPLOAD_STALE_AFTER
+    folder = uploads_dir()
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def start_upload(household_id: int, filename: str, size: int, sha256: str | None = None) -> dict:
+    """
+    Metadata for a new upload, or for the unfinished upload of the same file
+    (same household, size and declared hash) so the client can resume it.
+    """
+    _remove_stale()
+
+    if sha256:
+        for name in os.listdir(uploads_dir()):
+            if not name.endswith(".json") or name.endswith(".preview.json"):
+                continue
+            meta = get_upload(name[:-len(".json")], household_id)
+            if meta and meta["sha256"] == sha256 and meta["size"] == size:
+                return meta
+
+    meta = {
+        "id": _new_id(),
+        "household_id": household_id,
+        "filename": filename,
+        "size": size,
+        "sha256": sha256,
+    }
+    open(_path(meta["id"], ".part"), "wb").close()
+    with open(_path(meta["id"], ".json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def get_upload(upload_id: str, household_id: int) -> dict | None:
+    if not UPLOAD_ID_RE.match(upload_id or ""):
+        return None
+    try:
+        with open(_path(upload_id, ".json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("household_id") != household_id or not os.path.exists(_path(upload_id, ".part")):
+        return None
+    return meta
+
+
+def upload_offset(meta: dict) -> int:
+    return os.path.getsize(_path(meta["id"], ".part"))
+
+
+def upload_path(meta: dict) -> str:
+    return _path(meta["id"], ".part")
+
+
+def append_chunk(meta: dict, offset: int, data: bytes) -> int:
+    """Append `data` if it starts where the file currently ends. Returns the new offset."""
+    with open(_path(meta["id"], ".part"), "ab") as f:
+        # A Retried Chunk Can Race The Original Request; Only One May Append
+        fcntl.flock(f, fcntl.LOCK_EX)
+        current = f.seek(0, os.SEEK_END)
+        if offset != current:
+            raise UploadError(f"Expected a chunk at offset {current}.", current)
+        if current + len(data) > meta["size"]:
+            raise UploadError("Chunk runs past the declared file size.", current)
+
+        f.write(data)
+    return current + len(data)
+
+
+def finish_upload(meta: dict) -> str:
+    """Check the finished file against its declared size and hash. Returns its SHA-256."""
+    current = upload_offset(meta)
+    if current != meta["size"]:
+        raise UploadError(f"Upload is incomplete ({current} of {meta['size']} bytes).", current)
+
+    with open(_path(meta["id"], ".part"), "rb") as f:
+        sha256, _ = file_digest(f)
+    if meta["sha256"] and sha256 != meta["sha256"]:
+        raise UploadError("Uploaded file doesn't match its checksum; please upload it again.", 0)
+    return sha256
+
+
+def discard_upload(meta: dict):
+    for suffix in (".part", ".json"):
+        try:
+            os.remove(_path(meta["id"], suffix))
+        except OSError:
+            pass
+
+
+def save_preview(rows: list[dict], errors: int, filename: str, sha256: str, size: int, truncated: bool = False) -> str:
+    """
+    Store parsed rows until the user confirms the import. Returns the preview id (kept in the session).
+    `truncated` means the file had more than PREVIEW_MAX_ROWS rows and the rest were dropped.
+    """
+    preview_id = _new_id()
+    with open(_path(preview_id, ".preview.json"), "w") as f:
+        json.dump({
+            "rows": rows, "errors": errors, "filename": filename, "sha256": sha256, "size": size,
+            "truncated": truncated,
+        }, f)
+    return preview_id
+
+
+def load_preview(preview_id: str | None) -> dict | None:
+    if not UPLOAD_ID_RE.match(preview_id or ""):
+        return None
+    try:
+        with open(_path(preview_id, ".preview.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def discard_preview(preview_id: str | None):
+    if UPLOAD_ID_RE.match(preview_id or ""):
+        try:
+            os.remove(_path(preview_id, ".preview.json"))
+        except OSError:
+            pass
@@ -1,23 +1,148 @@
-from datetime import date
-import calendar
-
-def next_due_date(due_day: int, today: date) -> date:
-    """Return the next due date for a monthly bill given its due_day (1-31)"""
-    # Clamp Day to Last Day of This Month
-    last_day_this_month = calendar.monthrange(today.year, today.month)[1]
-    day = min(due_day, last_day_this_month)
-    candidate = date(today.year, today.month, day)
-    
-    if candidate >= today:
-        return candidate
+from datetime import date, timedelta
+import hashlib
+import re
+
+import numpy as np
+
+WHITESPACE_RE = re.compile(r"\s+")
+NON_KEY_CHARS_RE = re.compile(r"[^a-z0-9 \-]")
+
+def normalize_description(description: str | None) -> str:
+    """Lowercase, collapse whitespace and drop punctuation (the key used for fingerprints and merchants)."""
+    desc = (description or "").strip().lower()
+    desc = WHITESPACE_RE.sub(" ", desc)
+    desc = NON_KEY_CHARS_RE.sub("", desc)
+    return desc
+
+def expense_fingerprint(spent_date, amount, description):
+    desc = normalize_description(description)
     
-    # Move to Next Month
-    if today.month == 12:
-        year, month = today.year + 1, 1
-    else:
-        year, month = today.year, today.month + 1
-        
-    last_day_next_month = calendar.monthrange(year, month)[1]
-    day = min(due_day, last_day_next_month)
-    return date(year, month, day)
+    key = f"{spent_date.isoformat()}|{float(amount):.2f}|{desc}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+# Days Per Month, Indexed [Leap Year][Month - 1]
+MONTH_LENGTHS = np.array([
+    [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+])
+
+# Indexed By date.weekday(): Days To Roll A Weekend Date Forward To Monday,
+# And Days To Step Back From A Weekend To The Friday Before
+WEEKEND_ROLL_FORWARD = np.array([0, 0, 0, 0, 0, 2, 1])
+WEEKEND_STEP_BACK = np.array([0, 0, 0, 0, 0, 1, 2])
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Per Recurrence Code: Repeat Every N Days From The Anchor Date, Or Every N Months In The Anchor's Phase
+RECURRENCE_CODES = {"weekly": 0, "biweekly": 1, "monthly": 2, "quarterly": 3, "annual": 4, "last_business_day": 5}
+RECURRENCE_STEP_DAYS = np.array([7, 14, 0, 0, 0, 0])
+RECURRENCE_STEP_MONTHS = np.array([0, 0, 1, 3, 12, 1])
+LAST_BUSINESS_DAY = RECURRENCE_CODES["last_business_day"]
+
+# Longest Recurrence (Annual) Plus Slack, For Finding Each Bill's Next Due Date
+NEXT_DUE_HORIZON = timedelta(days=400)
+
+def _weekday(ordinals: np.ndarray) -> np.ndarray:
+    return (ordinals - 1) % 7
+
+def _month_table(start: date, end: date) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(month number, ordinal of its 1st, its length) for every month overlapping [start, end]. Month number = year * 12 + month - 1."""
+    months = np.arange(start.year * 12 + start.month - 1, end.year * 12 + end.month)
+    years = months // 12
+    leap = ((years % 4 == 0) & (years % 100 != 0)) | (years % 400 == 0)
+    lengths = MONTH_LENGTHS[leap.astype(np.int64), months % 12]
+    firsts = (months - 1970 * 12).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+    return months, firsts, lengths
+
+def recurrence_occurrences(recurrence, due_day, anchor, roll_weekend, start: date, end: date) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every due date in [start, end] for many schedules in one pass.
+
+    Arguments are parallel sequences, one entry per schedule: recurrence name, due day (1-31),
+    anchor date (first occurrence for weekly/biweekly, month phase for quarterly/annual) and
+    whether weekend dates roll forward to Monday. Weekly/biweekly schedules never fall before
+    their anchor. Month-based due days clamp to the month's last day. Returns (schedule index,
+    date ordinal) arrays sorted by schedule, then date.
+    """
+    count = len(recurrence)
+    if not count:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    code = np.fromiter((RECURRENCE_CODES[r] for r in recurrence), dtype=np.int64, count=count)
+    due_day = np.asarray(due_day, dtype=np.int64)
+    anchor = np.fromiter((a.toordinal() for a in anchor), dtype=np.int64, count=count)
+    roll_weekend = np.asarray(roll_weekend, dtype=bool)
+
+    # Rolling Forward Moves A Date At Most 2 Days, So Generate From 2 Days Early
+    lo, hi = start.toordinal(), end.toordinal()
+    gen_lo = lo - 2
+
+    owners, dates = [], []
+
+    for period in np.unique(RECURRENCE_STEP_DAYS[code]):
+        if not period:
+            continue
+        idx = np.flatnonzero(RECURRENCE_STEP_DAYS[code] == period)
+        # ceil((gen_lo - anchor) / period), But Never Before The First Occurrence
+        first_step = np.maximum(-((anchor[idx] - gen_lo) // period), 0)
+        steps = np.arange((hi - gen_lo) // period + 1)
+        days = anchor[idx, None] + (first_step[:, None] + steps[None, :]) * period
+        owners.append(np.repeat(idx, steps.size))
+        dates.append(days.ravel())
+
+    idx = np.flatnonzero(RECURRENCE_STEP_MONTHS[code] > 0)
+    if idx.size:
+        months, firsts, lengths = _month_table(date.fromordinal(gen_lo), end)
+        every = RECURRENCE_STEP_MONTHS[code[idx]]
+        anchor_month = (anchor[idx] - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1970 * 12
+        in_phase = (months[None, :] - anchor_month[:, None]) % every[:, None] == 0
+
+        # Clamp Day to Last Day of Each Month
+        on_day = firsts[None, :] + np.minimum(due_day[idx, None], lengths[None, :]) - 1
+        month_ends = firsts + lengths - 1
+        last_business = month_ends - WEEKEND_STEP_BACK[_weekday(month_ends)]
+        days = np.where((code[idx] == LAST_BUSINESS_DAY)[:, None], last_business[None, :], on_day)
+
+        rows, cols = np.nonzero(in_phase)
+        owners.append(idx[rows])
+        dates.append(days[rows, cols])
+
+    if not owners:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    owners = np.concatenate(owners)
+    dates = np.concatenate(dates)
+    dates = dates + np.where(roll_weekend[owners], WEEKEND_ROLL_FORWARD[_weekday(dates)], 0)
+
+    keep = (dates >= lo) & (dates <= hi)
+    owners, dates = owners[keep], dates[keep]
+    order = np.lexsort((dates, owners))
+    return owners[order], dates[order]
+
+def bill_occurrences(bills, start: date, end: date) -> list[tuple]:
+    """(bill, due date) for every occurrence of `bills` in [start, end], ordered by date."""
+    owners, dates = recurrence_occurrences(
+        [b.recurrence for b in bills],
+        [b.due_day for b in bills],
+        [b.anchor_date or b.create_at for b in bills],
+        [b.roll_forward_weekend for b in bills],
+        start, end,
+    )
+    order = np.argsort(dates, kind="stable")
+    return [(bills[i], date.fromordinal(int(d))) for i, d in zip(owners[order], dates[order])]
 
+def next_bill_due_dates(bills, today: date) -> list[date | None]:
+    """Next due date on or after `today` for each bill (None if it never recurs within a year)."""
+    owners, dates = recurrence_occurrences(
+        [b.recurrence for b in bills],
+        [b.due_day for b in bills],
+        [b.anchor_date or b.create_at for b in bills],
+        [b.roll_forward_weekend for b in bills],
+        today, today + NEXT_DUE_HORIZON,
+    )
+    # Sorted By Bill Then Date, So Each Bill's First Row Is Its Next Due Date
+    first_bills, first_rows = np.unique(owners, return_index=True)
+    due = [None] * len(bills)
+    for i, row in zip(first_bills, first_rows):
+        due[i] = date.fromordinal(int(dates[row]))
+    return due
@@ -0,0 +1,72 @@
+"""Add expense.merchant (normalized description) and a (household, merchant) index
+
+Revision ID: 0c5e7a2f9b41
+Revises: f3a8d2c6b915
+Create Date: 2026-10-20 13:22:08.915573
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e7a2f9b41'
+down_revision = 'f3a8d2c6b915'
+branch_labels = None
+depends_on = None
+
+# Merchant Keys (Copied From app/utils.normalize_description At The Time Of This Migration)
+WHITESPACE_RE = re.compile(r'\s+')
+NON_KEY_CHARS_RE = re.compile(r'[^a-z0-9 \-]')
+
+
+def _merchant(description):
+    desc = WHITESPACE_RE.sub(' ', (description or '').strip().lower())
+    return NON_KEY_CHARS_RE.sub('', desc)
+
+
+def _archive_tables(conn):
+    return [f'expense_archive_{year}' for (year,) in conn.execute(sa.text('SELECT year FROM expense_partition'))]
+
+
+def _backfill(conn, tables):
+    """Set `merchant` on every row, normalizing each distinct description once."""
+    conn.execute(sa.text('CREATE TEMP TABLE merchant_key (description TEXT PRIMARY KEY, merchant TEXT NOT NULL)'))
+    for table in tables:
+        descriptions = [d for (d,) in conn.execute(sa.text(
+            f'SELECT DISTINCT description FROM {table} WHERE description NOT IN (SELECT description FROM merchant_key)'
+        ))]
+        if descriptions:
+            conn.execute(
+                sa.text('INSERT INTO merchant_key (description, merchant) VALUES (:description, :merchant)'),
+                [{'description': d, 'merchant': _merchant(d)} for d in descriptions],
+            )
+        conn.execute(sa.text(
+            f'UPDATE {table} SET merchant = '
+            f'(SELECT merchant FROM merchant_key WHERE merchant_key.description = {table}.description)'
+        ))
+    conn.execute(sa.text('DROP TABLE merchant_key'))
+
+
+def upgrade():
+    conn = op.get_bind()
+    archives = _archive_tables(conn)
+
+    # Plain ADD COLUMN: No Table Rebuild, So The Expense AUTOINCREMENT Counter Is Untouched
+    for table in ['expense', 'deleted_expense', *archives]:
+        op.add_column(table, sa.Column('merchant', sa.String(length=255), nullable=True))
+    _backfill(conn, ['expense', 'deleted_expense', *archives])
+    for table in ['expense', *archives]:
+        op.create_index(f'ix_{table}_household_merchant', table, ['household_id', 'merchant'], unique=False)
+
+
+def downgrade():
+    conn = op.get_bind()
+    archives = _archive_tables(conn)
+
+    for table in ['expense', *archives]:
+        op.drop_index(f'ix_{table}_household_merchant', table_name=table)
+    for table in ['expense', 'deleted_expense', *archives]:
+        op.drop_column(table, 'merchant')
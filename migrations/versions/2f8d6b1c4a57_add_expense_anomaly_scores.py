@@ -0,0 +1,95 @@
+"""Add expense_stat running statistics and expense.anomaly_score flags
+
+Revision ID: 2f8d6b1c4a57
+Revises: 6e0a4c2d9f17
+Create Date: 2026-10-19 21:02:44.318207
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8d6b1c4a57'
+down_revision = '6e0a4c2d9f17'
+branch_labels = None
+depends_on = None
+
+# Merchant Keys (Copied From app/utils.normalize_description At The Time Of This Migration)
+WHITESPACE_RE = re.compile(r'\s+')
+NON_KEY_CHARS_RE = re.compile(r'[^a-z0-9 \-]')
+
+FLAGGED = sa.text('anomaly_score IS NOT NULL')
+
+
+def _merchant(description):
+    desc = WHITESPACE_RE.sub(' ', (description or '').strip().lower())
+    return NON_KEY_CHARS_RE.sub('', desc)
+
+
+def _archive_tables(conn):
+    return [f'expense_archive_{year}' for (year,) in conn.execute(sa.text('SELECT year FROM expense_partition'))]
+
+
+def _backfill_stats(conn, tables):
+    """Welford's running stats over every non-duplicate expense, live and archived."""
+    stats = {}
+    for table in tables:
+        rows = conn.execute(sa.text(
+            f'SELECT household_id, category_id, description, amount FROM {table} WHERE is_duplicate = 0'
+        ))
+        for household_id, category_id, description, amount in rows:
+            for key in ((household_id, 'category', str(category_id)), (household_id, 'merchant', _merchant(description))):
+                count, mean, m2 = stats.get(key, (0, 0.0, 0.0))
+                count += 1
+                delta = amount - mean
+                mean += delta / count
+                stats[key] = (count, mean, m2 + delta * (amount - mean))
+
+    if stats:
+        conn.execute(
+            sa.text('INSERT INTO expense_stat (household_id, kind, key, count, mean, m2) '
+                    'VALUES (:household_id, :kind, :key, :count, :mean, :m2)'),
+            [{'household_id': h, 'kind': kind, 'key': key, 'count': c, 'mean': mean, 'm2': m2}
+             for (h, kind, key), (c, mean, m2) in stats.items()],
+        )
+
+
+def upgrade():
+    op.create_table('expense_stat',
+    sa.Column('household_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('m2', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['household_id'], ['household.id'], ),
+    sa.PrimaryKeyConstraint('household_id', 'kind', 'key')
+    )
+
+    conn = op.get_bind()
+    archives = _archive_tables(conn)
+
+    # Plain ADD COLUMN: No Table Rebuild, So The Expense AUTOINCREMENT Counter Is Untouched
+    for table in ['expense', 'deleted_expense', *archives]:
+        op.add_column(table, sa.Column('anomaly_score', sa.Float(), nullable=True))
+    for table in ['expense', *archives]:
+        op.create_index(f'ix_{table}_household_flagged', table, ['household_id', 'spent_date', 'id'],
+                        unique=False, sqlite_where=FLAGGED)
+
+    # Existing Rows Stay Unflagged; They Only Teach The Stats What Normal Is
+    _backfill_stats(conn, ['expense', *archives])
+
+
+def downgrade():
+    conn = op.get_bind()
+    archives = _archive_tables(conn)
+
+    for table in ['expense', *archives]:
+        op.drop_index(f'ix_{table}_household_flagged', table_name=table)
+    for table in ['expense', 'deleted_expense', *archives]:
+        op.drop_column(table, 'anomaly_score')
+
+    op.drop_table('expense_stat')
@@ -0,0 +1,78 @@
+"""Add households and tenant-scoped indexes
+
+Revision ID: 3f1c9a6d2b84
+Revises: 209d7649614a
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a6d2b84'
+down_revision = '209d7649614a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    household = op.create_table('household',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Existing Data Belongs To The Default Household
+    op.bulk_insert(household, [{'id': 1, 'name': 'Default'}])
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('household_id', sa.Integer(), nullable=False, server_default=sa.text('1')))
+        batch_op.create_foreign_key('fk_bill_household_id_household', 'household', ['household_id'], ['id'])
+        batch_op.create_index('ix_bill_household_active', ['household_id', 'is_active', 'due_day'], unique=False)
+
+    with op.batch_alter_table('paycheck', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('household_id', sa.Integer(), nullable=False, server_default=sa.text('1')))
+        batch_op.create_foreign_key('fk_paycheck_household_id_household', 'household', ['household_id'], ['id'])
+        batch_op.create_index('ix_paycheck_household_pay_date', ['household_id', 'pay_date'], unique=False)
+
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('household_id', sa.Integer(), nullable=False, server_default=sa.text('1')))
+        batch_op.create_foreign_key('fk_expense_household_id_household', 'household', ['household_id'], ['id'])
+        batch_op.drop_index('ix_expense_fingerprint')
+        batch_op.create_index('ix_expense_household_spent_date', ['household_id', 'spent_date', 'id'], unique=False)
+        batch_op.create_index('ix_expense_household_fingerprint', ['household_id', 'fingerprint'], unique=False)
+        batch_op.create_index('ix_expense_household_duplicate', ['household_id', 'is_duplicate', 'spent_date'], unique=False)
+
+    with op.batch_alter_table('pay_schedule', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('household_id', sa.Integer(), nullable=False, server_default=sa.text('1')))
+        batch_op.create_foreign_key('fk_pay_schedule_household_id_household', 'household', ['household_id'], ['id'])
+        batch_op.create_index('ix_pay_schedule_household', ['household_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pay_schedule', schema=None) as batch_op:
+        batch_op.drop_index('ix_pay_schedule_household')
+        batch_op.drop_constraint('fk_pay_schedule_household_id_household', type_='foreignkey')
+        batch_op.drop_column('household_id')
+
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_household_duplicate')
+        batch_op.drop_index('ix_expense_household_fingerprint')
+        batch_op.drop_index('ix_expense_household_spent_date')
+        batch_op.create_index('ix_expense_fingerprint', ['fingerprint'], unique=False)
+        batch_op.drop_constraint('fk_expense_household_id_household', type_='foreignkey')
+        batch_op.drop_column('household_id')
+
+    with op.batch_alter_table('paycheck', schema=None) as batch_op:
+        batch_op.drop_index('ix_paycheck_household_pay_date')
+        batch_op.drop_constraint('fk_paycheck_household_id_household', type_='foreignkey')
+        batch_op.drop_column('household_id')
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_index('ix_bill_household_active')
+        batch_op.drop_constraint('fk_bill_household_id_household', type_='foreignkey')
+        batch_op.drop_column('household_id')
+
+    op.drop_table('household')
@@ -0,0 +1,30 @@
+"""Add recurrence rules to bills
+
+Revision ID: 4d2b8e6f1a93
+Revises: 7c3e91d0a4f5
+Create Date: 2026-10-19 16:21:05.660418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d2b8e6f1a93'
+down_revision = '7c3e91d0a4f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence', sa.String(length=20), nullable=False, server_default='monthly'))
+        batch_op.add_column(sa.Column('anchor_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('roll_forward_weekend', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_column('roll_forward_weekend')
+        batch_op.drop_column('anchor_date')
+        batch_op.drop_column('recurrence')
@@ -0,0 +1,37 @@
+"""Expense ids never reused (AUTOINCREMENT)
+
+Revision ID: 5a9e3c1f7b20
+Revises: e8d41b7a0c36
+Create Date: 2026-10-19 12:40:31.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e3c1f7b20'
+down_revision = 'e8d41b7a0c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('expense', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+    # Start Past Every Id Already Handed Out, Including Archived And Deleted Rows
+    conn = op.get_bind()
+    tables = ['expense', 'deleted_expense']
+    tables += [f'expense_archive_{year}' for (year,) in conn.execute(sa.text('SELECT year FROM expense_partition'))]
+    high = max(conn.execute(sa.text(f'SELECT COALESCE(MAX(id), 0) FROM {t}')).scalar() for t in tables)
+
+    conn.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'expense'"))
+    conn.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('expense', :seq)"), {'seq': high})
+
+
+def downgrade():
+    with op.batch_alter_table('expense', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
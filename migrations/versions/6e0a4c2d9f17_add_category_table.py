@@ -0,0 +1,166 @@
+"""Add category table; expenses and bills reference categories by id
+
+Revision ID: 6e0a4c2d9f17
+Revises: 9b1f5c7e3d28
+Create Date: 2026-10-19 19:21:05.640112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e0a4c2d9f17'
+down_revision = '9b1f5c7e3d28'
+branch_labels = None
+depends_on = None
+
+# Every Household Starts With These (Copied From app/constants.py At The Time Of This Migration)
+DEFAULT_CATEGORIES = [
+    'Uncategorized', 'Bills', 'Groceries', 'Gas', 'Shopping', 'Entertainment',
+    'Medical', 'Subscriptions', 'Travel', 'Fees', 'Income', 'Other',
+]
+
+# `bulk_action_row` Has No household_id Of Its Own
+BULK_ACTION_HOUSEHOLD = '(SELECT household_id FROM bulk_action WHERE bulk_action.id = bulk_action_row.action_id)'
+
+
+def _archive_years(conn):
+    return [year for (year,) in conn.execute(sa.text('SELECT year FROM expense_partition'))]
+
+
+def _category_tables(conn):
+    """(table, SQL for a row's household) of every table with a category column."""
+    tables = [('expense', 'household_id'), ('bill', 'household_id'), ('bulk_action', 'household_id'),
+              ('bulk_action_row', BULK_ACTION_HOUSEHOLD), ('deleted_expense', 'household_id')]
+    tables += [(f'expense_archive_{year}', 'household_id') for year in _archive_years(conn)]
+    return tables
+
+
+def _expense_sequence(conn):
+    return conn.execute(sa.text("SELECT seq FROM sqlite_sequence WHERE name = 'expense'")).scalar()
+
+
+def _restore_expense_sequence(conn, seq):
+    # Rebuilding `expense` Resets Its AUTOINCREMENT Counter To MAX(id); Ids Of Deleted Rows Must Stay Retired
+    if seq is None:
+        return
+    conn.execute(sa.text("UPDATE sqlite_sequence SET seq = MAX(seq, :seq) WHERE name = 'expense'"), {'seq': seq})
+
+
+def upgrade():
+    op.create_table('category',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('household_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['household_id'], ['household.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.create_index('ix_category_household_name', ['household_id', 'name'], unique=True)
+
+    with op.batch_alter_table('household', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('categories_version', sa.Integer(), server_default='0', nullable=False))
+
+    conn = op.get_bind()
+    tables = _category_tables(conn)
+
+    # Defaults For Every Household, Then Every Name Already In Use
+    for name in DEFAULT_CATEGORIES:
+        conn.execute(sa.text('INSERT OR IGNORE INTO category (household_id, name) SELECT id, :name FROM household'),
+                     {'name': name})
+    for table, household in tables:
+        conn.execute(sa.text(
+            f'INSERT OR IGNORE INTO category (household_id, name) '
+            f'SELECT DISTINCT {household}, category FROM {table} WHERE category IS NOT NULL'
+        ))
+
+    for table, household in tables:
+        op.add_column(table, sa.Column('category_id', sa.Integer(), nullable=True))
+        conn.execute(sa.text(
+            f'UPDATE {table} SET category_id = (SELECT category.id FROM category '
+            f'WHERE category.household_id = {household} AND category.name = {table}.category)'
+        ))
+
+    seq = _expense_sequence(conn)
+    with op.batch_alter_table('expense', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('category')
+        batch_op.alter_column('category_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_expense_category_id_category', 'category', ['category_id'], ['id'])
+        batch_op.create_index('ix_expense_household_category_date', ['household_id', 'category_id', 'spent_date'], unique=False)
+    _restore_expense_sequence(conn, seq)
+
+    with op.batch_alter_table('bill', schema=None, recreate='always') as batch_op:
+        batch_op.drop_column('category')
+        batch_op.alter_column('category_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_bill_category_id_category', 'category', ['category_id'], ['id'])
+
+    with op.batch_alter_table('bulk_action', schema=None, recreate='always') as batch_op:
+        batch_op.drop_column('category')
+        batch_op.create_foreign_key('fk_bulk_action_category_id_category', 'category', ['category_id'], ['id'])
+
+    for table in ('bulk_action_row', 'deleted_expense'):
+        with op.batch_alter_table(table, schema=None, recreate='always') as batch_op:
+            batch_op.drop_column('category')
+            batch_op.alter_column('category_id', existing_type=sa.Integer(), nullable=False)
+
+    # Yearly Archive Tables Must Keep The Same Columns As `expense`
+    for year in _archive_years(conn):
+        table = f'expense_archive_{year}'
+        with op.batch_alter_table(table, schema=None, recreate='always') as batch_op:
+            batch_op.drop_column('category')
+            batch_op.alter_column('category_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_index(f'ix_{table}_household_category_date', ['household_id', 'category_id', 'spent_date'], unique=False)
+
+
+def _restore_names(conn, table):
+    op.add_column(table, sa.Column('category', sa.String(length=50), nullable=True))
+    conn.execute(sa.text(
+        f'UPDATE {table} SET category = (SELECT category.name FROM category WHERE category.id = {table}.category_id)'
+    ))
+
+
+def downgrade():
+    conn = op.get_bind()
+    for table, _ in _category_tables(conn):
+        _restore_names(conn, table)
+
+    for year in _archive_years(conn):
+        table = f'expense_archive_{year}'
+        with op.batch_alter_table(table, schema=None, recreate='always') as batch_op:
+            batch_op.drop_index(f'ix_{table}_household_category_date')
+            batch_op.drop_column('category_id')
+            batch_op.alter_column('category', existing_type=sa.String(length=50), nullable=False)
+
+    for table in ('deleted_expense', 'bulk_action_row'):
+        with op.batch_alter_table(table, schema=None, recreate='always') as batch_op:
+            batch_op.drop_column('category_id')
+            batch_op.alter_column('category', existing_type=sa.String(length=50), nullable=False)
+
+    with op.batch_alter_table('bulk_action', schema=None, recreate='always') as batch_op:
+        batch_op.drop_constraint('fk_bulk_action_category_id_category', type_='foreignkey')
+        batch_op.drop_column('category_id')
+
+    with op.batch_alter_table('bill', schema=None, recreate='always') as batch_op:
+        batch_op.drop_constraint('fk_bill_category_id_category', type_='foreignkey')
+        batch_op.drop_column('category_id')
+        batch_op.alter_column('category', existing_type=sa.String(length=50), nullable=False)
+
+    seq = _expense_sequence(conn)
+    with op.batch_alter_table('expense', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_index('ix_expense_household_category_date')
+        batch_op.drop_constraint('fk_expense_category_id_category', type_='foreignkey')
+        batch_op.drop_column('category_id')
+        batch_op.alter_column('category', existing_type=sa.String(length=50), nullable=False)
+    _restore_expense_sequence(conn, seq)
+
+    with op.batch_alter_table('household', schema=None) as batch_op:
+        batch_op.drop_column('categories_version')
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.drop_index('ix_category_household_name')
+
+    op.drop_table('category')
@@ -0,0 +1,52 @@
+"""Add FITID to expenses
+
+Revision ID: 7c3e91d0a4f5
+Revises: 5a9e3c1f7b20
+Create Date: 2026-10-19 15:02:47.318520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e91d0a4f5'
+down_revision = '5a9e3c1f7b20'
+branch_labels = None
+depends_on = None
+
+
+def _archive_years(conn):
+    return [year for (year,) in conn.execute(sa.text('SELECT year FROM expense_partition'))]
+
+
+def upgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fitid', sa.String(length=255), nullable=True))
+        batch_op.create_index('ix_expense_household_fitid', ['household_id', 'fitid'], unique=False)
+
+    with op.batch_alter_table('deleted_expense', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fitid', sa.String(length=255), nullable=True))
+
+    # Yearly Archive Tables Must Keep The Same Columns As `expense`
+    conn = op.get_bind()
+    for year in _archive_years(conn):
+        table = f'expense_archive_{year}'
+        op.add_column(table, sa.Column('fitid', sa.String(length=255), nullable=True))
+        op.create_index(f'ix_{table}_household_fitid', table, ['household_id', 'fitid'], unique=False)
+
+
+def downgrade():
+    conn = op.get_bind()
+    for year in _archive_years(conn):
+        table = f'expense_archive_{year}'
+        op.drop_index(f'ix_{table}_household_fitid', table_name=table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('fitid')
+
+    with op.batch_alter_table('deleted_expense', schema=None) as batch_op:
+        batch_op.drop_column('fitid')
+
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_household_fitid')
+        batch_op.drop_column('fitid')
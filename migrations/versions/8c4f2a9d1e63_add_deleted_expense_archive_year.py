@@ -0,0 +1,26 @@
+"""Add deleted_expense.archive_year
+
+Revision ID: 8c4f2a9d1e63
+Revises: 2f8d6b1c4a57
+Create Date: 2026-10-19 23:14:06.581930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4f2a9d1e63'
+down_revision = '2f8d6b1c4a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows Already In The Undo Log Came From `expense`, Which NULL Means
+    op.add_column('deleted_expense', sa.Column('archive_year', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('deleted_expense', schema=None) as batch_op:
+        batch_op.drop_column('archive_year')
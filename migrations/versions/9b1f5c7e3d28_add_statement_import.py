@@ -0,0 +1,41 @@
+"""Add statement_import records
+
+Revision ID: 9b1f5c7e3d28
+Revises: 4d2b8e6f1a93
+Create Date: 2026-10-19 17:08:44.127903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f5c7e3d28'
+down_revision = '4d2b8e6f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('statement_import',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('household_id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('duplicate_count', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('imported_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['household_id'], ['household.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('statement_import', schema=None) as batch_op:
+        batch_op.create_index('ix_statement_import_household_sha256', ['household_id', 'sha256'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('statement_import', schema=None) as batch_op:
+        batch_op.drop_index('ix_statement_import_household_sha256')
+
+    op.drop_table('statement_import')
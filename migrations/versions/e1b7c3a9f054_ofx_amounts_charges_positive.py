@@ -0,0 +1,92 @@
+"""OFX-imported amounts follow the CSV sign convention (charges positive)
+
+Revision ID: e1b7c3a9f054
+Revises: 8c4f2a9d1e63
+Create Date: 2026-10-20 09:41:27.104385
+
+"""
+import hashlib
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c3a9f054'
+down_revision = '8c4f2a9d1e63'
+branch_labels = None
+depends_on = None
+
+# Fingerprints (Copied From app/utils At The Time Of This Migration)
+WHITESPACE_RE = re.compile(r'\s+')
+NON_KEY_CHARS_RE = re.compile(r'[^a-z0-9 \-]')
+
+
+def _merchant(description):
+    desc = WHITESPACE_RE.sub(' ', (description or '').strip().lower())
+    return NON_KEY_CHARS_RE.sub('', desc)
+
+
+def _fingerprint(spent_date, amount, description):
+    key = f'{spent_date}|{float(amount):.2f}|{_merchant(description)}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _archive_tables(conn):
+    return [f'expense_archive_{year}' for (year,) in conn.execute(sa.text('SELECT year FROM expense_partition'))]
+
+
+def _flip_ofx_amounts(conn, tables):
+    """Negate every OFX row's amount (only OFX rows carry a FITID) and refresh its fingerprint."""
+    for table in tables:
+        rows = conn.execute(sa.text(
+            f'SELECT id, spent_date, description, amount FROM {table} WHERE fitid IS NOT NULL'
+        )).all()
+        if rows:
+            conn.execute(
+                sa.text(f'UPDATE {table} SET amount = :amount, fingerprint = :fingerprint WHERE id = :id'),
+                [{'id': id_, 'amount': -amount, 'fingerprint': _fingerprint(spent_date, -amount, description)}
+                 for id_, spent_date, description, amount in rows],
+            )
+
+
+def _rebuild_stats(conn, tables):
+    """Welford's running stats over every non-duplicate expense, live and archived, from scratch."""
+    stats = {}
+    for table in tables:
+        rows = conn.execute(sa.text(
+            f'SELECT household_id, category_id, description, amount FROM {table} WHERE is_duplicate = 0'
+        ))
+        for household_id, category_id, description, amount in rows:
+            for key in ((household_id, 'category', str(category_id)), (household_id, 'merchant', _merchant(description))):
+                count, mean, m2 = stats.get(key, (0, 0.0, 0.0))
+                count += 1
+                delta = amount - mean
+                mean += delta / count
+                stats[key] = (count, mean, m2 + delta * (amount - mean))
+
+    conn.execute(sa.text('DELETE FROM expense_stat'))
+    if stats:
+        conn.execute(
+            sa.text('INSERT INTO expense_stat (household_id, kind, key, count, mean, m2) '
+                    'VALUES (:household_id, :kind, :key, :count, :mean, :m2)'),
+            [{'household_id': h, 'kind': kind, 'key': key, 'count': c, 'mean': mean, 'm2': m2}
+             for (h, kind, key), (c, mean, m2) in stats.items()],
+        )
+
+
+def _migrate(conn):
+    # Duplicate Flags Are Left As They Are; `flask expenses reconcile-duplicates` Re-Pairs CSV/OFX Copies
+    tables = ['expense', *_archive_tables(conn)]
+    _flip_ofx_amounts(conn, [*tables, 'deleted_expense'])
+    _rebuild_stats(conn, tables)
+
+
+def upgrade():
+    _migrate(op.get_bind())
+
+
+def downgrade():
+    # Negating Is Its Own Inverse
+    _migrate(op.get_bind())
@@ -0,0 +1,30 @@
+"""Add category.is_income
+
+Revision ID: f3a8d2c6b915
+Revises: e1b7c3a9f054
+Create Date: 2026-10-20 11:06:52.731940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d2c6b915'
+down_revision = 'e1b7c3a9f054'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN: No Table Rebuild
+    op.add_column('category', sa.Column('is_income', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    # Until Now The Income Category Was Whichever One Is Named "Income"
+    op.execute("UPDATE category SET is_income = 1 WHERE name = 'Income'")
+    op.execute('UPDATE household SET categories_version = categories_version + 1')
+
+
+def downgrade():
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.drop_column('is_income')
@@ -0,0 +1,28 @@
+import pytest
+from flask_migrate import upgrade
+
+from app import create_app
+from app.extensions import db
+from app.queryplans import MIGRATIONS_DIR
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a scratch database built from the migrations."""
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / "app.db"),
+        "TESTING": True,
+        "TEMPLATE_WARMUP": False,
+    })
+    app.instance_path = str(tmp_path)
+
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,121 @@
+import io
+import math
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.anomalies import ANOMALY_THRESHOLD
+from app.categories import category_id_for, ensure_category
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import Expense, ExpenseStat
+from app.statements import collect_rows, iter_ofx_rows
+from app.utils import normalize_description
+
+HOUSEHOLD_ID = 1
+START = date(2026, 6, 1)
+
+# Charges From A Bank Statement (Debits Negative), Then The Same Merchants Entered As CSV (Charges Positive)
+GROCER_CHARGES = [-38.10, -44.75, -40.20, -42.90, -39.55, -41.30, -43.05, -40.80]
+
+
+def ofx(transactions):
+    trns = "".join(
+        f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>{d:%Y%m%d}<TRNAMT>{amount:.2f}<FITID>{fitid}<NAME>{name}</STMTTRN>\n"
+        for fitid, d, amount, name in transactions
+    )
+    return f"OFXHEADER:100\n<OFX><BANKTRANLIST>\n{trns}</BANKTRANLIST></OFX>\n"
+
+
+def import_ofx(transactions):
+    rows, errors = collect_rows(iter_ofx_rows(io.StringIO(ofx(transactions))))
+    assert errors == 0
+    return write_expenses(HOUSEHOLD_ID, rows)
+
+
+def seed_grocer():
+    import_ofx([
+        (f"G{i}", START + timedelta(days=7 * i), amount, "FRESH MARKET")
+        for i, amount in enumerate(GROCER_CHARGES)
+    ])
+
+
+def score_of(description):
+    return db.session.execute(
+        select(Expense.anomaly_score).where(Expense.description == description).order_by(Expense.id.desc())
+    ).scalars().first()
+
+
+def stats():
+    return {
+        (s.kind, s.key): (s.count, s.mean, s.m2)
+        for s in ExpenseStat.query.filter_by(household_id=HOUSEHOLD_ID)
+    }
+
+
+def recomputed_stats():
+    """Stats straight from the expenses."""
+    groups = {}
+    for e in Expense.query.filter_by(household_id=HOUSEHOLD_ID, is_duplicate=False):
+        for key in (("category", str(e.category_id)), ("merchant", normalize_description(e.description))):
+            groups.setdefault(key, []).append(e.amount)
+    result = {}
+    for key, amounts in groups.items():
+        mean = sum(amounts) / len(amounts)
+        result[key] = (len(amounts), mean, sum((x - mean) ** 2 for x in amounts))
+    return result
+
+
+def assert_stats_match():
+    expected = recomputed_stats()
+    actual = {key: stat for key, stat in stats().items() if stat[0]}
+    assert actual.keys() == expected.keys()
+    for key, (count, mean, m2) in expected.items():
+        assert actual[key][0] == count
+        assert math.isclose(actual[key][1], mean, abs_tol=1e-9)
+        assert math.isclose(actual[key][2], m2, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def test_large_ofx_debit_is_flagged(app):
+    seed_grocer()
+    import_ofx([("G-BIG", START + timedelta(days=70), -400.00, "FRESH MARKET")])
+
+    assert score_of("FRESH MARKET") >= ANOMALY_THRESHOLD
+    assert stats()[("merchant", "fresh market")][1] > 0
+
+
+def test_ordinary_ofx_debit_is_not_flagged(app):
+    seed_grocer()
+    import_ofx([("G-OK", START + timedelta(days=70), -42.00, "FRESH MARKET")])
+
+    assert score_of("FRESH MARKET") is None
+
+
+def test_csv_and_ofx_history_share_one_merchant_mean(app):
+    seed_grocer()
+    write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": (START + timedelta(days=3 + 7 * i)).isoformat(), "description": "Fresh Market",
+         "amount": -amount, "category": "Uncategorized"}
+        for i, amount in enumerate(GROCER_CHARGES)
+    ])
+
+    count, mean, m2 = stats()[("merchant", "fresh market")]
+    assert count == 2 * len(GROCER_CHARGES)
+    assert math.isclose(mean, sum(-a for a in GROCER_CHARGES) / len(GROCER_CHARGES))
+    # OFX Charges Are Stored Positive Like CSV Ones, So The Spread Stays That Of The Charges
+    assert math.sqrt(m2 / (count - 1)) < 3
+    assert_stats_match()
+
+
+def test_category_edit_moves_amounts(app, client):
+    seed_grocer()
+    ensure_category(HOUSEHOLD_ID, "Groceries")
+    groceries = category_id_for(HOUSEHOLD_ID, "Groceries")
+    ids = db.session.execute(select(Expense.id).order_by(Expense.id)).scalars().all()
+
+    client.post(f"/expenses/{ids[0]}/category", data={"category": "Groceries"})
+    client.post("/expenses/bulk-category", data={"category": "Groceries", "expense_ids": ids[1:4]})
+
+    db.session.expire_all()
+    assert stats()[("category", str(groceries))][0] == 4
+    assert_stats_match()
@@ -0,0 +1,54 @@
+import gc
+
+from flask_migrate import upgrade
+
+import app as app_module
+from app import create_app, reset_after_fork
+from app.categories import category_id_for, ensure_category
+from app.extensions import db
+from app.queryplans import MIGRATIONS_DIR
+
+
+def serving_app(path):
+    """An app on its own migrated database that has rendered the dashboard once."""
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "TESTING": True, "TEMPLATE_WARMUP": False})
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+    assert app.test_client().get("/").status_code == 200
+    with app.app_context():
+        db.engine.dispose()
+    return app
+
+
+def test_create_app_does_not_keep_apps_alive(tmp_path):
+    before = len(app_module._apps)
+    for n in range(3):
+        serving_app(tmp_path / f"app{n}.db")
+    gc.collect()
+
+    # The Single Fork Hook Only Sees Apps That Are Still Referenced Elsewhere
+    assert len(app_module._apps) == before
+
+
+def test_fork_hook_resets_live_bus(tmp_path):
+    app = serving_app(tmp_path / "app.db")
+    bus = app.extensions["live_bus"]
+    assert bus._snapshots
+
+    reset_after_fork()
+
+    assert bus._snapshots == {} and bus._watcher is None
+
+
+def test_category_maps_are_cached_per_app(tmp_path):
+    first, second = serving_app(tmp_path / "first.db"), serving_app(tmp_path / "second.db")
+    with first.app_context():
+        pets = ensure_category(1, "Pets")
+    with second.app_context():
+        garden = ensure_category(1, "Garden")
+
+    # Both Databases Are Now At The Same categories_version; Each App Must Still See Its Own Names
+    assert pets == garden
+    with first.app_context():
+        assert category_id_for(1, "Pets") == pets
+        assert category_id_for(1, "Garden") is None
@@ -0,0 +1,53 @@
+import re
+from datetime import date
+
+from flask_migrate import downgrade
+from sqlalchemy import inspect, select, text
+
+from app.archive import archive_expenses
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import Expense
+from app.queryplans import MIGRATIONS_DIR
+
+HOUSEHOLD_ID = 1
+
+
+def seed():
+    write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": "2021-03-04", "description": "Old Hardware", "amount": 19.99, "category": "Shopping"},
+        {"spent_date": "2026-10-01", "description": "New Hardware", "amount": 24.50, "category": "Shopping"},
+    ])
+    assert archive_expenses(date(2022, 1, 1)) == {2021: 1}
+    return dict(db.session.execute(select(Expense.description, Expense.id)).all())
+
+
+def row_html(html, description):
+    rows = re.findall(r'<tr id="expense-\d+">.*?</tr>', html, re.S)
+    return next(row for row in rows if description in row)
+
+
+def test_archived_rows_render_read_only(client):
+    live_id = seed()["New Hardware"]
+
+    html = client.get("/expenses?preset=all_time").get_data(as_text=True)
+    archived = row_html(html, "Old Hardware")
+    live = row_html(html, "New Hardware")
+
+    assert 'name="expense_ids"' not in archived
+    assert "data-row-action" not in archived
+    assert "Archived" in archived
+    assert f'name="expense_ids" value="{live_id}"' in live
+    assert 'data-row-action="category"' in live and 'data-row-action="delete"' in live
+
+
+def test_downgrade_moves_archived_rows_back(app):
+    seed()
+
+    downgrade(directory=MIGRATIONS_DIR, revision="3f1c9a6d2b84")
+
+    conn = db.session.connection()
+    assert not [name for name in inspect(conn).get_table_names() if name.startswith("expense_archive_")]
+    assert conn.execute(text("SELECT description FROM expense ORDER BY id")).scalars().all() == [
+        "Old Hardware", "New Hardware",
+    ]
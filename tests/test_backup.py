@@ -0,0 +1,16 @@
+import sqlite3
+
+from app.backup import create_backup, list_backups
+
+
+def test_backups_in_the_same_second_keep_both_snapshots(tmp_path):
+    source = tmp_path / "app.db"
+    with sqlite3.connect(source) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.close()
+
+    first = create_backup(str(source), str(tmp_path / "backups"), keep=7)
+    second = create_backup(str(source), str(tmp_path / "backups"), keep=7)
+
+    assert first["name"] != second["name"]
+    assert [b["name"] for b in list_backups(str(tmp_path / "backups"))] == [second["name"], first["name"]]
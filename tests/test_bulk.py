@@ -0,0 +1,79 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app.archive import archive_expenses, archive_table
+from app.categories import category_id_for, ensure_category
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import BulkAction, Expense, ExpenseStat
+
+HOUSEHOLD_ID = 1
+ALL_TIME = {"preset": "all_time", "show": "all", "category_id": "", "start": "2000-01-01", "end": "2026-12-31"}
+
+
+def seed():
+    write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": "2021-03-04", "description": "Hardware Store", "amount": 19.99, "category": "Shopping"},
+        {"spent_date": "2026-10-01", "description": "Hardware Store", "amount": 24.50, "category": "Shopping"},
+    ])
+    archive_expenses(date(2022, 1, 1))
+
+
+def categories():
+    """Category ids of the live and the archived row."""
+    archived = archive_table(2021)
+    return {
+        "live": db.session.execute(select(Expense.category_id)).scalar_one(),
+        "archived": db.session.execute(select(archived.c.category_id)).scalar_one(),
+    }
+
+
+def counts():
+    archived = archive_table(2021)
+    return (
+        db.session.execute(select(func.count()).select_from(Expense)).scalar(),
+        db.session.execute(select(func.count()).select_from(archived)).scalar(),
+    )
+
+
+def category_count(category_id):
+    stat = db.session.get(ExpenseStat, (HOUSEHOLD_ID, "category", str(category_id)))
+    return stat.count if stat else 0
+
+
+def undo(client):
+    action_id = db.session.execute(select(BulkAction.id).order_by(BulkAction.id.desc())).scalar()
+    client.post(f"/expenses/bulk-actions/{action_id}/undo")
+
+
+def test_apply_to_all_matching_covers_archived_rows(client):
+    seed()
+    ensure_category(HOUSEHOLD_ID, "Home")
+    shopping = category_id_for(HOUSEHOLD_ID, "Shopping")
+    home = category_id_for(HOUSEHOLD_ID, "Home")
+
+    client.post("/expenses/bulk-category/matching", data={**ALL_TIME, "category": "Home"})
+
+    assert categories() == {"live": home, "archived": home}
+    assert (category_count(shopping), category_count(home)) == (0, 2)
+    assert db.session.execute(select(BulkAction.row_count)).scalar() == 2
+
+    undo(client)
+
+    assert categories() == {"live": shopping, "archived": shopping}
+    assert (category_count(shopping), category_count(home)) == (2, 0)
+
+
+def test_delete_all_matching_covers_archived_rows(client):
+    seed()
+
+    client.post("/expenses/bulk-delete/matching", data=ALL_TIME)
+
+    assert counts() == (0, 0)
+    assert db.session.execute(select(BulkAction.row_count)).scalar() == 2
+
+    undo(client)
+
+    # Each Row Goes Back To The Table It Was Deleted From
+    assert counts() == (1, 1)
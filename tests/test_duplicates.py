@@ -0,0 +1,89 @@
+import io
+
+from sqlalchemy import select
+
+from app.duplicates import reconcile_duplicates
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import Expense
+from app.statements import collect_rows, iter_ofx_rows
+
+HOUSEHOLD_ID = 1
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261002<TRNAMT>-41.20<FITID>TXN-1001<NAME>{name1}</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261003<TRNAMT>-12.00<FITID>TXN-1002<NAME>{name2}</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def import_ofx(text):
+    rows, errors = collect_rows(iter_ofx_rows(io.StringIO(text)))
+    assert errors == 0
+    return write_expenses(HOUSEHOLD_ID, rows)
+
+
+def flags():
+    return db.session.execute(
+        select(Expense.id, Expense.is_duplicate, Expense.duplicate_of_id).order_by(Expense.id)
+    ).all()
+
+
+def flags_and_amounts():
+    return db.session.execute(
+        select(Expense.id, Expense.is_duplicate, Expense.duplicate_of_id, Expense.amount).order_by(Expense.id)
+    ).all()
+
+
+def reconcile():
+    with db.engine.begin() as conn:
+        return reconcile_duplicates(conn, HOUSEHOLD_ID)
+
+
+def test_ofx_copy_of_a_csv_charge_is_flagged(app):
+    assert write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": "2026-10-02", "description": "Fresh Market", "amount": 41.20, "category": "Groceries"},
+    ]) == (1, 0)
+
+    # The Bank Sends The Same Charge As -41.20; It Is Stored As 41.20 Like The CSV Row
+    assert import_ofx(OFX.format(name1="FRESH MARKET", name2="CITY PARKING")) == (2, 1)
+    assert [(amount, dup, of) for _, dup, of, amount in flags_and_amounts()] == [
+        (41.20, False, None), (41.20, True, 1), (12.00, False, None)
+    ]
+    assert reconcile() == 0
+
+
+def test_reconcile_keeps_flags_of_an_ofx_imported_twice(app):
+    statement = OFX.format(name1="FRESH MARKET", name2="CITY PARKING")
+    assert import_ofx(statement) == (2, 0)
+    assert import_ofx(statement) == (2, 2)
+    before = flags()
+
+    assert reconcile() == 0
+    assert flags() == before
+    assert [(dup, of) for _, dup, of in before] == [(False, None), (False, None), (True, 1), (True, 2)]
+
+
+def test_reconcile_keeps_fitid_copies_whose_fingerprint_differs(app):
+    import_ofx(OFX.format(name1="FRESH MARKET", name2="CITY PARKING"))
+    # The Bank Renamed The Transactions On A Later Download; The FITIDs Still Match
+    assert import_ofx(OFX.format(name1="FRESH MARKET #0412", name2="CITY OF SPRINGFIELD PARKING")) == (2, 2)
+
+    assert reconcile() == 0
+    assert [(dup, of) for _, dup, of in flags()] == [(False, None), (False, None), (True, 1), (True, 2)]
+
+
+def test_reconcile_repoints_copies_of_a_deleted_original(app):
+    statement = OFX.format(name1="FRESH MARKET", name2="CITY PARKING")
+    import_ofx(statement)
+    import_ofx(statement)
+    import_ofx(statement)
+
+    db.session.delete(db.session.get(Expense, 1))
+    db.session.commit()
+
+    assert reconcile() == 2
+    assert [(i, dup, of) for i, dup, of in flags()] == [
+        (2, False, None), (3, False, None), (4, True, 2), (5, True, 3), (6, True, 2)
+    ]
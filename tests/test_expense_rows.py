@@ -0,0 +1,39 @@
+from sqlalchemy import select
+
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import Expense
+
+HOUSEHOLD_ID = 1
+FRAGMENT = {"X-Requested-With": "fetch"}
+
+
+def seed():
+    write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": "2026-10-01", "description": "Hardware Store", "amount": 24.50, "category": "Shopping"},
+        {"spent_date": "2026-10-02", "description": "Corner Cafe", "amount": 4.25, "category": "Dining"},
+    ])
+    return db.session.execute(select(Expense.id).order_by(Expense.id)).scalars().all()
+
+
+def test_row_delete_returns_the_new_filtered_total(client):
+    hardware, cafe = seed()
+
+    response = client.post(f"/expenses/{cafe}/delete?preset=all_time", headers=FRAGMENT)
+
+    assert response.status_code == 204
+    assert response.headers["X-Expense-Total"] == "24.50"
+
+
+def test_row_category_change_returns_the_total_of_the_pages_filter(client):
+    hardware, cafe = seed()
+    shopping = db.session.get(Expense, hardware).category_id
+
+    # The Cafe Row Moves Into The Category The Page Is Filtered On
+    response = client.post(
+        f"/expenses/{cafe}/category?preset=all_time&category_id={shopping}",
+        data={"category": "Shopping"}, headers=FRAGMENT,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Expense-Total"] == "28.75"
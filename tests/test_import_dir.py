@@ -0,0 +1,26 @@
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import Expense
+
+
+def test_import_dir_writes_in_batches_and_reports_bad_files(app, tmp_path):
+    statements = tmp_path / "statements"
+    statements.mkdir()
+    for month in range(1, 6):
+        lines = ["date,description,amount,category"]
+        lines += [f"2026-{month:02d}-{day:02d},Corner Cafe {month},{4 + day}.50,Dining" for day in range(1, 11)]
+        (statements / f"{month:02d}.csv").write_text("\n".join(lines) + "\n")
+    (statements / "broken.csv").write_text("foo,bar\n1,2\n")
+    (statements / "partial.csv").write_text("date,description,amount\n2026-06-01,Bakery,abc\n2026-06-02,Bakery,3\n")
+
+    result = app.test_cli_runner().invoke(
+        args=["expenses", "import-dir", str(statements), "--workers", "2", "--batch-size", "7"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Imported 51 expenses" in result.output
+    assert "from 6/7 files" in result.output
+    assert "broken.csv: CSV must include headers" in result.output
+    assert "partial.csv: 1 unreadable rows (1 imported)" in result.output
+    assert db.session.execute(select(func.count()).select_from(Expense)).scalar() == 51
@@ -0,0 +1,63 @@
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.categories import category_id_for
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import Paycheck
+from app.reconcile import match_paychecks, reconcile_paychecks
+
+HOUSEHOLD_ID = 1
+FIRST_PAYDAY = date(2026, 7, 3)
+
+PaycheckRow = namedtuple("PaycheckRow", "id source amount pay_date")
+DepositRow = namedtuple("DepositRow", "id spent_date description amount")
+
+
+def test_match_pairs_nearest_deposit_within_tolerances():
+    paychecks = [
+        PaycheckRow(1, "Job", Decimal("2400.00"), date(2026, 7, 3)),
+        PaycheckRow(2, "Job", Decimal("2400.00"), date(2026, 7, 17)),
+        PaycheckRow(3, "Job", Decimal("2400.00"), date(2026, 7, 31)),
+    ]
+    deposits = [
+        DepositRow(10, date(2026, 6, 20), "REFUND", -35.00),
+        DepositRow(11, date(2026, 7, 2), "PAYROLL", -2400.00),
+        DepositRow(12, date(2026, 7, 3), "PAYROLL", -2400.00),
+        # Off By A Dollar, So Not The Paycheck Of The 17th
+        DepositRow(13, date(2026, 7, 17), "PAYROLL", -2399.00),
+        # Too Late For The 31st
+        DepositRow(14, date(2026, 8, 6), "PAYROLL", -2400.00),
+    ]
+
+    report = match_paychecks(paychecks, deposits)
+
+    assert [(p.id, d.id) for p, d in report["matched"]] == [(1, 12)]
+    assert [p.id for p in report["missing"]] == [2, 3]
+    assert [d.id for d in report["extra"]] == [10, 11, 13, 14]
+
+
+def test_match_allows_a_cent_of_rounding():
+    paychecks = [PaycheckRow(1, "Job", Decimal("1234.56"), date(2026, 7, 3))]
+    deposits = [DepositRow(10, date(2026, 7, 6), "PAYROLL", -1234.57)]
+
+    assert len(match_paychecks(paychecks, deposits)["matched"]) == 1
+    assert len(match_paychecks(paychecks, deposits, date_tolerance=2)["matched"]) == 0
+
+
+def test_renamed_income_category_still_matches(client):
+    paydays = [FIRST_PAYDAY + timedelta(days=14 * i) for i in range(6)]
+    write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": day.isoformat(), "description": "EMPLOYER PAYROLL", "amount": -2400.00, "category": "Income"}
+        for day in paydays
+    ])
+    db.session.add_all(Paycheck(household_id=HOUSEHOLD_ID, source="Job", amount=2400, pay_date=day) for day in paydays)
+    db.session.commit()
+    assert len(reconcile_paychecks(HOUSEHOLD_ID)["matched"]) == 6
+
+    client.post(f"/settings/categories/{category_id_for(HOUSEHOLD_ID, 'Income')}/rename", data={"name": "Salary"})
+
+    report = reconcile_paychecks(HOUSEHOLD_ID)
+    assert len(report["matched"]) == 6
+    assert report["missing"] == []
@@ -0,0 +1,35 @@
+from datetime import date
+from types import SimpleNamespace
+
+from app.utils import bill_occurrences, next_bill_due_dates
+
+
+def bill(recurrence, anchor, due_day=1, roll_forward_weekend=False):
+    return SimpleNamespace(
+        recurrence=recurrence, due_day=due_day, anchor_date=anchor, create_at=date(2026, 1, 1),
+        roll_forward_weekend=roll_forward_weekend,
+    )
+
+
+def test_weekly_bill_starts_at_its_anchor():
+    weekly = bill("weekly", date(2026, 11, 20))
+    due = [d for _, d in bill_occurrences([weekly], date(2026, 10, 1), date(2026, 12, 10))]
+    assert due == [date(2026, 11, 20), date(2026, 11, 27), date(2026, 12, 4)]
+
+
+def test_biweekly_bill_with_future_anchor_has_nothing_before_it():
+    biweekly = bill("biweekly", date(2026, 12, 15))
+    assert bill_occurrences([biweekly], date(2026, 10, 1), date(2026, 12, 14)) == []
+    assert next_bill_due_dates([biweekly], date(2026, 10, 19)) == [date(2026, 12, 15)]
+
+
+def test_weekly_bill_with_past_anchor_keeps_its_phase():
+    weekly = bill("weekly", date(2026, 1, 2))
+    due = [d for _, d in bill_occurrences([weekly], date(2026, 10, 19), date(2026, 11, 1))]
+    assert due == [date(2026, 10, 23), date(2026, 10, 30)]
+
+
+def test_monthly_due_day_clamps_to_month_end():
+    monthly = bill("monthly", None, due_day=31)
+    due = [d for _, d in bill_occurrences([monthly], date(2026, 2, 1), date(2026, 4, 30))]
+    assert due == [date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)]
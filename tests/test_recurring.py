@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from app.categories import category_id_for
+from app.importer import write_expenses
+from app.recurring import detect_recurring
+
+HOUSEHOLD_ID = 1
+TODAY = date(2026, 10, 20)
+
+
+def monthly(description, amount, category, months=6, day=5):
+    return [
+        {"spent_date": date(2026, 10 - k, day).isoformat(), "description": description,
+         "amount": amount, "category": category}
+        for k in range(months)
+    ]
+
+
+def suggested_names():
+    return [s["name"] for s in detect_recurring(HOUSEHOLD_ID, TODAY)]
+
+
+def test_steady_monthly_charge_is_suggested(app):
+    write_expenses(HOUSEHOLD_ID, monthly("STREAMFLIX.COM", 15.99, "Subscriptions"))
+    # Same Rhythm But The Amount Wanders, And A Steady Amount Without A Rhythm
+    write_expenses(HOUSEHOLD_ID, [
+        {**row, "amount": amount} for row, amount in zip(monthly("CITY POWER", 0, "Bills"), [40, 95, 61, 130, 72, 88])
+    ])
+    write_expenses(HOUSEHOLD_ID, [
+        {"spent_date": (TODAY - timedelta(days=days)).isoformat(), "description": "Corner Cafe",
+         "amount": 4.50, "category": "Dining"}
+        for days in (1, 2, 9, 30, 31, 75)
+    ])
+
+    suggestions = detect_recurring(HOUSEHOLD_ID, TODAY)
+
+    assert [(s["name"], s["frequency"], s["amount"], s["due_day"]) for s in suggestions] == [
+        ("STREAMFLIX.COM", "monthly", 15.99, 5)
+    ]
+
+
+def test_duplicates_and_billed_merchants_are_skipped(app, client):
+    rows = monthly("STREAMFLIX.COM", 15.99, "Subscriptions")
+    write_expenses(HOUSEHOLD_ID, rows)
+    write_expenses(HOUSEHOLD_ID, rows)
+    assert suggested_names() == ["STREAMFLIX.COM"]
+
+    client.post("/bill/new", data={
+        "name": "Streamflix.com", "category": "Subscriptions", "amount": "15.99", "due_day": "5", "recurrence": "monthly",
+    })
+    assert suggested_names() == []
+
+
+def test_renamed_income_category_is_still_not_suggested(app, client):
+    write_expenses(HOUSEHOLD_ID, monthly("EMPLOYER PAYROLL", -2400.00, "Income", day=1))
+    assert suggested_names() == []
+
+    client.post(f"/settings/categories/{category_id_for(HOUSEHOLD_ID, 'Income')}/rename", data={"name": "Salary"})
+
+    assert suggested_names() == []
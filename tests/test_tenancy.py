@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.archive import archive_expenses, archive_table
+from app.categories import category_id_for
+from app.extensions import db
+from app.importer import write_expenses
+from app.models import Bill, BulkAction, Expense, Paycheck
+
+HOUSEHOLD_A = 1
+ALL_TIME = {"preset": "all_time", "show": "all", "category_id": "", "start": "2000-01-01", "end": "2026-12-31"}
+
+
+@pytest.fixture
+def other(client):
+    """Household A's data, with the client then switched to a new household B."""
+    write_expenses(HOUSEHOLD_A, [
+        {"spent_date": "2026-10-01", "description": "Hardware Store", "amount": 24.50, "category": "Shopping"},
+        {"spent_date": "2026-10-02", "description": "Corner Cafe", "amount": 4.25, "category": "Shopping"},
+        {"spent_date": "2021-06-01", "description": "Old Hardware Store", "amount": 12.00, "category": "Shopping"},
+    ])
+    archive_expenses(date(2022, 1, 1))
+    client.post("/bill/new", data={"name": "Power", "category": "Bills", "amount": "80", "due_day": "12", "recurrence": "monthly"})
+    client.post("/paychecks/new", data={"source": "Job", "amount": "2400", "pay_date": "2026-10-02"})
+    client.post("/expenses/bulk-category/matching", data={"category": "Other", **ALL_TIME})
+
+    client.post("/settings/households", data={"name": "B"})
+    return {
+        "expense": db.session.execute(select(Expense.id).order_by(Expense.id)).scalars().first(),
+        "bill": db.session.execute(select(Bill.id)).scalar_one(),
+        "paycheck": db.session.execute(select(Paycheck.id)).scalar_one(),
+        "action": db.session.execute(select(BulkAction.id)).scalar_one(),
+        "category": category_id_for(HOUSEHOLD_A, "Shopping"),
+    }
+
+
+def snapshot():
+    """Household A's rows as they stand."""
+    db.session.expire_all()
+    archived = archive_table(2021)
+    return {
+        "expenses": db.session.execute(
+            select(Expense.id, Expense.category_id, Expense.amount).where(Expense.household_id == HOUSEHOLD_A)
+        ).all(),
+        "archived": db.session.execute(
+            select(archived.c.id, archived.c.category_id).where(archived.c.household_id == HOUSEHOLD_A)
+        ).all(),
+        "bills": db.session.execute(select(Bill.id, Bill.amount, Bill.is_active, Bill.paid_through)).all(),
+        "paychecks": db.session.execute(select(Paycheck.id, Paycheck.amount)).all(),
+        "undone": db.session.execute(
+            select(BulkAction.undone_at).where(BulkAction.household_id == HOUSEHOLD_A)
+        ).scalar_one(),
+    }
+
+
+def test_other_households_records_are_404(client, other):
+    before = snapshot()
+    expense, bill, paycheck = other["expense"], other["bill"], other["paycheck"]
+
+    requests = [
+        ("POST", f"/expenses/{expense}/category", {"category": "Other"}),
+        ("POST", f"/expenses/{expense}/delete", None),
+        ("GET", f"/bills/{bill}/edit", None),
+        ("POST", f"/bills/{bill}/update", {"name": "Mine", "category": "Bills", "amount": "1", "due_day": "1", "recurrence": "monthly"}),
+        ("POST", f"/bills/{bill}/paid", None),
+        ("POST", f"/bills/{bill}/unpaid", None),
+        ("POST", f"/bills/{bill}/delete", None),
+        ("GET", f"/paychecks/{paycheck}/edit", None),
+        ("POST", f"/paychecks/{paycheck}/update", {"source": "Mine", "amount": "1", "pay_date": "2026-10-03"}),
+        ("POST", f"/paychecks/{paycheck}/delete", None),
+        ("POST", f"/expenses/bulk-actions/{other['action']}/undo", None),
+        ("POST", f"/settings/categories/{other['category']}/rename", {"name": "Mine"}),
+    ]
+    for method, path, data in requests:
+        assert client.open(path, method=method, data=data).status_code == 404, path
+
+    assert snapshot() == before
+
+
+def test_expense_lists_and_bulk_actions_stay_in_their_household(client, other):
+    before = snapshot()
+    assert len(before["expenses"]) == 2 and len(before["archived"]) == 1
+
+    page = client.get("/expenses?preset=all_time").get_data(as_text=True)
+    assert "Hardware Store" not in page and "Corner Cafe" not in page
+    rows = client.get("/expenses/rows?preset=all_time")
+    assert rows.status_code == 200 and "Hardware Store" not in rows.get_data(as_text=True)
+
+    client.post("/expenses/bulk-category/matching", data={"category": "Groceries", **ALL_TIME})
+    client.post("/expenses/bulk-delete/matching", data=ALL_TIME)
+    client.post("/expenses/bulk-category", data={"category": "Groceries", "expense_ids": [other["expense"]]})
+    client.post("/expenses/bulk-delete", data={"expense_ids": [other["expense"]]})
+
+    assert snapshot() == before
+    # B's Bulk Actions Matched Nothing And Were Logged Under B Only
+    assert db.session.execute(
+        select(func.count()).select_from(BulkAction).where(BulkAction.household_id == HOUSEHOLD_A)
+    ).scalar() == 1
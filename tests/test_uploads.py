@@ -0,0 +1,50 @@
+import io
+
+from sqlalchemy import func, select
+
+from app import routes
+from app.extensions import db
+from app.models import Expense, StatementImport
+
+
+def csv_file(rows: int) -> bytes:
+    lines = ["date,description,amount,category"]
+    lines += [f"2026-10-{day:02d},Corner Cafe,{4 + day}.50,Dining" for day in range(1, rows + 1)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def upload(client, data: bytes):
+    return client.post("/expenses/upload", data={"file": (io.BytesIO(data), "statement.csv")})
+
+
+def expense_count():
+    return db.session.execute(select(func.count()).select_from(Expense)).scalar()
+
+
+def test_truncated_preview_is_shown_and_not_recorded_as_imported(client, monkeypatch):
+    monkeypatch.setattr(routes, "PREVIEW_MAX_ROWS", 3)
+    statement = csv_file(5)
+
+    assert upload(client, statement).location.endswith("/expenses/preview")
+    page = client.get("/expenses/preview").get_data(as_text=True)
+    assert "more than 3 rows" in page
+
+    client.post("/expenses/import")
+    assert expense_count() == 3
+    assert db.session.execute(select(func.count()).select_from(StatementImport)).scalar() == 0
+
+    # The Same File Can Still Be Uploaded, Since Its Last Rows Never Made It In
+    assert upload(client, statement).location.endswith("/expenses/preview")
+
+
+def test_whole_file_is_recorded_and_not_imported_twice(client, monkeypatch):
+    monkeypatch.setattr(routes, "PREVIEW_MAX_ROWS", 5)
+    statement = csv_file(5)
+
+    upload(client, statement)
+    assert "more than" not in client.get("/expenses/preview").get_data(as_text=True)
+    client.post("/expenses/import")
+    assert expense_count() == 5
+
+    assert upload(client, statement).location.endswith("/expenses")
+    assert expense_count() == 5